@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+
+"""Micro-benchmark of the decoding of the GameController packets received by the referee.
+
+Compares the construct parser (GameState.parse) with the precompiled struct decoder (parse_game_state), both on their
+own and followed by the attribute accesses of a referee step. Run from controllers/referee:
+
+    python3 benchmark_gamestate.py --iterations 20000
+"""
+
+from typing import Dict, Optional, Sequence
+
+import argparse
+import timeit
+
+from gamestate import GameState, parse_game_state
+
+
+def sample_packet(packet_number: int = 0) -> bytes:
+    """A GameState packet of a game in play, with a penalized robot and a goalkeeper in each team.
+
+    :param packet_number: Packet number, defaults to 0
+    :type packet_number: int, optional
+    :return: Packet as sent by the GameController
+    :rtype: bytes
+    """
+    def robot(penalty=0, goalkeeper=False):
+        return dict(penalty=penalty, secs_till_unpenalized=25 if penalty else 0, number_of_warnings=1,
+                    number_of_yellow_cards=0, number_of_red_cards=0, goalkeeper=goalkeeper)
+
+    def team(number, color, score):
+        players = [robot(goalkeeper=True), robot(penalty=31)] + [robot() for _ in range(9)]
+        return dict(team_number=number, team_color=color, score=score, penalty_shot=0, single_shots=0,
+                    coach_sequence=0, coach_message="", coach=robot(), players=players)
+
+    return GameState.build(dict(
+        packet_number=packet_number, players_per_team=4, game_type=0, game_state="STATE_PLAYING", first_half=True,
+        kickoff_team=1, secondary_state="STATE_DIRECT_FREEKICK", secondary_state_info=b"\x02\x01\x00\x00",
+        drop_in_team=False, drop_in_time=65535, seconds_remaining=542, secondary_seconds_remaining=-3,
+        teams=[team(1, "BLUE", 2), team(2, "RED", 1)]))
+
+
+def _referee_accesses(state) -> int:
+    # Attributes read from the game state in a step of the referee and by the display
+    total = state.seconds_remaining + state.secondary_seconds_remaining + state.secondary_state_info[1]
+    red = 0 if state.teams[0].team_color == "RED" else 1
+    total += state.teams[red].score + state.teams[1 - red].score
+    if state.game_state == "STATE_PLAYING" and state.secondary_state[6:] == "DIRECT_FREEKICK":
+        total += int(state.game_state) + int(state.secondary_state)
+    for team in state.teams:
+        for player in team.players[:state.players_per_team]:
+            total += player.penalty + player.secs_till_unpenalized + player.goalkeeper
+    return total
+
+
+def run_benchmark(iterations: int = 20000) -> Dict[str, float]:
+    """Times each decoder.
+
+    :param iterations: Number of packets decoded per measure, defaults to 20000
+    :type iterations: int, optional
+    :return: Time per packet in microseconds of each decoder, with and without the attribute accesses
+    :rtype: Dict[str, float]
+    """
+    buffer = memoryview(bytearray(sample_packet()))
+    cases = {
+        "construct": lambda: GameState.parse(buffer),
+        "struct": lambda: parse_game_state(buffer),
+        "construct + accesses": lambda: _referee_accesses(GameState.parse(buffer)),
+        "struct + accesses": lambda: _referee_accesses(parse_game_state(buffer)),
+    }
+    return {name: 1e6 * min(timeit.repeat(case, number=iterations, repeat=3)) / iterations
+            for name, case in cases.items()}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark of the GameState packet decoders")
+    parser.add_argument("--iterations", type=int, default=20000, help="Packets decoded per measure")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.iterations)
+    for name, us in results.items():
+        print(f"{name}: {us:.2f} us per packet")
+    print(f"speedup: {results['construct'] / results['struct']:.1f}x, "
+          f"with accesses {results['construct + accesses'] / results['struct + accesses']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
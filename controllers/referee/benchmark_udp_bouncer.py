@@ -0,0 +1,337 @@
+#!/usr/bin/python3
+
+"""Load test of udp_bouncer.py on a single Linux host, without network.
+
+Starts the bouncer on a generated game.json and simulates the robots of both teams and the GameController:
+each robot sends team communication packets from its own loopback address (127.0.1.x for blue, 127.0.2.x for red,
+Linux routes all of 127.0.0.0/8 to the loopback interface) and receives the forwarded packets on the same address.
+Reports the forwarding latency percentiles, the loss and the CPU usage of the bouncer, and fails if the p99 latency
+or the loss exceed the given thresholds. With --allocations, the memory the bouncer allocates per forwarded packet is
+measured as well, with tracemalloc and the bouncer running in the benchmark process. Run from controllers/referee:
+
+    python3 benchmark_udp_bouncer.py --robots 4 --team-rate 30 --team-size 200 --duration 10 --max-p99 5
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import argparse
+import heapq
+import importlib.util
+import json
+import os
+import selectors
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+# Header of the generated packets: index of the source, sequence number and monotonic send time in ns
+PACKET_HEADER = struct.Struct("<IIq")
+
+HOST_IP = "127.0.0.1"
+
+# Time the bouncer may take to start
+STARTUP_TIMEOUT = 5.0
+
+# Time given to the bouncer to forward the last packets
+DRAIN_TIME = 0.5
+
+
+def robot_ips(color: str, robots: int) -> List[str]:
+    """Loopback addresses of the robots of a team.
+
+    :param color: Team color (blue or red)
+    :type color: str
+    :param robots: Number of robots of the team
+    :type robots: int
+    :return: IPs of the robots
+    :rtype: List[str]
+    """
+    return [f"127.0.{1 if color == 'blue' else 2}.{i + 1}" for i in range(robots)]
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind((HOST_IP, 0))
+        return sock.getsockname()[1]
+
+
+def _udp_socket(ip: str, port: int = 0) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    sock.bind((ip, port))
+    sock.setblocking(False)
+    return sock
+
+
+def _cpu_seconds(pid: int) -> float:
+    # utime and stime of /proc/<pid>/stat, the command name in parentheses may contain spaces
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _payload(source: int, sequence: int, size: int) -> bytes:
+    header = PACKET_HEADER.pack(source, sequence, time.monotonic_ns())
+    return header + bytes(max(0, size - len(header)))
+
+
+class _Receiver(threading.Thread):
+    """Receives the forwarded packets on all sockets of the host and the robots and records their latency."""
+
+    def __init__(self, sockets: Sequence[socket.socket]):
+        super().__init__(daemon=True)
+        self.selector = selectors.DefaultSelector()
+        for sock in sockets:
+            self.selector.register(sock, selectors.EVENT_READ)
+        self.latencies: List[int] = []
+        self.received = 0
+        self.running = True
+
+    def run(self):
+        buffer = bytearray(65536)
+        while self.running:
+            for key, _ in self.selector.select(0.05):
+                while True:
+                    try:
+                        size = key.fileobj.recv_into(buffer)
+                    except BlockingIOError:
+                        break
+                    received_time = time.monotonic_ns()
+                    if size >= PACKET_HEADER.size:
+                        self.latencies.append(received_time - PACKET_HEADER.unpack_from(buffer)[2])
+                        self.received += 1
+
+
+def run_benchmark(robots: int = 4, team_rate: float = 30.0, team_size: int = 200, gc_rate: float = 2.0,
+                  gc_size: int = 200, duration: float = 10.0, bouncer_args: Sequence[str] = (),
+                  bouncer_path: Optional[str] = None) -> Dict:
+    """Runs the bouncer under load and measures the forwarding.
+
+    :param robots: Number of robots per team, defaults to 4
+    :type robots: int, optional
+    :param team_rate: Team communication packets per second and robot, defaults to 30.0
+    :type team_rate: float, optional
+    :param team_size: Size of the team communication packets in bytes, defaults to 200
+    :type team_size: int, optional
+    :param gc_rate: GameController packets per second, defaults to 2.0
+    :type gc_rate: float, optional
+    :param gc_size: Size of the GameController packets in bytes, defaults to 200
+    :type gc_size: int, optional
+    :param duration: Duration of the load in seconds, defaults to 10.0
+    :type duration: float, optional
+    :param bouncer_args: Additional command line arguments of the bouncer, defaults to ()
+    :type bouncer_args: Sequence[str], optional
+    :param bouncer_path: Bouncer script, e.g. an older version to compare with, defaults to udp_bouncer.py
+    :type bouncer_path: Optional[str], optional
+    :raises RuntimeError: If the bouncer does not start
+    :return: Sent, expected and received packets, loss, latency percentiles in ms and CPU usage of the bouncer
+    :rtype: Dict
+    """
+    blue, red = robot_ips("blue", robots), robot_ips("red", robots)
+    # The host receives the GameController packets, its team port socket reserves the team port on the host
+    host_gc, host_team = _udp_socket(HOST_IP), _udp_socket(HOST_IP)
+    gc_send_port, team_send_port = host_gc.getsockname()[1], host_team.getsockname()[1]
+    gc_listen_port, team_listen_port = _free_port(), _free_port()
+    robot_gc = [_udp_socket(ip, gc_send_port) for ip in blue + red]
+    robot_team = [_udp_socket(ip, team_send_port) for ip in blue + red]
+    gc_sender = _udp_socket(HOST_IP)
+    sockets = [host_gc, host_team, gc_sender] + robot_gc + robot_team
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        game_config = os.path.join(tmp_dir, "game.json")
+        with open(game_config, "w") as f:
+            json.dump({"host": HOST_IP, "blue": {"hosts": [HOST_IP] + blue}, "red": {"hosts": [HOST_IP] + red}}, f)
+        if bouncer_path is None:
+            bouncer_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "udp_bouncer.py")
+        command = [sys.executable, os.path.abspath(bouncer_path), game_config, "--listen-ip", HOST_IP,
+                   "--gc-listen-port", str(gc_listen_port), "--team-listen-port", str(team_listen_port),
+                   "--gc-send-port", str(gc_send_port), "--team-send-port", str(team_send_port), *bouncer_args]
+        bouncer = subprocess.Popen(command, cwd=tmp_dir)
+        receiver = _Receiver([host_gc] + robot_gc + robot_team)
+        try:
+            log_path = os.path.join(tmp_dir, "bouncing_log.txt")
+            deadline = time.monotonic() + STARTUP_TIMEOUT
+            while not (os.path.exists(log_path) and "Setup completed" in open(log_path).read()):
+                if bouncer.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"The bouncer did not start: {' '.join(command)}")
+                time.sleep(0.01)
+            receiver.start()
+
+            # Sources: (next send time, index, socket, destination, period, size), the GameController is the last one
+            start = time.monotonic()
+            sources = [(start + i / (len(robot_team) * team_rate), i, sock, (HOST_IP, team_listen_port),
+                        1 / team_rate, team_size) for i, sock in enumerate(robot_team)]
+            sources.append((start, len(robot_team), gc_sender, (HOST_IP, gc_listen_port), 1 / gc_rate, gc_size))
+            heapq.heapify(sources)
+            sent = [0] * len(sources)
+            start_cpu = _cpu_seconds(bouncer.pid)
+            end = start + duration
+            while True:
+                next_time, index, sock, destination, period, size = sources[0]
+                if next_time >= end:
+                    break
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                try:
+                    sock.sendto(_payload(index, sent[index], size), destination)
+                except BlockingIOError:  # Counted as lost
+                    pass
+                sent[index] += 1
+                heapq.heapreplace(sources, (next_time + period, index, sock, destination, period, size))
+            time.sleep(DRAIN_TIME)
+            cpu = _cpu_seconds(bouncer.pid) - start_cpu
+        finally:
+            receiver.running = False
+            receiver.join()
+            bouncer.terminate()
+            bouncer.wait()
+            for sock in sockets:
+                sock.close()
+
+    team_sent, gc_sent = sum(sent[:-1]), sent[-1]
+    # Team packets go to the teammates of the sender, GameController packets to the host and all robots
+    expected = team_sent * (robots - 1) + gc_sent * (1 + 2 * robots)
+    latencies = np.array(receiver.latencies, dtype=np.float64) * 1e-6
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (np.nan,) * 3
+    return {
+        "robots_per_team": robots,
+        "team_rate": team_rate,
+        "team_size": team_size,
+        "gc_rate": gc_rate,
+        "gc_size": gc_size,
+        "duration": duration,
+        "sent": team_sent + gc_sent,
+        "expected": expected,
+        "received": receiver.received,
+        "loss": 1 - receiver.received / expected if expected else 0.0,
+        "latency_ms": {"p50": p50, "p95": p95, "p99": p99, "max": latencies.max() if len(latencies) else np.nan},
+        "bouncer_cpu_percent": 100 * cpu / (duration + DRAIN_TIME),
+        "bouncer_cpu_us_per_packet": 1e6 * cpu / (team_sent + gc_sent) if team_sent + gc_sent else np.nan,
+    }
+
+
+def measure_allocations(robots: int = 4, packets: int = 2000, size: int = 200,
+                        bouncer_path: Optional[str] = None) -> Dict:
+    """Measures the memory the bouncer allocates to forward team communication packets, with tracemalloc.
+
+    The bouncer runs in this process. Each packet is sent and then received and forwarded by a poll of the bouncer,
+    the peak of the memory traced during the poll above the memory traced before it is the memory allocated to
+    forward the packet, which is freed again unless it is retained.
+
+    :param robots: Number of robots of the sending team, defaults to 4
+    :type robots: int, optional
+    :param packets: Number of measured packets, defaults to 2000
+    :type packets: int, optional
+    :param size: Size of the packets in bytes, defaults to 200
+    :type size: int, optional
+    :param bouncer_path: Bouncer script, e.g. an older version to compare with, defaults to udp_bouncer.py
+    :type bouncer_path: Optional[str], optional
+    :return: Mean and maximum bytes allocated per packet and memory blocks retained after all packets
+    :rtype: Dict
+    """
+    if bouncer_path is None:
+        bouncer_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "udp_bouncer.py")
+    spec = importlib.util.spec_from_file_location("benchmarked_udp_bouncer", bouncer_path)
+    udp_bouncer = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(udp_bouncer)
+    udp_bouncer.log = lambda message: None
+
+    blue = robot_ips("blue", robots)
+    host_team = _udp_socket(HOST_IP)
+    team_send_port = host_team.getsockname()[1]
+    gc_listen_port, team_listen_port = _free_port(), _free_port()
+    robot_team = [_udp_socket(ip, team_send_port) for ip in blue]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        game_config = os.path.join(tmp_dir, "game.json")
+        with open(game_config, "w") as f:
+            json.dump({"host": HOST_IP, "blue": {"hosts": blue}, "red": {"hosts": []}}, f)
+        bouncer = udp_bouncer.Bouncer.from_config(game_config, team_send_port=team_send_port)
+    bouncer.bind(HOST_IP, gc_listen_port, team_listen_port)
+    allocated = np.zeros(packets, dtype=np.int64)
+    try:
+        for i in range(packets + 100):  # The first packets allocate the buffers and the send socket
+            robot_team[0].sendto(_payload(0, i, size), (HOST_IP, team_listen_port))
+            time.sleep(0.0001)  # Let the packet arrive, so that each poll receives one packet
+            if i == 100:
+                tracemalloc.start()
+                start_blocks = sys.getallocatedblocks()
+            if i >= 100:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                bouncer.poll(1)
+                allocated[i - 100] = tracemalloc.get_traced_memory()[1] - before
+            else:
+                bouncer.poll(1)
+            for sock in robot_team[1:]:
+                try:
+                    while True:
+                        sock.recv(65536)
+                except BlockingIOError:
+                    pass
+        retained_blocks = sys.getallocatedblocks() - start_blocks
+    finally:
+        tracemalloc.stop()
+        bouncer.close()
+        for sock in [host_team] + robot_team:
+            sock.close()
+    return {
+        "packets": packets,
+        "bytes_per_packet": float(np.mean(allocated)),
+        "max_bytes_per_packet": int(np.max(allocated)),
+        "retained_blocks": retained_blocks,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test of the udp_bouncer on the loopback interface")
+    parser.add_argument("--robots", type=int, default=4, help="Robots per team")
+    parser.add_argument("--team-rate", type=float, default=30.0, help="Team communication packets per second and robot")
+    parser.add_argument("--team-size", type=int, default=200, help="Team communication packet size in bytes")
+    parser.add_argument("--gc-rate", type=float, default=2.0, help="GameController packets per second")
+    parser.add_argument("--gc-size", type=int, default=200, help="GameController packet size in bytes")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duration of the load in seconds")
+    parser.add_argument("--max-p99", type=float, default=5.0, help="Fail if the p99 latency exceeds this (ms)")
+    parser.add_argument("--max-loss", type=float, default=0.0, help="Fail if the loss exceeds this fraction")
+    parser.add_argument("--json", help="Write the results to this json file")
+    parser.add_argument("--bouncer", help="Bouncer script to benchmark, defaults to udp_bouncer.py")
+    parser.add_argument("--allocations", action="store_true",
+                        help="Also measure the memory allocated per forwarded packet, with the bouncer in this process")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.robots, args.team_rate, args.team_size, args.gc_rate, args.gc_size, args.duration,
+                            bouncer_path=args.bouncer)
+    latency = results["latency_ms"]
+    print(f"{results['sent']} packets sent, {results['received']}/{results['expected']} forwarded packets received, "
+          f"loss {100 * results['loss']:.2f}%")
+    print(f"latency p50 {latency['p50']:.3f} ms, p95 {latency['p95']:.3f} ms, p99 {latency['p99']:.3f} ms, "
+          f"max {latency['max']:.3f} ms")
+    print(f"bouncer CPU {results['bouncer_cpu_percent']:.1f}%, {results['bouncer_cpu_us_per_packet']:.1f} us per packet")
+    if args.allocations:
+        results["allocations"] = measure_allocations(args.robots, size=args.team_size, bouncer_path=args.bouncer)
+        allocations = results["allocations"]
+        print(f"bouncer allocations {allocations['bytes_per_packet']:.0f} bytes per packet on average, "
+              f"{allocations['max_bytes_per_packet']} at most, {allocations['retained_blocks']} blocks retained")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+    failed = False
+    if not latency["p99"] <= args.max_p99:
+        print(f"FAILED: p99 latency {latency['p99']:.3f} ms exceeds {args.max_p99} ms")
+        failed = True
+    if results["loss"] > args.max_loss:
+        print(f"FAILED: loss {100 * results['loss']:.2f}% exceeds {100 * args.max_loss:.2f}%")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -1 +1,2 @@
 from .data_collector import DataCollector
+from .reader import MatchReader, open_matches
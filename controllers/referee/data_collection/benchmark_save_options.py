@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+
+"""Benchmark of the save options on a synthetic full-length match.
+
+Reports the file size, the write time and the read time of the feather file for each combination
+of compression and column types. Run from controllers/referee:
+
+    python3 -m data_collection.benchmark_save_options [number of steps]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from data_collection import match_info as mi
+from data_collection.pytests.test_step import _create_step
+
+# Two halves of 10 minutes with a basic time step of 8 ms, plus some stoppages
+DEFAULT_NUM_STEPS = 160000
+
+OPTIONS: List[Tuple[str, mi.SaveOptions]] = [
+    ("default (lz4)", mi.SaveOptions(also_as_pickle=False)),
+    ("uncompressed", mi.SaveOptions(compression="uncompressed", also_as_pickle=False)),
+    ("zstd", mi.SaveOptions(compression="zstd", also_as_pickle=False)),
+    ("zstd level 9", mi.SaveOptions(compression="zstd", compression_level=9, also_as_pickle=False)),
+    ("lz4, float32, uint8", mi.SaveOptions(float32_poses=True, enum_encoding="uint8", also_as_pickle=False)),
+    (
+        "zstd, float32, uint8",
+        mi.SaveOptions(compression="zstd", float32_poses=True, enum_encoding="uint8", also_as_pickle=False),
+    ),
+    (
+        "zstd, float32, category",
+        mi.SaveOptions(compression="zstd", float32_poses=True, enum_encoding="category", also_as_pickle=False),
+    ),
+]
+
+
+def create_match_table(num_steps: int, seed: int = 0) -> pa.Table:
+    """Create the flattened steps of a synthetic match.
+    Poses and other float columns follow random walks, so that they compress like recorded trajectories,
+    the other columns are repeated from a single step.
+
+    :param num_steps: Number of steps
+    :type num_steps: int
+    :param seed: Seed of the random walks, defaults to 0
+    :type seed: int, optional
+    :return: Flattened steps
+    :rtype: pa.Table
+    """
+    rng = np.random.default_rng(seed)
+    template = pd.json_normalize([_create_step(0).to_dict()])
+    columns = {}
+    for name in template.columns:
+        value = template[name].iloc[0]
+        if name == "time":
+            columns[name] = np.arange(num_steps, dtype=np.int64) * 8
+        elif ".position." in name or ".rotation." in name or isinstance(value, float):
+            columns[name] = float(value) + np.cumsum(rng.normal(scale=1e-3, size=num_steps))
+        else:
+            columns[name] = np.repeat(template[name].to_numpy(), num_steps)
+    return pa.Table.from_pandas(pd.DataFrame(columns), preserve_index=False)
+
+
+def main(num_steps: int) -> None:
+    table = create_match_table(num_steps)
+    print(f"Synthetic match: {num_steps} steps, {table.num_columns} columns, {table.nbytes / 1e6:.1f} MB in memory")
+    print(f"{'options':<26}{'size [MB]':>12}{'write [s]':>12}{'read [s]':>12}")
+    with tempfile.TemporaryDirectory() as save_dir:
+        for name, options in OPTIONS:
+            start = time.perf_counter()
+            options.write(table, save_dir, "benchmark")
+            write_time = time.perf_counter() - start
+
+            path = os.path.join(save_dir, "benchmark.feather")
+            start = time.perf_counter()
+            pd.read_feather(path)
+            read_time = time.perf_counter() - start
+
+            print(f"{name:<26}{os.path.getsize(path) / 1e6:>12.2f}{write_time:>12.3f}{read_time:>12.3f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NUM_STEPS)
@@ -0,0 +1,179 @@
+import json
+import os
+import shutil
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from data_collection import match_info as mi
+
+MANIFEST_FILENAME = "manifest.json"
+STATIC_FILENAME = "static.json"
+EVENTS_FILENAME = "events"  # Event tables are stored as events.<table>.feather
+
+
+class ChunkedMatchWriter:
+    def __init__(self, save_dir: os.PathLike, name: str) -> None:
+        """Appends steps of a match as numbered chunk files to a directory.
+        Each chunk only holds the steps recorded since the previous chunk,
+        so writing a chunk does not get more expensive the longer the match goes on.
+        A manifest lists the chunks in order, the chunks can be compacted into a single file at the end of the match.
+        If the chunk directory already has a manifest, new chunks are appended to the existing ones.
+
+        :param save_dir: Path to directory where to create the chunk directory
+        :type save_dir: os.PathLike
+        :param name: Name of the chunk directory
+        :type name: str
+        """
+        self.chunk_dir: str = os.path.join(save_dir, name)
+        self.steps_written: int = 0
+        self._chunks: List[Dict] = []
+        self._static_written: bool = False
+
+        os.makedirs(self.chunk_dir, exist_ok=True)
+
+        manifest_path = os.path.join(self.chunk_dir, MANIFEST_FILENAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            self._chunks = manifest["chunks"]
+            self._static_written = manifest["static"] is not None
+            self.steps_written = sum(chunk["num_steps"] for chunk in self._chunks)
+
+    def write_static(self, static: mi.StaticMatchInfo) -> None:
+        """Write the static match info into the chunk directory, only done once.
+
+        :param static: Static match info
+        :type static: mi.StaticMatchInfo
+        """
+        if self._static_written:
+            return
+        with open(os.path.join(self.chunk_dir, STATIC_FILENAME), "w") as f:
+            f.write(static.to_json())
+        self._static_written = True
+        self._write_manifest()
+
+    def append(self, table: pa.Table) -> None:
+        """Write steps as a new chunk.
+
+        :param table: Steps to write, following the steps of the previous chunk
+        :type table: pa.Table
+        """
+        file_name = f"chunk_{len(self._chunks):05d}.feather"
+        feather.write_feather(table, os.path.join(self.chunk_dir, file_name), compression="uncompressed")
+        self._chunks.append(
+            {
+                "file": file_name,
+                "first_step": self.steps_written,
+                "num_steps": table.num_rows,
+            }
+        )
+        self.steps_written += table.num_rows
+        self._write_manifest()
+
+    def write_events(self, events: mi.MatchEvents) -> None:
+        """Write the event tables into the chunk directory, replacing the previous ones.
+
+        :param events: Event tables of the match
+        :type events: mi.MatchEvents
+        """
+        events.save(self.chunk_dir, EVENTS_FILENAME)
+
+    def _write_manifest(self) -> None:
+        """Write the manifest atomically, so that it always lists complete chunks only."""
+        manifest = {
+            "static": STATIC_FILENAME if self._static_written else None,
+            "chunks": self._chunks,
+        }
+        tmp_path = os.path.join(self.chunk_dir, MANIFEST_FILENAME + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.chunk_dir, MANIFEST_FILENAME))
+
+    def compact(
+        self,
+        save_dir: os.PathLike,
+        file_name: str,
+        logger=None,
+        also_as_pickle: bool = True,
+        options: Optional[mi.SaveOptions] = None,
+    ) -> None:
+        """Compact the chunks into a single file and remove the chunk directory afterwards.
+
+        :param save_dir: Path to directory where to store match data
+        :type save_dir: os.PathLike
+        :param file_name: Name under which to store the match data (without file extension)
+        :type file_name: str
+        :param logger: Logger, defaults to None
+        :type logger: Optional[Logger], optional
+        :param also_as_pickle: Whether dynamic match data should also be saved as a pickle file, defaults to True
+        :type also_as_pickle: bool, optional
+        :param options: Compression and column types of the saved data, overrides also_as_pickle, defaults to None
+        :type options: Optional[mi.SaveOptions], optional
+        """
+        compact_chunk_dir(self.chunk_dir, save_dir, file_name, logger, also_as_pickle, options)
+        shutil.rmtree(self.chunk_dir)
+
+
+def read_chunk_dir(chunk_dir: os.PathLike) -> pa.Table:
+    """Read all chunks listed in the manifest of a chunk directory as one table.
+    Chunks with differing columns (e.g. before and after the first GameController message) are unified.
+
+    :param chunk_dir: Path to the chunk directory
+    :type chunk_dir: os.PathLike
+    :return: Steps of all chunks
+    :rtype: pa.Table
+    """
+    with open(os.path.join(chunk_dir, MANIFEST_FILENAME), "r") as f:
+        manifest = json.load(f)
+    tables = [feather.read_table(os.path.join(chunk_dir, chunk["file"])) for chunk in manifest["chunks"]]
+    if not tables:
+        return pa.table({})
+    return pa.concat_tables(tables, promote_options="permissive")
+
+
+def compact_chunk_dir(
+    chunk_dir: os.PathLike,
+    save_dir: os.PathLike,
+    file_name: str,
+    logger=None,
+    also_as_pickle: bool = True,
+    options: Optional[mi.SaveOptions] = None,
+) -> None:
+    """Compact a chunk directory into the same files Match.save writes.
+    Can also be used offline to recover the data of a match that did not finish cleanly.
+
+    :param chunk_dir: Path to the chunk directory
+    :type chunk_dir: os.PathLike
+    :param save_dir: Path to directory where to store match data
+    :type save_dir: os.PathLike
+    :param file_name: Name under which to store the match data (without file extension)
+    :type file_name: str
+    :param logger: Logger, defaults to None
+    :type logger: Optional[Logger], optional
+    :param also_as_pickle: Whether dynamic match data should also be saved as a pickle file, defaults to True
+    :type also_as_pickle: bool, optional
+    :param options: Compression and column types of the saved data, overrides also_as_pickle, defaults to None
+    :type options: Optional[mi.SaveOptions], optional
+    """
+    if logger:
+        logger.info(f"Compacting data collection chunks '{chunk_dir}' to '{save_dir}' as '{file_name}.*'...")
+
+    # Copy static match info
+    static_path = os.path.join(chunk_dir, STATIC_FILENAME)
+    if os.path.exists(static_path):
+        shutil.copyfile(static_path, os.path.join(save_dir, file_name + ".json"))
+
+    # Copy event tables
+    for suffix in mi.event_file_suffixes():
+        events_path = os.path.join(chunk_dir, EVENTS_FILENAME + suffix)
+        if os.path.exists(events_path):
+            shutil.copyfile(events_path, os.path.join(save_dir, file_name + suffix))
+
+    # Concatenate dynamic match info
+    table = read_chunk_dir(chunk_dir)
+    if table.num_rows > 0:
+        if options is None:
+            options = mi.SaveOptions(also_as_pickle=also_as_pickle)
+        options.write(table, save_dir, file_name)
@@ -2,8 +2,11 @@ import os
 import time
 from datetime import datetime
 from threading import Event, Thread
+from typing import Dict, Optional
 
 from data_collection import match_info as mi
+from data_collection.chunked_writer import ChunkedMatchWriter
+from data_collection.writer_process import WriterProcess
 
 # from ..logger import Logger
 
@@ -15,6 +18,10 @@ class DataCollector:
         autosave_interval: int,
         match: mi.Match,
         logger=None,
+        incremental_autosave: bool = False,
+        writer_process: bool = False,
+        event_tables: bool = False,
+        save_options: Optional[mi.SaveOptions] = None,
     ) -> None:
         """Initialize DataCollector.
         :param save_dir: Path to directory where to store match data
@@ -25,10 +32,23 @@ class DataCollector:
         :type match: mi.Match
         :param logger: Logger, defaults to None
         :type logger: Optional[Logger], optional
+        :param incremental_autosave: Whether autosaves only append the steps recorded since the previous autosave
+            as a new chunk, instead of saving the whole match again, defaults to False
+        :type incremental_autosave: bool, optional
+        :param writer_process: Whether to serialize and save the match data in a separate process.
+            The steps are not kept in the match, but sent to the writer process, which also takes care of autosaving
+            (incrementally), defaults to False
+        :type writer_process: bool, optional
+        :param event_tables: Whether game control data and robot info are stored as change events in separate tables,
+            instead of in every step, defaults to False
+        :type event_tables: bool, optional
+        :param save_options: Compression and column types of the saved match data, defaults to None
+        :type save_options: Optional[mi.SaveOptions], optional
         """
         self.save_dir: os.PathLike = save_dir
         self.logger = logger
         self.match: mi.Match = match
+        self.save_options: Optional[mi.SaveOptions] = save_options
 
         if not os.path.exists(save_dir):
             os.makedirs(save_dir)
@@ -37,8 +57,27 @@ class DataCollector:
             False  # True, if finalized was successful, to prevent saving two times
         )
 
+        self.incremental_autosave: bool = incremental_autosave
+        self._chunk_writer: Optional[ChunkedMatchWriter] = None
+
         self.autosave_interval: int = autosave_interval
-        if autosave_interval >= 0:
+
+        self.events: Optional[mi.MatchEvents] = mi.MatchEvents() if event_tables else None
+        self._events_sent: Dict[str, int] = {}  # Number of events sent to the writer process per table
+
+        self._writer: Optional[WriterProcess] = None
+        self._current_step: Optional[mi.Step] = None  # Only used with the writer process
+        if writer_process:
+            start_time = datetime.utcnow().strftime('%Y-%m-%dT%H-%M-%S')
+            self._writer = WriterProcess(
+                self.match.get_static_match_info(),
+                self.save_dir,
+                f"referee_data_collection_AUTOSAVE_{start_time}",
+                autosave_interval,
+                f"referee_data_collection_FAILURE_{start_time}",
+                options=save_options,
+            )
+        elif autosave_interval >= 0:
             self.autosave_stop_tread_event: Event = Event()
             self.autosave_thread: Thread = Thread(
                 target=self._autosave,
@@ -57,16 +96,56 @@ class DataCollector:
         :param filename_state: State to include in save filenames (e.g. "COMPLETE", "FAILURE")
         :type filename_state: str
         """
+        filename = f"referee_data_collection_{filename_state}_{datetime.utcnow().strftime('%Y-%m-%dT%H-%M-%S')}"
+        if self._writer is not None:
+            if self._current_step is not None:
+                self._writer.push(mi.flatten_step(self._current_step))
+                self._current_step = None
+            self._send_events()
+            self._writer.close(filename, self.logger)
+            if self.events is not None and self._writer.error is not None:
+                # Saved by the writer process, unless it failed
+                self.events.save(self.save_dir, filename)
+            return
+
         # Stop autosave thread
-        self.autosave_stop_tread_event.set()
-        self.autosave_thread.join()
+        if self.autosave_interval >= 0:
+            self.autosave_stop_tread_event.set()
+            self.autosave_thread.join()
 
         # Save match data
-        self.match.save(
-            self.save_dir,
-            f"referee_data_collection_{filename_state}_{datetime.utcnow().strftime('%Y-%m-%dT%H-%M-%S')}",
-            self.logger,
-        )
+        if self._chunk_writer is not None:
+            # Only append the remaining steps and compact the chunks, instead of serializing the whole match again
+            self._checkpoint(include_current_step=True)
+            self._chunk_writer.compact(self.save_dir, filename, self.logger, options=self.save_options)
+            self._chunk_writer = None
+        else:
+            self.match.save(self.save_dir, filename, self.logger, options=self.save_options)
+        if self.events is not None:
+            self.events.save(self.save_dir, filename)
+
+    def _checkpoint(self, include_current_step: bool = False) -> None:
+        """Append the steps recorded since the last checkpoint as a new chunk.
+
+        :param include_current_step: Whether to include the current step, which might still be modified, defaults to False
+        :type include_current_step: bool, optional
+        """
+        if self._chunk_writer is None:
+            self._chunk_writer = ChunkedMatchWriter(
+                self.save_dir,
+                f"referee_data_collection_AUTOSAVE_{datetime.utcnow().strftime('%Y-%m-%dT%H-%M-%S')}",
+            )
+            self._chunk_writer.write_static(self.match.get_static_match_info())
+
+        stop = len(self.match) if include_current_step else len(self.match) - 1
+        start = self._chunk_writer.steps_written
+        if stop <= start:
+            return
+        table = self.match.to_arrow(start, stop)
+        if table is not None:
+            self._chunk_writer.append(table)
+        if self.events is not None:
+            self._chunk_writer.write_events(self.events)
 
     def __del__(self) -> None:  # Cleanup in case of failures
         if not self._finalized:
@@ -83,6 +162,13 @@ class DataCollector:
         :param time: Time of the step in milliseconds
         :type time: int
         """
+        if self._writer is not None:
+            # Only the current step is kept, previous steps are sent to the writer process
+            if self._current_step is not None:
+                self._writer.push(mi.flatten_step(self._current_step))
+                self._send_events()
+            self._current_step = mi.Step(time=time)
+            return
         self.match.add_step(mi.Step(time=time))
 
     def current_step(self) -> mi.Step:
@@ -91,8 +177,47 @@ class DataCollector:
         :return: Current step
         :rtype: mi.Step
         """
+        if self._writer is not None:
+            if self._current_step is None:
+                raise Exception("No steps in match")
+            return self._current_step
         return self.match.current_step()
 
+    def set_game_control_data(self, game_control_data: mi.GameControlData) -> None:
+        """Set the game control data of the current step, or record it as a change event.
+        Only the clock fields are kept in the step then.
+
+        :param game_control_data: Game control data
+        :type game_control_data: mi.GameControlData
+        """
+        if self.events is not None:
+            game_control_data = self.events.record_game_control_data(self.current_step().time, game_control_data)
+        self.current_step().game_control_data = game_control_data
+
+    def set_teams(self, teams: mi.Teams) -> None:
+        """Set the teams of the current step. The robot info of the players is recorded as change events instead,
+        if event tables are enabled. Only its clock fields are kept in the step then.
+
+        :param teams: Teams
+        :type teams: mi.Teams
+        """
+        if self.events is not None:
+            teams = self.events.record_teams(self.current_step().time, teams)
+        self.current_step().teams = teams
+
+    def _send_events(self) -> None:
+        """Send the change events recorded since the last call to the writer process."""
+        if self.events is None:
+            return
+        rows = {}
+        for name, table in self.events.tables.items():
+            sent = self._events_sent.get(name, 0)
+            if len(table) > sent:
+                rows[name] = table.rows(sent)
+                self._events_sent[name] = sent + len(rows[name])
+        if rows:
+            self._writer.push_events(rows)
+
     def _autosave(
         self,
         stop_event: Event,
@@ -102,6 +227,7 @@ class DataCollector:
     ) -> None:
         """Saves match data automatically in AUTOSAVE_INTERVAL.
         Old autosave files are being removed after new autosave was successful.
+        With incremental autosave, only the steps recorded since the previous autosave are appended instead.
 
         :param stop_event: Event to stop autosave thread
         :type stop_event: Event
@@ -120,12 +246,20 @@ class DataCollector:
             now: float = time.time()
             if now >= next_autosave_time:
                 next_autosave_time = now + autosave_interval
+                if self.incremental_autosave:
+                    if logger:
+                        logger.info(f"Appending data collection chunk to '{save_dir}'...")
+                    self._checkpoint()
+                    continue
+
                 filename: str = f"referee_data_collection_AUTOSAVE_{datetime.utcnow().strftime('%Y-%m-%dT%H-%M-%S')}"
-                self.match.save(save_dir, filename, logger)
+                self.match.save(save_dir, filename, logger, options=self.save_options)
+                if self.events is not None:
+                    self.events.save(save_dir, filename)
 
                 # Remove previous autosave file
                 if previous_autosave_filename:
-                    for extension in [".feather", ".pkl", ".json"]:
+                    for extension in [".feather", ".pkl", ".json"] + mi.event_file_suffixes():
                         try:
                             os.remove(
                                 os.path.join(
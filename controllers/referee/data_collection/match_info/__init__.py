@@ -4,10 +4,33 @@ from .field import Field
 from .frame import Frame
 from .match_object import MatchObject, StaticMatchObject
 from .player import Action, Penalty, Player, RobotInfo, Role, State, StaticPlayer
-from .pose import Pose, Position, Rotation, pose_from_affine
+from .pose import (
+    AffinePose,
+    Pose,
+    Position,
+    Rotation,
+    affines_to_arrays,
+    expand_affine_columns,
+    has_affine_columns,
+    pose_from_affine,
+    poses_from_affines,
+)
 from .simulation import Simulation
 from .static_match_info import LeagueSubType, MatchType, StaticMatchInfo
 from .team import StaticTeam, StaticTeams, Team, TeamColor, Teams
 
 from .step import GameControlData, Step
+from .save_options import SaveOptions, enum_of_column
 from .match import Match
+from .columnar_match import ColumnarMatch, flatten_step, unflatten_step
+from .events import (
+    GAME_CONTROL_DATA_CLOCKS,
+    GAME_CONTROL_DATA_EVENTS,
+    ROBOT_INFO_CLOCKS,
+    ROBOT_INFO_EVENTS,
+    EventTable,
+    MatchEvents,
+    apply_events,
+    event_file_suffixes,
+    read_events,
+)
@@ -0,0 +1,454 @@
+import dataclasses
+import os
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .match import Match
+from .pose import Pose, expand_affine_columns
+from .save_options import SaveOptions, enum_of_column
+from .static_match_info import StaticMatchInfo
+from .step import Step
+
+# Column kinds, ordered by how general they are. A column is promoted to a more general kind if needed.
+_BOOL = 0
+_INT = 1
+_FLOAT = 2
+_OBJECT = 3
+
+_DTYPES = {
+    _BOOL: np.bool_,
+    _INT: np.int64,
+    _FLOAT: np.float64,
+    _OBJECT: object,
+}
+
+# Cache of the field names of each dataclass type, to avoid calling dataclasses.fields() for every step
+_FIELD_NAMES: Dict[type, Tuple[str, ...]] = {}
+
+
+def _kind_of(value: Any) -> int:
+    """Get the column kind of a (non-None) value.
+
+    :param value: Value to get the kind of
+    :type value: Any
+    :return: Column kind
+    :rtype: int
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return _BOOL
+    if isinstance(value, (int, np.integer)):  # Includes IntEnum
+        return _INT
+    if isinstance(value, (float, np.floating)):
+        return _FLOAT
+    return _OBJECT
+
+
+def flatten_step(obj: Any, prefix: str = "", out: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Flatten a (nested) dataclass into a dict of leaf values.
+    The keys are the same as the column names of `pd.json_normalize([obj.to_dict()])`,
+    but the dataclasses are walked directly without creating intermediate dicts.
+
+    :param obj: Dataclass object (e.g. a Step)
+    :type obj: Any
+    :param prefix: Prefix of the keys, defaults to ""
+    :type prefix: str, optional
+    :param out: Dict to write the leaf values into, defaults to a new dict
+    :type out: Optional[Dict[str, Any]], optional
+    :return: Flattened dict
+    :rtype: Dict[str, Any]
+    """
+    if out is None:
+        out = {}
+    cls = type(obj)
+    names = _FIELD_NAMES.get(cls)
+    if names is None:
+        names = tuple(f.name for f in dataclasses.fields(obj))
+        _FIELD_NAMES[cls] = names
+    for name in names:
+        value = getattr(obj, name)
+        key = prefix + name
+        if dataclasses.is_dataclass(value):
+            flatten_step(value, key + ".", out)
+        else:
+            out[key] = value
+    return out
+
+
+def unflatten_step(row: Dict[str, Any]) -> Step:
+    """Rebuild a Step from its flattened columns, e.g. a row read back from a saved match.
+    Missing values (None or NaN) are left out, so that optional objects which were not recorded stay None.
+    Enum columns saved as categories (enum names) are converted back to their values.
+    Player links stored as Poses instead of Frames (as done by the referee) are rebuilt as Poses.
+
+    :param row: Flattened step
+    :type row: Dict[str, Any]
+    :return: Step
+    :rtype: Step
+    """
+    nested: Dict[str, Any] = {}
+    for key, value in row.items():
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            continue
+        if isinstance(value, str):
+            enum = enum_of_column(key)
+            if enum is not None:
+                value = enum[value].value
+        node = nested
+        *parents, name = key.split(".")
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[name] = value
+
+    # Links stored as Poses have position and rotation columns instead of pose columns, they are set after the
+    # Step is built since from_dict would expect Frames
+    poses: List[Tuple[str, str, str, Pose]] = []
+    for team_name, team in (nested.get("teams") or {}).items():
+        if not isinstance(team, dict):
+            continue
+        for player_name, player in team.items():
+            if not isinstance(player, dict):
+                continue
+            for link, value in list(player.items()):
+                if isinstance(value, dict) and "position" in value and "pose" not in value:
+                    poses.append((team_name, player_name, link, Pose.from_dict(player.pop(link))))
+    for team_name, player_name, link, pose in poses:
+        player = nested["teams"][team_name][player_name]
+        player[link] = {"id": link, "pose": pose.to_dict()}  # placeholder Frame, replaced below
+
+    step = Step.from_dict(nested)
+    for team_name, player_name, link, pose in poses:
+        setattr(getattr(getattr(step.teams, team_name), player_name), link, pose)
+    return step
+
+
+class _Column:
+    def __init__(self, kind: int, capacity: int, size: int) -> None:
+        """Growable NumPy array with a validity mask.
+
+        :param kind: Column kind
+        :type kind: int
+        :param capacity: Initial capacity
+        :type capacity: int
+        :param size: Number of (invalid) rows to backfill the column with
+        :type size: int
+        """
+        self.kind: int = kind
+        self.data: np.ndarray = np.zeros(capacity, dtype=_DTYPES[kind])
+        self.valid: np.ndarray = np.zeros(capacity, dtype=np.bool_)
+        if kind == _FLOAT:
+            self.data[:size] = np.nan
+
+    def grow(self, capacity: int) -> None:
+        """Grow the column to a new capacity. Previously returned views stay valid.
+
+        :param capacity: New capacity
+        :type capacity: int
+        """
+        data = np.zeros(capacity, dtype=self.data.dtype)
+        data[: len(self.data)] = self.data
+        valid = np.zeros(capacity, dtype=np.bool_)
+        valid[: len(self.valid)] = self.valid
+        self.data = data
+        self.valid = valid
+
+    def promote(self, kind: int, size: int) -> None:
+        """Promote the column to a more general kind.
+
+        :param kind: New column kind
+        :type kind: int
+        :param size: Number of rows already written
+        :type size: int
+        """
+        data = self.data.astype(_DTYPES[kind])
+        if kind == _FLOAT:
+            data[:size][~self.valid[:size]] = np.nan
+        elif kind == _OBJECT:
+            data[:size][~self.valid[:size]] = None
+        self.kind = kind
+        self.data = data
+
+    def to_arrow(self, start: int, stop: int) -> pa.Array:
+        """Convert a range of rows of the column to an Arrow array.
+        Float and int columns without missing values are converted without copying.
+
+        :param start: First row to convert
+        :type start: int
+        :param stop: Row after the last row to convert
+        :type stop: int
+        :return: Arrow array
+        :rtype: pa.Array
+        """
+        valid = self.valid[start:stop]
+        if valid.all():
+            mask = None
+        elif not valid.any():
+            return pa.nulls(stop - start)
+        else:
+            mask = ~valid
+        if self.kind == _OBJECT:
+            return pa.array(self.data[start:stop], mask=mask, from_pandas=True)
+        return pa.array(self.data[start:stop], mask=mask)
+
+
+class _AffineColumn(_Column):
+    def __init__(self, capacity: int) -> None:
+        """Growable float buffer of affine matrices (16 floats per row) with a validity mask.
+
+        :param capacity: Initial capacity
+        :type capacity: int
+        """
+        self.kind: int = _OBJECT
+        self.data: np.ndarray = np.full((capacity, 16), np.nan)
+        self.valid: np.ndarray = np.zeros(capacity, dtype=np.bool_)
+
+    def grow(self, capacity: int) -> None:
+        """Grow the column to a new capacity.
+
+        :param capacity: New capacity
+        :type capacity: int
+        """
+        data = np.full((capacity, 16), np.nan)
+        data[: len(self.data)] = self.data
+        valid = np.zeros(capacity, dtype=np.bool_)
+        valid[: len(self.valid)] = self.valid
+        self.data = data
+        self.valid = valid
+
+    def to_arrow(self, start: int, stop: int) -> pa.Array:
+        """Convert a range of rows of the column to an Arrow array of fixed size lists.
+
+        :param start: First row to convert
+        :type start: int
+        :param stop: Row after the last row to convert
+        :type stop: int
+        :return: Arrow array
+        :rtype: pa.Array
+        """
+        valid = self.valid[start:stop]
+        mask = None if valid.all() else pa.array(~valid)
+        return pa.FixedSizeListArray.from_arrays(pa.array(self.data[start:stop].reshape(-1)), 16, mask=mask)
+
+
+def _affine_to_arrow(affine: np.ndarray) -> pa.Array:
+    """Convert a single affine matrix to an Arrow array of the same type as an _AffineColumn.
+
+    :param affine: Affine matrix as 16 floats
+    :type affine: np.ndarray
+    :return: Arrow array with one row
+    :rtype: pa.Array
+    """
+    return pa.FixedSizeListArray.from_arrays(pa.array(np.asarray(affine, dtype=np.float64).reshape(-1)), 16)
+
+
+class ColumnarMatch(Match):
+    def __init__(self, static: StaticMatchInfo, initial_capacity: int = 1024) -> None:
+        """Holds static and dynamic data about a match.
+        Unlike Match, only the current step is kept as a Step object. All previous steps are written into
+        growable NumPy column arrays, named like the flattened columns of the saved dataframe.
+        The matrices of AffinePoses are written into 2D float buffers and only converted when exporting.
+
+        :param static: Static match info
+        :type static: StaticMatchInfo
+        :param initial_capacity: Initial number of steps the columns can hold before growing, defaults to 1024
+        :type initial_capacity: int, optional
+        """
+        super().__init__(static)
+
+        self._columns: Dict[str, _Column] = {}
+        self._capacity: int = max(1, initial_capacity)
+        self._size: int = 0  # Number of steps written into the columns
+        self._current_step: Optional[Step] = None
+        self._lock: Lock = Lock()  # Protects the columns from concurrent saving (e.g. autosave thread)
+
+    def __len__(self) -> int:
+        return self._size + (self._current_step is not None)
+
+    def get_steps(self) -> List[Step]:
+        """Get the steps of the match. Steps are not kept as objects by this backend: the previous steps are rebuilt
+        from the columns (AffinePoses are rebuilt as Poses), only the current step is the object that was added.
+        Prefer get_dataframe() or to_arrow() to process the steps.
+
+        :return: Steps of the match
+        :rtype: List[Step]
+        """
+        with self._lock:
+            size = self._size
+            current_step = self._current_step
+        table = self.to_arrow(0, size) if size > 0 else None
+        steps = [] if table is None else [unflatten_step(row) for row in table.to_pandas().to_dict("records")]
+        if current_step is not None:
+            steps.append(current_step)
+        return steps
+
+    def add_step(self, step: Step) -> None:
+        """Add a step to the match. The previous step is written into the columns.
+
+        :param step: Step data
+        :type step: Step
+        """
+        row = flatten_step(self._current_step) if self._current_step is not None else None
+        with self._lock:
+            if row is not None:
+                self._append_row(row)
+            self._current_step = step
+
+    def current_step(self) -> Step:
+        """Get the current step.
+
+        :raises Exception: If there are no steps in the match
+        :return: Current step
+        :rtype: Step
+        """
+        if self._current_step is None:
+            raise Exception("No steps in match")
+        return self._current_step
+
+    def _append_row(self, row: Dict[str, Any]) -> None:
+        """Write a flattened step into the columns. Must be called while holding the lock.
+
+        :param row: Flattened step
+        :type row: Dict[str, Any]
+        """
+        index = self._size
+        if index == self._capacity:
+            self._capacity *= 2
+            for column in self._columns.values():
+                column.grow(self._capacity)
+        for name, value in row.items():
+            column = self._columns.get(name)
+            if value is None:
+                if column is None:  # Create the column, so that the column order matches json_normalize
+                    self._columns[name] = _Column(_BOOL, self._capacity, index + 1)
+                continue
+            if isinstance(value, np.ndarray):
+                if not isinstance(column, _AffineColumn):
+                    if column is not None and column.valid[:index].any():
+                        raise ValueError(f"Column '{name}' holds both affine matrices and other values")
+                    column = _AffineColumn(self._capacity)
+                    self._columns[name] = column
+                column.data[index] = value
+                column.valid[index] = True
+                continue
+            kind = _kind_of(value)
+            if isinstance(column, _AffineColumn):
+                raise ValueError(f"Column '{name}' holds both affine matrices and other values")
+            if column is None:
+                column = _Column(kind, self._capacity, index)
+                self._columns[name] = column
+            elif kind != column.kind:
+                if not column.valid[:index].any():
+                    column.promote(kind, index)  # Column only had missing values so far
+                elif kind > column.kind:
+                    column.promote(_OBJECT if column.kind == _BOOL or kind == _OBJECT else kind, index)
+                elif column.kind == _OBJECT or (column.kind == _FLOAT and kind == _INT):
+                    pass  # Value fits into the column
+                else:
+                    column.promote(_OBJECT, index)
+            column.data[index] = value
+            column.valid[index] = True
+        self._size = index + 1
+
+    def to_arrow(self, start: int = 0, stop: Optional[int] = None) -> Optional[pa.Table]:
+        """Convert a range of steps of the match to an Arrow table.
+        The current step is only included if the range reaches the end of the match.
+        AffinePoses are converted to the columns of a Pose.
+
+        :param start: Index of the first step, defaults to 0
+        :type start: int, optional
+        :param stop: Index after the last step, defaults to None (end of the match, including the current step)
+        :type stop: Optional[int], optional
+        :return: Arrow table, None if there are no steps in the range
+        :rtype: Optional[pa.Table]
+        """
+        with self._lock:
+            size = self._size
+            include_current = self._current_step is not None and (stop is None or stop > size)
+            stop = size if stop is None else min(stop, size)
+            start = min(start, stop)
+            names = list(self._columns.keys())
+            arrays = {name: column.to_arrow(start, stop) for name, column in self._columns.items()}
+            current_step = self._current_step
+        pending: Dict[str, Any] = flatten_step(current_step) if include_current else {}
+        size = stop - start
+        if size == 0 and not pending:
+            return None
+        if not pending:
+            return expand_affine_columns(pa.table([arrays[name] for name in names], names=names))
+        for name in pending:
+            if name not in arrays:
+                names.append(name)
+                arrays[name] = pa.nulls(size)
+
+        columns = []
+        for name in names:
+            array = arrays[name]
+            value = pending.get(name)
+            if value is None:
+                columns.append(pa.chunked_array([array, pa.nulls(1, array.type)]))
+                continue
+            if isinstance(value, np.ndarray):
+                last = _affine_to_arrow(value)
+            else:
+                last = pa.array([value], from_pandas=True)
+            if array.type != last.type:
+                if pa.types.is_null(array.type):
+                    array = pa.nulls(size, last.type)
+                elif pa.types.is_null(last.type):
+                    last = pa.nulls(1, array.type)
+                else:  # The current step does not fit the column type
+                    array = array.cast(pa.float64()) if pa.types.is_integer(array.type) else array
+                    last = last.cast(array.type)
+            columns.append(pa.chunked_array([array, last]))
+        return expand_affine_columns(pa.table(columns, names=names))
+
+    def get_dataframe(self) -> pd.DataFrame:
+        """Get all steps of the match (including the current one) as a flattened dataframe.
+
+        :return: Dataframe with one row per step
+        :rtype: pd.DataFrame
+        """
+        table = self.to_arrow()
+        if table is None:
+            return pd.DataFrame()
+        return table.to_pandas()
+
+    def save(
+        self,
+        save_dir: os.PathLike,
+        file_name: str,
+        logger=None,
+        also_as_pickle: bool = True,
+        options: Optional[SaveOptions] = None,
+    ) -> None:
+        """Save match as a dataframe to filesystem.
+        The columns are converted to Arrow directly, without building a dataframe from the steps first.
+
+        :param save_dir: Path to directory where to store match data
+        :type save_dir: os.PathLike
+        :param file_name: Name under which to store the match data (without file extension)
+        :type file_name: str
+        :param logger: Logger, defaults to None
+        :type logger: Optional[Logger], optional
+        :param also_as_pickle: Whether dynamic match data should also be saved as a pickle file, defaults to True
+        :type also_as_pickle: bool, optional
+        :param options: Compression and column types of the saved data, overrides also_as_pickle, defaults to None
+        :type options: Optional[SaveOptions], optional
+        """
+        if logger:
+            logger.info(f"Saving data collection to '{save_dir}' as '{file_name}.*'...")
+
+        # Save static match info
+        json_data: str = self.get_static_match_info().to_json()
+        with open(os.path.join(save_dir, file_name + ".json"), "w") as f:
+            f.write(json_data)
+
+        # Save dynamic match info
+        table = self.to_arrow()
+        if table is not None:
+            if options is None:
+                options = SaveOptions(also_as_pickle=also_as_pickle)
+            options.write(table, save_dir, file_name)
@@ -0,0 +1,247 @@
+import dataclasses
+import os
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .player import Player, RobotInfo
+from .step import GameControlData
+from .team import Team, Teams
+
+# Names of the event tables, also used in the file names (<file_name>.<table>.feather)
+GAME_CONTROL_DATA_EVENTS = "game_control_data"
+ROBOT_INFO_EVENTS = "robot_info"
+
+# Clock fields, which change every second: they would add an event every second, so they are kept in the steps
+GAME_CONTROL_DATA_CLOCKS = ("seconds_remaining", "secondary_seconds_remaining", "drop_in_time")
+ROBOT_INFO_CLOCKS = ("secs_till_unpenalized",)
+
+
+def _players(team: Team) -> List[Tuple[str, Player]]:
+    """Get the players of a team, whatever the number of player fields of the team.
+
+    :param team: Team
+    :type team: Team
+    :return: Names of the player fields and players, the fields without a player are skipped
+    :rtype: List[Tuple[str, Player]]
+    """
+    players = []
+    for field in dataclasses.fields(team):
+        value = getattr(team, field.name)
+        if isinstance(value, Player):
+            players.append((field.name, value))
+    return players
+
+
+class EventTable:
+    def __init__(self, key_columns: Tuple[str, ...], value_columns: Tuple[str, ...]) -> None:
+        """Table of change events: a row (time, key, value) is only added if the value of the key
+        is different from the previous value of the same key.
+
+        :param key_columns: Names of the columns identifying the entity that changes (e.g. team and player)
+        :type key_columns: Tuple[str, ...]
+        :param value_columns: Names of the value columns
+        :type value_columns: Tuple[str, ...]
+        """
+        self.key_columns: Tuple[str, ...] = key_columns
+        self.value_columns: Tuple[str, ...] = value_columns
+        self._rows: List[Tuple[Any, ...]] = []
+        self._last_values: Dict[Tuple[Any, ...], Tuple[Any, ...]] = {}
+        self._lock: Lock = Lock()  # Protects the rows from concurrent saving (e.g. autosave thread)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def record(self, time: float, key: Tuple[Any, ...], values: Tuple[Any, ...]) -> bool:
+        """Record the values of a key at a time.
+
+        :param time: Time of the step in simulation in milliseconds
+        :type time: float
+        :param key: Values of the key columns
+        :type key: Tuple[Any, ...]
+        :param values: Values of the value columns
+        :type values: Tuple[Any, ...]
+        :return: True, if the values changed and an event was added
+        :rtype: bool
+        """
+        if self._last_values.get(key) == values:
+            return False
+        with self._lock:
+            self._last_values[key] = values
+            self._rows.append((time,) + key + values)
+        return True
+
+    def rows(self, start: int = 0) -> List[Tuple[Any, ...]]:
+        """Get the events added since an index.
+
+        :param start: Index of the first event, defaults to 0
+        :type start: int, optional
+        :return: Events as tuples of time, key and values
+        :rtype: List[Tuple[Any, ...]]
+        """
+        with self._lock:
+            return self._rows[start:]
+
+    def extend(self, rows: List[Tuple[Any, ...]]) -> None:
+        """Add events recorded by another table, e.g. in another process.
+
+        :param rows: Events as tuples of time, key and values
+        :type rows: List[Tuple[Any, ...]]
+        """
+        key_size = len(self.key_columns)
+        with self._lock:
+            for row in rows:
+                self._last_values[tuple(row[1 : 1 + key_size])] = tuple(row[1 + key_size :])
+                self._rows.append(tuple(row))
+
+    def to_arrow(self) -> pa.Table:
+        """Convert the events to an Arrow table with the columns time, key columns and value columns.
+
+        :return: Events
+        :rtype: pa.Table
+        """
+        names = ("time",) + self.key_columns + self.value_columns
+        rows = self.rows()
+        return pa.table({name: [row[i] for row in rows] for i, name in enumerate(names)})
+
+
+class MatchEvents:
+    def __init__(self) -> None:
+        """Change events of the data that changes rarely during a match, stored instead of repeating it in every step.
+        GameControlData is stored in one table, the RobotInfo of all players in another one.
+        The clock fields (see GAME_CONTROL_DATA_CLOCKS and ROBOT_INFO_CLOCKS) are not part of the events,
+        they stay in the steps, the other fields of the steps are None.
+        """
+        self._game_control_data_fields: Tuple[str, ...] = tuple(
+            f.name for f in dataclasses.fields(GameControlData) if f.name not in GAME_CONTROL_DATA_CLOCKS
+        )
+        self._robot_info_fields: Tuple[str, ...] = tuple(
+            f.name for f in dataclasses.fields(RobotInfo) if f.name not in ROBOT_INFO_CLOCKS
+        )
+        self.tables: Dict[str, EventTable] = {
+            GAME_CONTROL_DATA_EVENTS: EventTable((), self._game_control_data_fields),
+            ROBOT_INFO_EVENTS: EventTable(("team", "player"), self._robot_info_fields),
+        }
+
+    def record_game_control_data(self, time: float, game_control_data: GameControlData) -> GameControlData:
+        """Record the game control data of a step.
+
+        :param time: Time of the step in simulation in milliseconds
+        :type time: float
+        :param game_control_data: Game control data
+        :type game_control_data: GameControlData
+        :return: Game control data to store in the step, with the clock fields only
+        :rtype: GameControlData
+        """
+        values = tuple(getattr(game_control_data, name) for name in self._game_control_data_fields)
+        self.tables[GAME_CONTROL_DATA_EVENTS].record(time, (), values)
+        return dataclasses.replace(game_control_data, **{name: None for name in self._game_control_data_fields})
+
+    def record_teams(self, time: float, teams: Teams) -> Teams:
+        """Record the robot info of all players of a step.
+
+        :param time: Time of the step in simulation in milliseconds
+        :type time: float
+        :param teams: Teams of the step, not modified
+        :type teams: Teams
+        :return: Teams to store in the step, a copy of teams with the clock fields only in the robot infos
+        :rtype: Teams
+        """
+        team_copies = {}
+        for team_name in ("team1", "team2"):
+            team = getattr(teams, team_name)
+            if team is None:
+                continue
+            player_copies = {}
+            for player_name, player in _players(team):
+                if player.robot_info is None:
+                    continue
+                robot_info = player.robot_info
+                values = tuple(getattr(robot_info, name) for name in self._robot_info_fields)
+                self.tables[ROBOT_INFO_EVENTS].record(time, (team_name, player_name), values)
+                clocks = dataclasses.replace(robot_info, **{name: None for name in self._robot_info_fields})
+                player_copies[player_name] = dataclasses.replace(player, robot_info=clocks)
+            if player_copies:
+                team_copies[team_name] = dataclasses.replace(team, **player_copies)
+        return dataclasses.replace(teams, **team_copies) if team_copies else teams
+
+    def save(self, save_dir: os.PathLike, file_name: str) -> None:
+        """Save the event tables which are not empty as <file_name>.<table>.feather.
+
+        :param save_dir: Path to directory where to store the event tables
+        :type save_dir: os.PathLike
+        :param file_name: Name under which the match data is stored (without file extension)
+        :type file_name: str
+        """
+        for name, table in self.tables.items():
+            if len(table) > 0:
+                feather.write_feather(table.to_arrow(), os.path.join(save_dir, f"{file_name}.{name}.feather"))
+
+
+def event_file_suffixes() -> List[str]:
+    """Get the suffixes of the event table files, to be appended to the file name of a match.
+
+    :return: File suffixes
+    :rtype: List[str]
+    """
+    return [f".{name}.feather" for name in (GAME_CONTROL_DATA_EVENTS, ROBOT_INFO_EVENTS)]
+
+
+def read_events(save_dir: os.PathLike, file_name: str) -> Dict[str, pd.DataFrame]:
+    """Read the event tables of a recorded match.
+
+    :param save_dir: Path to directory where the match data is stored
+    :type save_dir: os.PathLike
+    :param file_name: Name under which the match data is stored (without file extension)
+    :type file_name: str
+    :return: Event tables by name, tables without any event are missing
+    :rtype: Dict[str, pd.DataFrame]
+    """
+    events = {}
+    for name in (GAME_CONTROL_DATA_EVENTS, ROBOT_INFO_EVENTS):
+        path = os.path.join(save_dir, f"{file_name}.{name}.feather")
+        if os.path.exists(path):
+            events[name] = pd.read_feather(path)
+    return events
+
+
+def apply_events(steps: pd.DataFrame, events: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Reconstruct the per-step view of the event tables with an as-of join on the time column.
+    The resulting columns are named like if the data had been stored in every step
+    (e.g. `game_control_data.game_state`, `teams.team1.player1.robot_info.penalty`).
+
+    :param steps: Steps of a match, must be sorted by time
+    :type steps: pd.DataFrame
+    :param events: Event tables by name, as returned by `read_events`
+    :type events: Dict[str, pd.DataFrame]
+    :return: Steps with the event columns added
+    :rtype: pd.DataFrame
+    """
+    times = steps[["time"]].astype("float64")
+    columns = {}
+
+    game_control_data: Optional[pd.DataFrame] = events.get(GAME_CONTROL_DATA_EVENTS)
+    if game_control_data is not None and len(game_control_data) > 0:
+        merged = pd.merge_asof(times, game_control_data.astype({"time": "float64"}), on="time")
+        for name in game_control_data.columns.drop("time"):
+            columns[f"game_control_data.{name}"] = merged[name].to_numpy()
+
+    robot_info: Optional[pd.DataFrame] = events.get(ROBOT_INFO_EVENTS)
+    if robot_info is not None and len(robot_info) > 0:
+        value_columns = robot_info.columns.drop(["time", "team", "player"])
+        for (team_name, player_name), group in robot_info.groupby(["team", "player"], sort=True):
+            merged = pd.merge_asof(times, group.drop(columns=["team", "player"]).astype({"time": "float64"}), on="time")
+            for name in value_columns:
+                columns[f"teams.{team_name}.{player_name}.robot_info.{name}"] = merged[name].to_numpy()
+
+    # Placeholders of the data stored in the event tables instead of in every step
+    placeholders = [
+        name
+        for name in steps.columns
+        if name in columns
+        or ((name == "game_control_data" or name.endswith(".robot_info")) and steps[name].isna().all())
+    ]
+    return pd.concat([steps.drop(columns=placeholders), pd.DataFrame(columns, index=steps.index)], axis=1)
@@ -1,8 +1,11 @@
 import os
-from typing import List
+from typing import List, Optional
 
 import pandas as pd
+import pyarrow as pa
 
+from .pose import expand_affine_columns, has_affine_columns
+from .save_options import SaveOptions
 from .static_match_info import StaticMatchInfo
 from .step import Step
 
@@ -18,6 +21,9 @@ class Match:
 
         self._steps: List[Step] = []
 
+    def __len__(self) -> int:
+        return len(self._steps)
+
     def get_static_match_info(self) -> StaticMatchInfo:
         """Get the static match info.
 
@@ -53,12 +59,30 @@ class Match:
             raise Exception("No steps in match")
         return self._steps[-1]
 
+    def to_arrow(self, start: int = 0, stop: Optional[int] = None) -> Optional[pa.Table]:
+        """Convert a range of steps of the match to an Arrow table.
+        AffinePoses are converted to the columns of a Pose.
+
+        :param start: Index of the first step, defaults to 0
+        :type start: int, optional
+        :param stop: Index after the last step, defaults to None (end of the match)
+        :type stop: Optional[int], optional
+        :return: Arrow table, None if there are no steps in the range
+        :rtype: Optional[pa.Table]
+        """
+        steps = self.get_steps()[start:stop]
+        if not steps:
+            return None
+        df: pd.DataFrame = pd.json_normalize([step.to_dict() for step in steps])
+        return expand_affine_columns(pa.Table.from_pandas(df, preserve_index=False))
+
     def save(
         self,
         save_dir: os.PathLike,
         file_name: str,
         logger=None,
         also_as_pickle: bool = True,
+        options: Optional[SaveOptions] = None,
     ) -> None:
         """Save match as a dataframe to filesystem.
 
@@ -70,6 +94,8 @@ class Match:
         :type logger: Optional[Logger], optional
         :param also_as_pickle: Whether dynamic match data should also be saved as a pickle file, defaults to True
         :type also_as_pickle: bool, optional
+        :param options: Compression and column types of the saved data, overrides also_as_pickle, defaults to None
+        :type options: Optional[SaveOptions], optional
         """
         if logger:
             logger.info(f"Saving data collection to '{save_dir}' as '{file_name}.*'...")
@@ -83,6 +109,11 @@ class Match:
         steps = self.get_steps()
         if steps:
             df: pd.DataFrame = pd.json_normalize([step.to_dict() for step in steps])
-            df.to_feather(os.path.join(save_dir, file_name + ".feather"))
-            if also_as_pickle:
-                df.to_pickle(os.path.join(save_dir, file_name + ".pkl"))
+            if options is None and not has_affine_columns(df.columns):
+                df.to_feather(os.path.join(save_dir, file_name + ".feather"))
+                if also_as_pickle:
+                    df.to_pickle(os.path.join(save_dir, file_name + ".pkl"))
+            else:
+                if options is None:
+                    options = SaveOptions(also_as_pickle=also_as_pickle)
+                options.write(expand_affine_columns(pa.Table.from_pandas(df, preserve_index=False)), save_dir, file_name)
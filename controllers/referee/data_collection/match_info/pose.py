@@ -1,7 +1,8 @@
 from dataclasses import dataclass
-from typing import Tuple
+from typing import List, Tuple
 
 import numpy as np
+import pyarrow as pa
 import transforms3d
 from dataclasses_json import DataClassJsonMixin
 
@@ -73,6 +74,91 @@ class Pose(DataClassJsonMixin):
     rotation: Rotation
 
 
+@dataclass(frozen=True)
+class AffinePose(DataClassJsonMixin):
+    """Pose of an object in 3D space as captured from Webots, without any conversion.
+    Stored instead of a Pose to keep the conversion out of the simulation loop.
+    When the match data is exported, it is converted to the same columns as a Pose (see `expand_affine_columns`).
+
+    :param affine: Affine matrix as 16 floats (row-major 4x4 matrix)
+    :type affine: np.ndarray
+    """
+
+    affine: np.ndarray
+
+
+# Suffix of the flattened column names of AffinePose objects
+AFFINE_COLUMN_SUFFIX = ".affine"
+
+
+def affines_to_arrays(affines: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert a batch of affine matrices to positions and quaternions.
+    Uses a closed-form conversion of the rotation matrices (choosing the numerically most stable of the four
+    formulas per matrix) instead of an eigen-decomposition per matrix.
+
+    The quaternions have the same component order as the one used by `pose_from_affine` to fill the Rotation
+    (the transforms3d order, w first) and their first component is non-negative, like `transforms3d.quaternions.mat2quat`.
+
+    :param affines: Affine matrices with shape (N, 16) or (N, 4, 4), a single matrix is also accepted
+    :type affines: np.ndarray
+    :return: Positions with shape (N, 3) and quaternions with shape (N, 4)
+    :rtype: Tuple[np.ndarray, np.ndarray]
+    """
+    matrices = np.asarray(affines, dtype=np.float64).reshape(-1, 4, 4)
+    positions = matrices[:, :3, 3].copy()
+
+    m = matrices[:, :3, :3]
+    m00, m01, m02 = m[:, 0, 0], m[:, 0, 1], m[:, 0, 2]
+    m10, m11, m12 = m[:, 1, 0], m[:, 1, 1], m[:, 1, 2]
+    m20, m21, m22 = m[:, 2, 0], m[:, 2, 1], m[:, 2, 2]
+
+    # 4 * (component ** 2) for w, x, y and z, the largest one is used to compute the other components
+    squares = np.stack(
+        [
+            1.0 + m00 + m11 + m22,
+            1.0 + m00 - m11 - m22,
+            1.0 - m00 + m11 - m22,
+            1.0 - m00 - m11 + m22,
+        ],
+        axis=1,
+    )
+    largest = np.argmax(squares, axis=1)
+    s = 2.0 * np.sqrt(np.maximum(squares[np.arange(len(largest)), largest], 0.0))
+    # Avoid dividing by zero for degenerate (e.g. all zero) matrices, their quaternion is not meaningful anyway
+    s[s == 0.0] = 1.0
+
+    quaternions = np.empty((len(matrices), 4))
+    for index, (w, x, y, z) in enumerate(
+        [
+            (0.25 * s, (m21 - m12) / s, (m02 - m20) / s, (m10 - m01) / s),
+            ((m21 - m12) / s, 0.25 * s, (m01 + m10) / s, (m02 + m20) / s),
+            ((m02 - m20) / s, (m01 + m10) / s, 0.25 * s, (m12 + m21) / s),
+            ((m10 - m01) / s, (m02 + m20) / s, (m12 + m21) / s, 0.25 * s),
+        ]
+    ):
+        mask = largest == index
+        quaternions[mask] = np.stack([w[mask], x[mask], y[mask], z[mask]], axis=1)
+
+    quaternions /= np.linalg.norm(quaternions, axis=1, keepdims=True)
+    quaternions[quaternions[:, 0] < 0] *= -1
+    return positions, quaternions
+
+
+def poses_from_affines(affines: np.ndarray) -> List[Pose]:
+    """Convert a batch of affine matrices to Poses, e.g. all frames captured in a step.
+
+    :param affines: Affine matrices with shape (N, 16) or (N, 4, 4), a single matrix is also accepted
+    :type affines: np.ndarray
+    :return: Poses
+    :rtype: List[Pose]
+    """
+    positions, quaternions = affines_to_arrays(affines)
+    return [
+        Pose(Position(*position), Rotation(*quaternion))
+        for position, quaternion in zip(positions.tolist(), quaternions.tolist())
+    ]
+
+
 def pose_from_affine(affine: np.ndarray) -> Pose:
     """Convert a 4x4 or 16(x1) affine matrix to a Pose.
 
@@ -81,10 +167,56 @@ def pose_from_affine(affine: np.ndarray) -> Pose:
     :return: Pose
     :rtype: Pose
     """
-    # Reshape 16x1 to 4x4
-    if affine.shape == (16,):
-        affine = affine.reshape(4, 4)
+    return poses_from_affines(affine)[0]
+
+
+def has_affine_columns(column_names: List[str]) -> bool:
+    """Check whether flattened match data contains AffinePose columns.
 
-    position = Position(affine[0, 3], affine[1, 3], affine[2, 3])
-    rotation = Rotation(*transforms3d.quaternions.mat2quat(affine[:3, :3]))
-    return Pose(position, rotation)
+    :param column_names: Names of the flattened columns
+    :type column_names: List[str]
+    :return: True, if there is at least one AffinePose column
+    :rtype: bool
+    """
+    return any(name.endswith(AFFINE_COLUMN_SUFFIX) for name in column_names)
+
+
+def expand_affine_columns(table: pa.Table) -> pa.Table:
+    """Convert the AffinePose columns of flattened match data to the columns of a Pose.
+    All rows of a column are converted at once. A column `<frame>.affine` is replaced in place by
+    `<frame>.position.x`, ..., `<frame>.rotation.w`, like if Poses had been stored in the first place.
+
+    :param table: Flattened match data
+    :type table: pa.Table
+    :return: Flattened match data without AffinePose columns
+    :rtype: pa.Table
+    """
+    if not has_affine_columns(table.column_names):
+        return table
+
+    names = []
+    columns = []
+    for name, column in zip(table.column_names, table.columns):
+        if not name.endswith(AFFINE_COLUMN_SUFFIX):
+            names.append(name)
+            columns.append(column)
+            continue
+
+        prefix = name[: -len(AFFINE_COLUMN_SUFFIX)]
+        column = column.combine_chunks()
+        valid = column.is_valid().to_numpy(zero_copy_only=False)
+        positions = np.full((len(column), 3), np.nan)
+        quaternions = np.full((len(column), 4), np.nan)
+        if valid.any() and not pa.types.is_null(column.type):
+            affines = column.filter(valid).flatten().to_numpy(zero_copy_only=False).reshape(-1, 16)
+            positions[valid], quaternions[valid] = affines_to_arrays(affines)
+        mask = None if valid.all() else ~valid
+
+        for i, axis in enumerate(("x", "y", "z")):
+            names.append(f"{prefix}.position.{axis}")
+            columns.append(pa.array(positions[:, i], mask=mask))
+        # Same field order as pose_from_affine
+        for i, axis in enumerate(("x", "y", "z", "w")):
+            names.append(f"{prefix}.rotation.{axis}")
+            columns.append(pa.array(quaternions[:, i], mask=mask))
+    return pa.table(columns, names=names)
@@ -0,0 +1,153 @@
+import os
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Dict, Optional, Type
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from .player import Action, Penalty, Role, State
+from .step import GameControlData
+
+COMPRESSIONS = ("lz4", "zstd", "uncompressed")
+ENUM_ENCODINGS = ("uint8", "category")
+
+# Suffixes of the flattened columns holding enum values
+_ENUM_COLUMN_SUFFIXES: Dict[str, Type[IntEnum]] = {
+    "game_control_data.game_state": GameControlData.GameState,
+    "game_control_data.secondary_state": GameControlData.SecondaryGameState,
+    ".robot_info.penalty": Penalty,
+    ".state": State,
+    ".role": Role,
+    ".action": Action,
+}
+
+
+@dataclass(frozen=True)
+class SaveOptions:
+    """Options for writing the dynamic match data.
+
+    :param compression: Compression codec of the feather file (lz4, zstd or uncompressed), defaults to None (lz4)
+    :type compression: Optional[str], optional
+    :param compression_level: Compression level, defaults to None (default level of the codec)
+    :type compression_level: Optional[int], optional
+    :param float32_poses: Whether to store positions and rotations as float32 instead of float64, defaults to False
+    :type float32_poses: bool, optional
+    :param enum_encoding: Encoding of the enum columns (game state, penalty, role, ...): uint8 for their values
+        as the smallest integer type, category for their names as dictionary (pandas categorical) columns,
+        defaults to None (int64 values)
+    :type enum_encoding: Optional[str], optional
+    :param also_as_pickle: Whether dynamic match data should also be saved as a pickle file, defaults to True
+    :type also_as_pickle: bool, optional
+    """
+
+    compression: Optional[str] = None
+    compression_level: Optional[int] = None
+    float32_poses: bool = False
+    enum_encoding: Optional[str] = None
+    also_as_pickle: bool = True
+
+    def __post_init__(self) -> None:
+        if self.compression is not None and self.compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression '{self.compression}', expected one of {COMPRESSIONS}")
+        if self.enum_encoding is not None and self.enum_encoding not in ENUM_ENCODINGS:
+            raise ValueError(f"Unknown enum encoding '{self.enum_encoding}', expected one of {ENUM_ENCODINGS}")
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "SaveOptions":
+        """Create save options from the data collection configuration of the game.json.
+
+        :param config: Data collection configuration
+        :type config: Dict
+        :return: Save options
+        :rtype: SaveOptions
+        """
+        return cls(
+            compression=config.get("compression"),
+            compression_level=config.get("compression_level"),
+            float32_poses=config.get("float32_poses", False),
+            enum_encoding=config.get("enum_encoding"),
+            also_as_pickle=config.get("save_pickle", True),
+        )
+
+    def convert(self, table: pa.Table) -> pa.Table:
+        """Convert the column types of flattened match data according to the options.
+
+        :param table: Flattened match data
+        :type table: pa.Table
+        :return: Converted match data
+        :rtype: pa.Table
+        """
+        if not self.float32_poses and self.enum_encoding is None:
+            return table
+        columns = []
+        for name, column in zip(table.column_names, table.columns):
+            if self.float32_poses and (".position." in name or ".rotation." in name) and _is_numeric(column.type):
+                column = column.cast(pa.float32())
+            elif self.enum_encoding is not None and pa.types.is_integer(column.type):
+                enum = enum_of_column(name)
+                if enum is not None:
+                    column = _encode_enum(column, enum, self.enum_encoding)
+            columns.append(column)
+        return pa.table(columns, names=table.column_names)
+
+    def write(self, table: pa.Table, save_dir: os.PathLike, file_name: str) -> None:
+        """Write flattened match data as <file_name>.feather (and <file_name>.pkl).
+
+        :param table: Flattened match data
+        :type table: pa.Table
+        :param save_dir: Path to directory where to store match data
+        :type save_dir: os.PathLike
+        :param file_name: Name under which to store the match data (without file extension)
+        :type file_name: str
+        """
+        table = self.convert(table)
+        feather.write_feather(
+            table,
+            os.path.join(save_dir, file_name + ".feather"),
+            compression=self.compression,
+            compression_level=self.compression_level,
+        )
+        if self.also_as_pickle:
+            table.to_pandas().to_pickle(os.path.join(save_dir, file_name + ".pkl"))
+
+
+def _is_numeric(type: pa.DataType) -> bool:
+    return pa.types.is_floating(type) or pa.types.is_integer(type)
+
+
+def enum_of_column(name: str) -> Optional[Type[IntEnum]]:
+    """Get the enum of a flattened column.
+
+    :param name: Name of the column
+    :type name: str
+    :return: Enum type, None if the column does not hold enum values
+    :rtype: Optional[Type[IntEnum]]
+    """
+    for suffix, enum in _ENUM_COLUMN_SUFFIXES.items():
+        if name.endswith(suffix):
+            return enum
+    return None
+
+
+def _encode_enum(column: pa.ChunkedArray, enum: Type[IntEnum], encoding: str) -> pa.ChunkedArray:
+    """Encode a column of enum values.
+
+    :param column: Enum values
+    :type column: pa.ChunkedArray
+    :param enum: Enum type
+    :type enum: Type[IntEnum]
+    :param encoding: uint8 or category
+    :type encoding: str
+    :return: Encoded column
+    :rtype: pa.ChunkedArray
+    """
+    if encoding == "uint8":
+        return column.cast(pa.uint8())
+    # Lookup table from value to name, all enums have values between 0 and 255
+    names = np.full(256, None, dtype=object)
+    for member in enum:
+        names[member.value] = member.name
+    return pc.take(pa.array(names, type=pa.string()), column.cast(pa.uint8())).dictionary_encode()
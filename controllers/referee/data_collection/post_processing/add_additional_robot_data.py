@@ -34,20 +34,37 @@ def fill_in_additional_player_data(data_collection: Dict, additional_data: Dict)
             player.update(player_additional_data)
 
 
-if __name__ == "__main__":
+def add_additional_robot_data(additional_data_path: str, data_collection_path: str) -> bool:
+    """
+    Fills in the additional player data to a data collection json file.
+    The file is only written if it changes, so that processed files keep their modification time
+
+    :param additional_data_path: Path to the additional data json file
+    :type additional_data_path: str
+    :param data_collection_path: Path to the data collection json file
+    :type data_collection_path: str
+    :return: True, if the file was changed
+    :rtype: bool
+    """
     # Load the path to the additional data json file
-    with open(sys.argv[1], "r") as f:
+    with open(additional_data_path, "r") as f:
         additional_data = json.load(f)
 
-    data_collection_path = sys.argv[2]
-
     # Load the data collection json file
     with open(data_collection_path, "r") as f:
         data_collection = json.load(f)
+    original = json.dumps(data_collection, sort_keys=True)
 
     # Fill in the additional data
     fill_in_additional_player_data(data_collection, additional_data)
+    if json.dumps(data_collection, sort_keys=True) == original:
+        return False
 
     # Save the modified data collection json file
     with open(data_collection_path, "w") as f:
         json.dump(data_collection, f, indent=4)
+    return True
+
+
+if __name__ == "__main__":
+    add_additional_robot_data(sys.argv[1], sys.argv[2])
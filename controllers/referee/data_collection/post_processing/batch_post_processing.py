@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+
+"""
+Runs the post processing of all matches of an event in a process pool:
+adds the additional robot data to the static match infos and merges the team communication into the steps.
+
+A match directory is any directory with a data_collection directory holding referee data collection files.
+Files which are already up to date are skipped, so the script can be re-run after new matches were added.
+
+Example:
+    ./batch_post_processing.py /path/to/event --workers 8
+"""
+
+from typing import Dict, List, Optional
+
+import argparse
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from add_additional_robot_data import add_additional_robot_data
+from merge_teamcomm import find_data_collection_files, merge_match
+
+DEFAULT_ADDITIONAL_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "additional_robot_data.json")
+
+
+def find_match_dirs(root: str) -> List[str]:
+    """
+    Finds all match directories below a directory
+
+    :param root: Directory to search
+    :type root: str
+    :return: Match directories, sorted
+    :rtype: List[str]
+    """
+    match_dirs = []
+    for path, dirs, _ in os.walk(root):
+        if "data_collection" in dirs and find_data_collection_files(os.path.join(path, "data_collection")):
+            match_dirs.append(path)
+    return sorted(match_dirs)
+
+
+def process_match(match_dir: str, additional_data_path: Optional[str], force: bool, long_format: bool = False) -> Dict:
+    """
+    Post processes a match, catching all errors so that one broken match does not stop the batch
+
+    :param match_dir: Match directory
+    :type match_dir: str
+    :param additional_data_path: Path to the additional robot data json file, None to skip this step
+    :type additional_data_path: Optional[str]
+    :param force: Process files that are up to date as well
+    :type force: bool
+    :param long_format: Write the team communication as a separate long table, defaults to False
+    :type long_format: bool, optional
+    :return: Summary of the match: status (processed, skipped or failed), seconds, written files and error
+    :rtype: Dict
+    """
+    start = time.perf_counter()
+    written = []
+    try:
+        if additional_data_path is not None:
+            data_collection_dir = os.path.join(match_dir, "data_collection")
+            for feather_file in find_data_collection_files(data_collection_dir):
+                json_path = os.path.join(data_collection_dir, feather_file.replace(".feather", ".json"))
+                if os.path.exists(json_path) and add_additional_robot_data(additional_data_path, json_path):
+                    written.append(json_path)
+        written.extend(merge_match(match_dir, force, long_format))
+        status, error = ("processed" if written else "skipped"), None
+    except Exception:
+        status, error = "failed", traceback.format_exc()
+    return {
+        "match_dir": match_dir,
+        "status": status,
+        "seconds": time.perf_counter() - start,
+        "written": written,
+        "error": error,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Post process all matches below a directory")
+    parser.add_argument("root", help="Directory with the match directories (e.g. of a whole event)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--additional-data", default=DEFAULT_ADDITIONAL_DATA,
+                        help="Additional robot data json file, empty to skip adding it")
+    parser.add_argument("--long-format", action="store_true",
+                        help="Write the team communication as a separate long table instead of widening the steps")
+    parser.add_argument("-f", "--force", action="store_true", help="Process matches that are up to date as well")
+    parser.add_argument("--summary", help="Summary json file, defaults to <root>/post_processing_summary.json")
+    args = parser.parse_args()
+
+    match_dirs = find_match_dirs(args.root)
+    print(f"Found {len(match_dirs)} matches in '{args.root}'")
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [
+            executor.submit(process_match, match_dir, args.additional_data or None, args.force, args.long_format)
+            for match_dir in match_dirs
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"[{len(results)}/{len(match_dirs)}] {result['status']:9} {result['seconds']:7.2f}s {result['match_dir']}")
+            if result["error"]:
+                print(result["error"])
+
+    results.sort(key=lambda result: result["match_dir"])
+    counts = {status: sum(result["status"] == status for result in results)
+              for status in ["processed", "skipped", "failed"]}
+    summary = {"root": args.root, "workers": args.workers, "seconds": time.perf_counter() - start, "counts": counts,
+               "matches": results}
+    summary_path = args.summary or os.path.join(args.root, "post_processing_summary.json")
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=4)
+    print(f"{counts['processed']} processed, {counts['skipped']} skipped, {counts['failed']} failed "
+          f"in {summary['seconds']:.1f}s, summary written to '{summary_path}'")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    exit(main())
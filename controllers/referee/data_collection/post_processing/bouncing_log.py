@@ -0,0 +1,235 @@
+#!/usr/bin/python3
+
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Union
+
+import json
+import os
+import re
+import socket
+import sys
+
+# Quoted IPs in a team definition, e.g. "['172.31.13.184', '172.31.15.77']"
+_QUOTED_IP = re.compile(rb"'([^']*)'")
+
+_TEAM_DEFINITION = b"Robots in team "
+
+# The format of the binary capture (bouncing_capture.bin) is defined by its writer, udp_bouncer.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from udp_bouncer import CAPTURE_HEADER, CAPTURE_MAGIC, CAPTURE_RECORD  # noqa: E402
+
+# Size of the chunks the capture is read in
+_CAPTURE_CHUNK_SIZE = 1 << 20
+
+
+@dataclass(frozen=True)
+class TeamDefinition:
+    """
+    IPs of the robots of a team, logged by the bouncer on startup
+
+    :param color: Team color (blue or red)
+    :type color: str
+    :param IPs: IPs of the robots
+    :type IPs: List[str]
+    """
+    color: str
+    IPs: List[str]
+
+
+@dataclass(frozen=True)
+class TeamCommPacket:
+    """
+    Team communication packet forwarded by the bouncer
+
+    :param time: Time when the bouncer received the packet (seconds since the epoch)
+    :type time: float
+    :param sender_IP: IP of the sending robot
+    :type sender_IP: str
+    :param port: Port the packet was received on
+    :type port: int
+    :param payload: Payload of the packet
+    :type payload: bytes
+    """
+    time: float
+    sender_IP: str
+    port: int
+    payload: bytes
+
+
+def _split_header(line: bytes) -> bytes:
+    """
+    Removes the "[<real time>] " header of a log line. The header grows after 10000 seconds, so it is not sliced off
+
+    :param line: Log line
+    :type line: bytes
+    :return: Body of the log line without the trailing newline
+    :rtype: bytes
+    """
+    return line[line.index(b"] ") + 2:].rstrip(b"\r\n")
+
+
+def decode_bytes_literal(literal: bytes) -> bytes:
+    """
+    Decodes the repr of a bytes object (e.g. b'\\n\\x07'), without evaluating it
+
+    :param literal: Bytes literal including the b prefix and the quotes
+    :type literal: bytes
+    :raises ValueError: If the literal is malformed
+    :return: Decoded bytes
+    :rtype: bytes
+    """
+    if len(literal) < 3 or literal[0:1] != b"b" or literal[1:2] not in (b"'", b'"') or literal[-1:] != literal[1:2]:
+        raise ValueError(f"Not a bytes literal: {literal[:32]!r}")
+    # A bytes repr is pure ASCII, only the escapes of bytes literals are interpreted
+    try:
+        return literal[2:-1].decode("unicode_escape").encode("latin-1")
+    except UnicodeError as e:
+        raise ValueError(f"Malformed bytes literal: {literal[:32]!r}") from e
+
+
+def parse_team_comm(body: bytes) -> TeamCommPacket:
+    """
+    Parses the body of a team communication line, e.g. "[1699.12, '172.31.1.9', 3737, b'\\n\\x07']"
+
+    :param body: Body of the log line
+    :type body: bytes
+    :raises ValueError: If the body is malformed
+    :return: Team communication packet
+    :rtype: TeamCommPacket
+    """
+    if body[:1] != b"[" or body[-1:] != b"]":
+        raise ValueError(f"Not a team communication packet: {body[:32]!r}")
+    # Neither the time, the IP nor the port contain ", ", the payload might
+    splits = body[1:-1].split(b", ", 3)
+    if len(splits) != 4 or len(splits[1]) < 2:
+        raise ValueError(f"Not a team communication packet: {body[:32]!r}")
+    return TeamCommPacket(
+        time=float(splits[0]),
+        sender_IP=splits[1][1:-1].decode("ascii"),
+        port=int(splits[2]),
+        payload=decode_bytes_literal(splits[3]),
+    )
+
+
+def parse_team_definition(body: bytes) -> TeamDefinition:
+    """
+    Parses the body of a team definition line, e.g. "Robots in team blue are ['172.31.13.184', '172.31.15.77']"
+
+    :param body: Body of the log line
+    :type body: bytes
+    :raises ValueError: If the body is malformed
+    :return: Team definition
+    :rtype: TeamDefinition
+    """
+    color, _, IPs = body[len(_TEAM_DEFINITION):].partition(b" are ")
+    if color not in (b"blue", b"red"):
+        raise ValueError(f"Unknown team color: {color[:32]!r}")
+    return TeamDefinition(color.decode("ascii"), [IP.decode("ascii") for IP in _QUOTED_IP.findall(IPs)])
+
+
+def parse_bouncing_log_lines(
+    lines: Iterable[bytes], team_comm_only: bool = False
+) -> Iterator[Union[TeamDefinition, TeamCommPacket]]:
+    """
+    Parses log lines of the bouncer one by one. Other lines and malformed lines are skipped
+
+    :param lines: Log lines
+    :type lines: Iterable[bytes]
+    :param team_comm_only: Only yield team communication packets, defaults to False
+    :type team_comm_only: bool, optional
+    :return: Team definitions and team communication packets in the order of the log
+    :rtype: Iterator[Union[TeamDefinition, TeamCommPacket]]
+    """
+    for line in lines:
+        try:
+            body = _split_header(line)
+            if body[:1] == b"[":
+                yield parse_team_comm(body)
+            elif not team_comm_only and body.startswith(_TEAM_DEFINITION):
+                yield parse_team_definition(body)
+        except ValueError:  # Includes UnicodeDecodeError
+            pass
+
+
+def read_bouncing_log(path: os.PathLike, team_comm_only: bool = False) -> Iterator[Union[TeamDefinition, TeamCommPacket]]:
+    """
+    Streams the records of a bouncing_log.txt file, with constant memory
+
+    :param path: Path to the log file
+    :type path: os.PathLike
+    :param team_comm_only: Only yield team communication packets, defaults to False
+    :type team_comm_only: bool, optional
+    :return: Team definitions and team communication packets in the order of the log
+    :rtype: Iterator[Union[TeamDefinition, TeamCommPacket]]
+    """
+    with open(path, "rb") as f:
+        yield from parse_bouncing_log_lines(f, team_comm_only)
+
+
+def read_bouncing_capture(path: os.PathLike) -> Iterator[Union[TeamDefinition, TeamCommPacket]]:
+    """
+    Streams the records of a bouncing_capture.bin file, with constant memory.
+    The team definitions of the header come first. A record cut off at the end of the file (e.g. because the bouncer
+    was killed) is ignored
+
+    :param path: Path to the capture file
+    :type path: os.PathLike
+    :raises ValueError: If the file is not a capture of the bouncer
+    :return: Team definitions and team communication packets in the order of the capture
+    :rtype: Iterator[Union[TeamDefinition, TeamCommPacket]]
+    """
+    with open(path, "rb") as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"Not a bouncer capture: {path}")
+        (header_size,) = CAPTURE_HEADER.unpack(f.read(CAPTURE_HEADER.size))
+        header = json.loads(f.read(header_size))
+        yield TeamDefinition("blue", header["blue"])
+        yield TeamDefinition("red", header["red"])
+
+        buffer = b""
+        while True:
+            chunk = f.read(_CAPTURE_CHUNK_SIZE)
+            if not chunk:
+                return
+            buffer = buffer + chunk if buffer else chunk
+            view = memoryview(buffer)
+            offset = 0
+            while offset + CAPTURE_RECORD.size <= len(buffer):
+                time_ns, IP, port, size = CAPTURE_RECORD.unpack_from(view, offset)
+                end = offset + CAPTURE_RECORD.size + size
+                if end > len(buffer):
+                    break
+                yield TeamCommPacket(time_ns * 1e-9, socket.inet_ntoa(IP), port, bytes(view[end - size:end]))
+                offset = end
+            view.release()
+            buffer = buffer[offset:]
+
+
+def read_bouncer_records(match_dir: os.PathLike) -> Iterator[Union[TeamDefinition, TeamCommPacket]]:
+    """
+    Streams the records of the bouncer of a match, from its binary capture or from its text log for older matches
+
+    :param match_dir: Directory with bouncing_capture.bin or bouncing_log.txt
+    :type match_dir: os.PathLike
+    :return: Team definitions and team communication packets
+    :rtype: Iterator[Union[TeamDefinition, TeamCommPacket]]
+    """
+    capture_path = os.path.join(match_dir, "bouncing_capture.bin")
+    if os.path.exists(capture_path):
+        return read_bouncing_capture(capture_path)
+    return read_bouncing_log(os.path.join(match_dir, "bouncing_log.txt"))
+
+
+if __name__ == "__main__":
+    # Print a summary of a log file or a capture
+    packets = 0
+    payload_bytes = 0
+    path = sys.argv[1]
+    records = read_bouncing_capture(path) if path.endswith(".bin") else read_bouncing_log(path)
+    for record in records:
+        if isinstance(record, TeamDefinition):
+            print(f"Robots in team {record.color}: {record.IPs}")
+        else:
+            packets += 1
+            payload_bytes += len(record.payload)
+    print(f"{packets} team communication packets with {payload_bytes} bytes of payload")
@@ -1,377 +1,414 @@
 #!/usr/bin/python3
 
-from typing import List, Optional, Tuple, Dict
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 
 import os
 import sys
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
 import robocup_extension_pb2
+from bouncing_log import TeamCommPacket, TeamDefinition, read_bouncer_records
+
+def get_team_proto_messages(records: Iterable[Union[TeamDefinition, TeamCommPacket]]) -> Tuple[List[robocup_extension_pb2.Message], List[robocup_extension_pb2.Message]]:
+    """
+    Assigns the team communication packets of a bouncing log to the teams and parses them
+
+    :param records: Records of the bouncer, as returned by read_bouncer_records
+    :type records: Iterable[Union[TeamDefinition, TeamCommPacket]]
+    :return: Messages of the blue and the red team
+    :rtype: Tuple[List[robocup_extension_pb2.Message], List[robocup_extension_pb2.Message]]
+    """
+    # The bouncer logs the team IPs before it forwards any packet
+    blue_IPs: Set[str] = set()
+    red_IPs: Set[str] = set()
 
-class TeamCommMessage:
-    def __init__(self, raw: str) -> None:
-        self.raw = raw
-
-        # Extract time, sender IP, port and message
-        splits = self.raw[1:-2].split(", ")  # Remove encapsulating brackets and newline, then split
-        self.time = float(splits[0])
-        self.sender_IP = splits[1][1:-1]  # Remove quotes
-        self.sender_port = int(splits[2])
-        self.message = None
-        raw_message = splits[3]
-        # Interpret "b'\n\x07'" kind string as byte array
-        if raw_message.startswith("b'") and raw_message[-1] == "'":
-            self.message = eval(raw_message)
-
-
-class Message:
-    def __init__(self, raw: str) -> None:
-        self.raw = raw
-        self.raw_bouncing_header = self.raw[:11]
-        self.raw_bouncing_body = self.raw[11:]
-
-        self.blue_IPs: List[str] = []
-        self.red_IPs: List[str] = []
-        self.team_comm_message: Optional[TeamCommMessage] = None
-
-        if self.defines_team():
-            self.blue_IPs = self.get_blue_team_IPs()
-            self.red_IPs = self.get_red_team_IPs()
-        
-        if self.is_team_comm():
-            self.team_comm_message = TeamCommMessage(self.raw_bouncing_body)
-
-    def is_team_comm(self) -> bool:
-        return self.raw_bouncing_body[0] == "["
-
-    def defines_team(self) -> bool:
-        return self.raw_bouncing_body.startswith("Robots in team ")
-
-    def get_blue_team_IPs(self) -> List[str]:
-        """
-        Example raw body: "Robots in team blue are ['172.31.13.184', '172.31.15.77', '172.31.1.9', '172.31.8.39']"
-        We want to return the list of IPs
-        """
-        # Check if the message is a team definition
-        if not self.defines_team() or not self.raw_bouncing_body[15:19] == "blue":
-            return []
-        # Extract the list of IPs
-        raw_IPs = self.raw_bouncing_body[25:-2]  # Remove the "Robots in team blue are " and the last "]\n"
-        raw_IPs = raw_IPs.split(", ")  # Split the IPs
-        raw_IPs = [raw_IP[1:-1] for raw_IP in raw_IPs]  # Remove the quotes
-        return raw_IPs
-
-    def get_red_team_IPs(self) -> List[str]:
-        """
-        Example raw body: "Robots in team red are ['172.31.13.184', '172.31.15.77', '172.31.1.9', '172.31.8.39']"
-        We want to return the list of IPs
-        """
-        # Check if the message is a team definition
-        if not self.defines_team() or not self.raw_bouncing_body[15:18] == "red":
-            return []
-        # Extract the list of IPs
-        raw_IPs = self.raw_bouncing_body[24:-2]  # Remove the "Robots in team red are " and the last "]"
-        raw_IPs = raw_IPs.split(", ")  # Split the IPs
-        raw_IPs = [raw_IP[1:-1] for raw_IP in raw_IPs]  # Remove the quotes
-        return raw_IPs
-
-
-def parse_bouncing_log(bouncing_log: List[str]) -> List[Message]:
-    messages = []
-    for raw_message in bouncing_log:
-        try:
-            messages.append(Message(raw_message))
-        except:
-            pass
-    return messages
-
-def get_team_proto_messages(messages: List[Message]) -> Tuple[List[robocup_extension_pb2.Message], List[robocup_extension_pb2.Message]]:
-    # Get the team IPs
-    blue_IPs = []
-    red_IPs = []
-    for message in messages:
-        if message.blue_IPs:
-            blue_IPs = message.blue_IPs
-        if message.red_IPs:
-            red_IPs = message.red_IPs
-        if blue_IPs and red_IPs:
-            break
-
-    # Assign the messages to the teams
-    blue_messages = []
-    red_messages = []
-
-    for message in messages:
-        if message.team_comm_message:
-            if message.team_comm_message.sender_IP in blue_IPs:
-                blue_messages.append(message)
-            elif message.team_comm_message.sender_IP in red_IPs:
-                red_messages.append(message)
-
-    # Try to parse the messages
     blue_proto: List[robocup_extension_pb2.Message] = []
     red_proto: List[robocup_extension_pb2.Message] = []
 
-    for message in blue_messages:
-        if message.team_comm_message.message:
-            try:
-                proto = robocup_extension_pb2.Message()
-                proto.ParseFromString(message.team_comm_message.message)
-                blue_proto.append(proto)
-            except Exception as e:
-                print(e)
-
-    for message in red_messages:
-        if message.team_comm_message.message:
+    for record in records:
+        if isinstance(record, TeamDefinition):
+            if record.color == "blue":
+                blue_IPs = set(record.IPs)
+            else:
+                red_IPs = set(record.IPs)
+            continue
+
+        if record.sender_IP in blue_IPs:
+            team_proto = blue_proto
+        elif record.sender_IP in red_IPs:
+            team_proto = red_proto
+        else:
+            continue
+
+        # Try to parse the message
+        if record.payload:
             try:
                 proto = robocup_extension_pb2.Message()
-                proto.ParseFromString(message.team_comm_message.message)
-                red_proto.append(proto)
+                proto.ParseFromString(record.payload)
+                team_proto.append(proto)
             except Exception as e:
                 print(e)
 
     return blue_proto, red_proto
 
-def insert_new_columns_to_df(df: pd.DataFrame) -> pd.DataFrame:
-    # TODO: This adds a lot of new sparse columns
-    # Consider using a sparse dataframe instead
-    # An filter intelligently which columns are strictly necessary from the input data
-
-    # Generate column names
-    columns = []
-
-    for team in [1, 2]:
-        for player_id in range(1, 4+1):
-            base_name = f'teams.team{team}.player{player_id}'
-
-            # Skip if the player is not in the match
-            if f'{base_name}.id' not in df.columns:
-                continue
-
-            base_name += '.team_comm'
-
-            columns.append(f'{base_name}.self_localization.pose.position.x')
-            columns.append(f'{base_name}.self_localization.pose.position.y')
-            columns.append(f'{base_name}.self_localization.pose.position.z')
-            for i in range(3*3):
-                columns.append(f'{base_name}.self_localization.covariance.{i}')
-
-            columns.append(f'{base_name}.walk_command.x')
-            columns.append(f'{base_name}.walk_command.y')
-            columns.append(f'{base_name}.walk_command.z')
-
-            columns.append(f'{base_name}.target_pose.pose.position.x')
-            columns.append(f'{base_name}.target_pose.pose.position.y')
-            columns.append(f'{base_name}.target_pose.pose.position.z')
-            for i in range(3*3):
-                columns.append(f'{base_name}.target_pose.pose.covariance.{i}')
-
-            columns.append(f'{base_name}.kick_target.x')
-            columns.append(f'{base_name}.kick_target.y')
-
-            columns.append(f'{base_name}.ball.position.x')
-            columns.append(f'{base_name}.ball.position.y')
-            columns.append(f'{base_name}.ball.position.z')
-            columns.append(f'{base_name}.ball.velocity.x')
-            columns.append(f'{base_name}.ball.velocity.y')
-            columns.append(f'{base_name}.ball.velocity.z')
-            for i in range(3*3):
-                columns.append(f'{base_name}.ball.covariance.{i}')
-
-            # Other players
-            for others_team in [1, 2, "_unknown"]:
-                others_player_ids = list(range(1, 4+1))
-                if others_team == team:
-                    others_player_ids.remove(player_id)
-                if others_team == "_unknown":
-                    # There is no mapping, therefore we use placeholders
-                    others_player_ids = list(range(1, 7+1))
-                for others_player_id in others_player_ids:
-                    others_base_name = f'{base_name}.others.team{others_team}.player{others_player_id}'
-                    columns.append(f'{others_base_name}.pose.position.x')
-                    columns.append(f'{others_base_name}.pose.position.y')
-                    columns.append(f'{others_base_name}.pose.position.z')
-                    columns.append(f'{others_base_name}.confidence')
-                    for i in range(3*3):
-                        columns.append(f'{others_base_name}.covariance.{i}')
-
-            # Extensions
-            columns.append(f'{base_name}.time_to_ball')
-            columns.append(f'{base_name}.role')
-            columns.append(f'{base_name}.action')
-
-    # New temporary dataframe to concat with the original one
-    new_df = pd.DataFrame(columns=columns)
-    return pd.concat([df, new_df], axis=1)
+# Marks the explicit None values of the decoded messages (e.g. a missing confidence), which overwrite the values of
+# earlier messages attached to the same step, unlike the columns which are not in a message
+EXPLICIT_NONE = object()
+
+def team_comm_row(msg: robocup_extension_pb2.Message, current_team: int, current_other_team: int) -> Tuple[float, Dict]:
+    """
+    Decodes a team communication message into the columns of the referee data collection
+
+    :param msg: Team communication message
+    :type msg: robocup_extension_pb2.Message
+    :param current_team: Team of the sender (1 for blue, 2 for red)
+    :type current_team: int
+    :param current_other_team: Other team
+    :type current_other_team: int
+    :return: Time of the message in seconds and the values by column name
+    :rtype: Tuple[float, Dict]
+    """
+    row = {}  # This is where we collect the data from this message
+    player_id = msg.current_pose.player_id
+    my_team_id = msg.current_pose.team
+    base_name = f'teams.team{current_team}.player{player_id}.team_comm'
+
+    time = msg.timestamp.seconds + msg.timestamp.nanos * 1e-9
+
+    # Insert self localization
+    row[f'{base_name}.self_localization.pose.position.x'] = msg.current_pose.position.x
+    row[f'{base_name}.self_localization.pose.position.y'] = msg.current_pose.position.y
+    row[f'{base_name}.self_localization.pose.position.z'] = msg.current_pose.position.z
+    row[f'{base_name}.self_localization.pose.covariance.0'] = msg.current_pose.covariance.x.x
+    row[f'{base_name}.self_localization.pose.covariance.1'] = msg.current_pose.covariance.x.y
+    row[f'{base_name}.self_localization.pose.covariance.2'] = msg.current_pose.covariance.x.z
+    row[f'{base_name}.self_localization.pose.covariance.3'] = msg.current_pose.covariance.y.x
+    row[f'{base_name}.self_localization.pose.covariance.4'] = msg.current_pose.covariance.y.y
+    row[f'{base_name}.self_localization.pose.covariance.5'] = msg.current_pose.covariance.y.z
+    row[f'{base_name}.self_localization.pose.covariance.6'] = msg.current_pose.covariance.z.x
+    row[f'{base_name}.self_localization.pose.covariance.7'] = msg.current_pose.covariance.z.y
+    row[f'{base_name}.self_localization.pose.covariance.8'] = msg.current_pose.covariance.z.z
+
+    # Insert walk command
+    row[f'{base_name}.walk_command.x'] = msg.walk_command.x
+    row[f'{base_name}.walk_command.y'] = msg.walk_command.y
+    row[f'{base_name}.walk_command.z'] = msg.walk_command.z
+
+    # Insert target pose
+    row[f'{base_name}.target_pose.pose.position.x'] = msg.target_pose.position.x
+    row[f'{base_name}.target_pose.pose.position.y'] = msg.target_pose.position.y
+    row[f'{base_name}.target_pose.pose.position.z'] = msg.target_pose.position.z
+    row[f'{base_name}.target_pose.covariance.0'] = msg.target_pose.covariance.x.x
+    row[f'{base_name}.target_pose.covariance.1'] = msg.target_pose.covariance.x.y
+    row[f'{base_name}.target_pose.covariance.2'] = msg.target_pose.covariance.x.z
+    row[f'{base_name}.target_pose.covariance.3'] = msg.target_pose.covariance.y.x
+    row[f'{base_name}.target_pose.covariance.4'] = msg.target_pose.covariance.y.y
+    row[f'{base_name}.target_pose.covariance.5'] = msg.target_pose.covariance.y.z
+    row[f'{base_name}.target_pose.covariance.6'] = msg.target_pose.covariance.z.x
+    row[f'{base_name}.target_pose.covariance.7'] = msg.target_pose.covariance.z.y
+    row[f'{base_name}.target_pose.covariance.8'] = msg.target_pose.covariance.z.z
+
+    # Insert kick target
+    row[f'{base_name}.kick_target.x'] = msg.kick_target.x
+    row[f'{base_name}.kick_target.y'] = msg.kick_target.y
+
+    # Insert ball observation
+    row[f'{base_name}.ball.position.x'] = msg.ball.position.x
+    row[f'{base_name}.ball.position.y'] = msg.ball.position.y
+    row[f'{base_name}.ball.position.z'] = msg.ball.position.z
+    row[f'{base_name}.ball.velocity.x'] = msg.ball.velocity.x
+    row[f'{base_name}.ball.velocity.y'] = msg.ball.velocity.y
+    row[f'{base_name}.ball.velocity.z'] = msg.ball.velocity.z
+    row[f'{base_name}.ball.covariance.0'] = msg.ball.covariance.x.x
+    row[f'{base_name}.ball.covariance.1'] = msg.ball.covariance.x.y
+    row[f'{base_name}.ball.covariance.2'] = msg.ball.covariance.x.z
+    row[f'{base_name}.ball.covariance.3'] = msg.ball.covariance.y.x
+    row[f'{base_name}.ball.covariance.4'] = msg.ball.covariance.y.y
+    row[f'{base_name}.ball.covariance.5'] = msg.ball.covariance.y.z
+    row[f'{base_name}.ball.covariance.6'] = msg.ball.covariance.z.x
+    row[f'{base_name}.ball.covariance.7'] = msg.ball.covariance.z.y
+    row[f'{base_name}.ball.covariance.8'] = msg.ball.covariance.z.z
+
+    # Insert other players
+    current_team_count = current_other_team_count = unknown_count = -1
+    count = 0
+    for i, other in enumerate(msg.others):
+        # Determine team (mine, opponent, or unknown)
+        if other.team == my_team_id:
+            others_team = current_team
+            current_team_count += 1
+            count = current_team_count
+        elif other.team != 0:
+            others_team = current_other_team
+            current_other_team_count += 1
+            count = current_other_team_count
+        else:
+            others_team = "_unknown"
+            unknown_count += 1
+            count = unknown_count
+        # We ignore the player_id field because no team detects the player number
+
+        others_base_name = f'{base_name}.others.team{others_team}.player{count}'
+        
+        # Insert pose
+        row[f'{others_base_name}.pose.position.x'] = other.position.x
+        row[f'{others_base_name}.pose.position.y'] = other.position.y
+        row[f'{others_base_name}.pose.position.z'] = other.position.z
+
+        # Insert confidence
+        confidence = None
+        if len(msg.other_robot_confidence) > i:
+            confidence = msg.other_robot_confidence[i]
+        row[f'{others_base_name}.confidence'] = confidence
+
+        # Insert covariance
+        row[f'{others_base_name}.covariance.0'] = other.covariance.x.x
+        row[f'{others_base_name}.covariance.1'] = other.covariance.x.y
+        row[f'{others_base_name}.covariance.2'] = other.covariance.x.z
+        row[f'{others_base_name}.covariance.3'] = other.covariance.y.x
+        row[f'{others_base_name}.covariance.4'] = other.covariance.y.y
+        row[f'{others_base_name}.covariance.5'] = other.covariance.y.z
+        row[f'{others_base_name}.covariance.6'] = other.covariance.z.x
+        row[f'{others_base_name}.covariance.7'] = other.covariance.z.y
+        row[f'{others_base_name}.covariance.8'] = other.covariance.z.z
+
+    # Insert extensions
+    row[f'{base_name}.time_to_ball'] = msg.time_to_ball
+    row[f'{base_name}.role'] = msg.role
+    row[f'{base_name}.action'] = msg.action
+
+    return time, row
+
+def team_comm_table(msgs: List[robocup_extension_pb2.Message], current_team: int, current_other_team: int) -> pd.DataFrame:
+    """
+    Decodes all team communication messages of a team into one table
+
+    :param msgs: Team communication messages
+    :type msgs: List[robocup_extension_pb2.Message]
+    :param current_team: Team of the senders (1 for blue, 2 for red)
+    :type current_team: int
+    :param current_other_team: Other team
+    :type current_other_team: int
+    :return: One row per message with the time and the columns of all players of the team,
+        explicit None values are EXPLICIT_NONE and the columns which are not in a message are NaN
+    :rtype: pd.DataFrame
+    """
+    times = []
+    rows = []
+    for msg in msgs:
+        time, row = team_comm_row(msg, current_team, current_other_team)
+        times.append(time)
+        rows.append({column: EXPLICIT_NONE if value is None else value for column, value in row.items()})
+    table = pd.DataFrame.from_records(rows)
+    table.insert(0, 'time', times)
+    return table
+
+def join_team_comm(df: pd.DataFrame, table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Attaches decoded team communication messages to the referee steps with an as-of join:
+    each message is attached to the first step after it, messages after the last step are dropped.
+    If several messages of a player are attached to the same step, the last one with a column wins for this column,
+    even if its value is None
+
+    :param df: Referee data collection, sorted by time
+    :type df: pd.DataFrame
+    :param table: Decoded messages, as returned by team_comm_table
+    :type table: pd.DataFrame
+    :return: Referee data collection with the team communication columns
+    :rtype: pd.DataFrame
+    """
+    if table.empty:
+        return df
+    positions = np.searchsorted(df['time'].to_numpy(), table['time'].to_numpy(), side='right')
+    valid = positions < len(df)
+    values = table[valid].drop(columns='time')
+    # Last value per step and column among the messages with this column
+    values = values.groupby(df.index[positions[valid]], sort=True).last()
+    explicit_none = {}
+    for column in values.columns[values.dtypes == object]:
+        is_none = values[column].map(lambda value: value is EXPLICIT_NONE).to_numpy(dtype=bool)
+        if is_none.any():
+            explicit_none[column] = values.index[is_none]
+        values[column] = values[column].mask(is_none).astype(np.float64)
+
+    # Add the columns which are not in the dataframe yet, in the order in which they first appear
+    new_columns = [column for column in values.columns if column not in df.columns]
+    if new_columns:
+        df = pd.concat([df, pd.DataFrame(np.nan, index=df.index, columns=new_columns)], axis=1)
+    df.update(values)  # Skips the NaN values
+    for column, index in explicit_none.items():
+        df.loc[index, column] = np.nan
+    return df
 
-def fill_df_with_data(df: pd.DataFrame, blue_proto: List[robocup_extension_pb2.Message], red_proto: List[robocup_extension_pb2.Message]):
-    def handle_team(df: pd.DataFrame, msgs, current_team: int, current_other_team: int) -> pd.DataFrame:
+def team_comm_type(field: str) -> pa.DataType:
+    """
+    Gets the Arrow type of a team communication field: role and action are enums, everything else is a float
+
+    :param field: Name of the field (e.g. ball.position.x) or of the column
+    :type field: str
+    :return: Arrow type
+    :rtype: pa.DataType
+    """
+    if field.endswith(".role") or field.endswith(".action") or field in ("role", "action"):
+        return pa.uint8()
+    return pa.float32()
+
+def team_comm_long_table(blue_proto: List[robocup_extension_pb2.Message], red_proto: List[robocup_extension_pb2.Message]) -> pa.Table:
+    """
+    Decodes the team communication messages of both teams into a long table with one row per message,
+    keyed by time, team and player. Only the fields present in at least one message get a column
+
+    :param blue_proto: Messages of the blue team (team1)
+    :type blue_proto: List[robocup_extension_pb2.Message]
+    :param red_proto: Messages of the red team (team2)
+    :type red_proto: List[robocup_extension_pb2.Message]
+    :return: Messages sorted by time
+    :rtype: pa.Table
+    """
+    times = []
+    teams = []
+    players = []
+    rows = []
+    for current_team, current_other_team, msgs in [(1, 2, blue_proto), (2, 1, red_proto)]:
         for msg in msgs:
-            row = {}  # This is where we collect the data from this message
-            player_id = msg.current_pose.player_id
-            my_team_id = msg.current_pose.team
-            base_name = f'teams.team{current_team}.player{player_id}.team_comm'
-
-            time = msg.timestamp.seconds + msg.timestamp.nanos * 1e-9
-
-            # Skip if msg time is greater than the last time in the dataframe
-            if time >= df['time'].iloc[-1]:
-                continue
-
-            idx = df['time'][df['time'] > time].index[0]  # Find the index of the first row with a time greater than the message time
-
-            # Insert self localization
-            row[f'{base_name}.self_localization.pose.position.x'] = msg.current_pose.position.x
-            row[f'{base_name}.self_localization.pose.position.y'] = msg.current_pose.position.y
-            row[f'{base_name}.self_localization.pose.position.z'] = msg.current_pose.position.z
-            row[f'{base_name}.self_localization.pose.covariance.0'] = msg.current_pose.covariance.x.x
-            row[f'{base_name}.self_localization.pose.covariance.1'] = msg.current_pose.covariance.x.y
-            row[f'{base_name}.self_localization.pose.covariance.2'] = msg.current_pose.covariance.x.z
-            row[f'{base_name}.self_localization.pose.covariance.3'] = msg.current_pose.covariance.y.x
-            row[f'{base_name}.self_localization.pose.covariance.4'] = msg.current_pose.covariance.y.y
-            row[f'{base_name}.self_localization.pose.covariance.5'] = msg.current_pose.covariance.y.z
-            row[f'{base_name}.self_localization.pose.covariance.6'] = msg.current_pose.covariance.z.x
-            row[f'{base_name}.self_localization.pose.covariance.7'] = msg.current_pose.covariance.z.y
-            row[f'{base_name}.self_localization.pose.covariance.8'] = msg.current_pose.covariance.z.z
-
-            # Insert walk command
-            row[f'{base_name}.walk_command.x'] = msg.walk_command.x
-            row[f'{base_name}.walk_command.y'] = msg.walk_command.y
-            row[f'{base_name}.walk_command.z'] = msg.walk_command.z
-
-            # Insert target pose
-            row[f'{base_name}.target_pose.pose.position.x'] = msg.target_pose.position.x
-            row[f'{base_name}.target_pose.pose.position.y'] = msg.target_pose.position.y
-            row[f'{base_name}.target_pose.pose.position.z'] = msg.target_pose.position.z
-            row[f'{base_name}.target_pose.covariance.0'] = msg.target_pose.covariance.x.x
-            row[f'{base_name}.target_pose.covariance.1'] = msg.target_pose.covariance.x.y
-            row[f'{base_name}.target_pose.covariance.2'] = msg.target_pose.covariance.x.z
-            row[f'{base_name}.target_pose.covariance.3'] = msg.target_pose.covariance.y.x
-            row[f'{base_name}.target_pose.covariance.4'] = msg.target_pose.covariance.y.y
-            row[f'{base_name}.target_pose.covariance.5'] = msg.target_pose.covariance.y.z
-            row[f'{base_name}.target_pose.covariance.6'] = msg.target_pose.covariance.z.x
-            row[f'{base_name}.target_pose.covariance.7'] = msg.target_pose.covariance.z.y
-            row[f'{base_name}.target_pose.covariance.8'] = msg.target_pose.covariance.z.z
-
-            # Insert kick target
-            row[f'{base_name}.kick_target.x'] = msg.kick_target.x
-            row[f'{base_name}.kick_target.y'] = msg.kick_target.y
-
-            # Insert ball observation
-            row[f'{base_name}.ball.position.x'] = msg.ball.position.x
-            row[f'{base_name}.ball.position.y'] = msg.ball.position.y
-            row[f'{base_name}.ball.position.z'] = msg.ball.position.z
-            row[f'{base_name}.ball.velocity.x'] = msg.ball.velocity.x
-            row[f'{base_name}.ball.velocity.y'] = msg.ball.velocity.y
-            row[f'{base_name}.ball.velocity.z'] = msg.ball.velocity.z
-            row[f'{base_name}.ball.covariance.0'] = msg.ball.covariance.x.x
-            row[f'{base_name}.ball.covariance.1'] = msg.ball.covariance.x.y
-            row[f'{base_name}.ball.covariance.2'] = msg.ball.covariance.x.z
-            row[f'{base_name}.ball.covariance.3'] = msg.ball.covariance.y.x
-            row[f'{base_name}.ball.covariance.4'] = msg.ball.covariance.y.y
-            row[f'{base_name}.ball.covariance.5'] = msg.ball.covariance.y.z
-            row[f'{base_name}.ball.covariance.6'] = msg.ball.covariance.z.x
-            row[f'{base_name}.ball.covariance.7'] = msg.ball.covariance.z.y
-            row[f'{base_name}.ball.covariance.8'] = msg.ball.covariance.z.z
-
-            # Insert other players
-            current_team_count = current_other_team_count = unknown_count = -1
-            count = 0
-            for i, other in enumerate(msg.others):
-                # Determine team (mine, opponent, or unknown)
-                if other.team == my_team_id:
-                    others_team = current_team
-                    current_team_count += 1
-                    count = current_team_count
-                elif other.team != 0:
-                    others_team = current_other_team
-                    current_other_team_count += 1
-                    count = current_other_team_count
-                else:
-                    others_team = "_unknown"
-                    unknown_count += 1
-                    count = unknown_count
-                # We ignore the player_id field because no team detects the player number
-
-                others_base_name = f'{base_name}.others.team{others_team}.player{count}'
-                
-                # Insert pose
-                row[f'{others_base_name}.pose.position.x'] = other.position.x
-                row[f'{others_base_name}.pose.position.y'] = other.position.y
-                row[f'{others_base_name}.pose.position.z'] = other.position.z
-
-                # Insert confidence
-                confidence = None
-                if len(msg.other_robot_confidence) > i:
-                    confidence = msg.other_robot_confidence[i]
-                row[f'{others_base_name}.confidence'] = confidence
-
-                # Insert covariance
-                row[f'{others_base_name}.covariance.0'] = other.covariance.x.x
-                row[f'{others_base_name}.covariance.1'] = other.covariance.x.y
-                row[f'{others_base_name}.covariance.2'] = other.covariance.x.z
-                row[f'{others_base_name}.covariance.3'] = other.covariance.y.x
-                row[f'{others_base_name}.covariance.4'] = other.covariance.y.y
-                row[f'{others_base_name}.covariance.5'] = other.covariance.y.z
-                row[f'{others_base_name}.covariance.6'] = other.covariance.z.x
-                row[f'{others_base_name}.covariance.7'] = other.covariance.z.y
-                row[f'{others_base_name}.covariance.8'] = other.covariance.z.z
-
-            # Insert extensions
-            row[f'{base_name}.time_to_ball'] = msg.time_to_ball
-            row[f'{base_name}.role'] = msg.role
-            row[f'{base_name}.action'] = msg.action
-
-            # Insert the column data from row into the dataframe at the index
-            for col, value in row.items():
-                df.at[idx, col] = value
-
-        return df
+            time, row = team_comm_row(msg, current_team, current_other_team)
+            prefix = f'teams.team{current_team}.player{msg.current_pose.player_id}.team_comm.'
+            times.append(time)
+            teams.append(current_team)
+            players.append(msg.current_pose.player_id)
+            rows.append({key[len(prefix):]: value for key, value in row.items()})
+
+    fields = list(dict.fromkeys(field for row in rows for field in row))  # In the order in which they first appear
+    schema = pa.schema(
+        [pa.field('time', pa.float64(), nullable=False),
+         pa.field('team', pa.uint8(), nullable=False),
+         pa.field('player', pa.uint8(), nullable=False)] +
+        [pa.field(field, team_comm_type(field)) for field in fields]
+    )
+    columns = [times, teams, players] + [[row.get(field) for row in rows] for field in fields]
+    return pa.Table.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+    ).sort_by('time')
+
+def typed_team_comm_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the team communication columns of a referee data collection to the types of team_comm_type
+
+    :param df: Referee data collection with team communication columns
+    :type df: pd.DataFrame
+    :return: Referee data collection with typed team communication columns
+    :rtype: pd.DataFrame
+    """
+    dtypes = {}
+    for column in df.columns:
+        if '.team_comm.' in column:
+            dtypes[column] = 'UInt8' if team_comm_type(column) == pa.uint8() else 'float32'
+    return df.astype(dtypes)
 
+def fill_df_with_data(df: pd.DataFrame, blue_proto: List[robocup_extension_pb2.Message], red_proto: List[robocup_extension_pb2.Message]):
     # Blue is team1, red is team2
-    # Insert blue data
-    df = handle_team(df, blue_proto, 1, 2)
-    df = handle_team(df, red_proto, 2, 1)
-
+    df = join_team_comm(df, team_comm_table(blue_proto, 1, 2))
+    df = join_team_comm(df, team_comm_table(red_proto, 2, 1))
     return df
 
-if __name__ == "__main__":
-    match_dir = sys.argv[1]
-
-    # Read the bouncing log file
-    with open(os.path.join(match_dir, "bouncing_log.txt"), "r") as f:
-        bouncing_log: List[str] = f.readlines()
-
-    # Parse the bouncing log file
-    messages = parse_bouncing_log(bouncing_log)
+# Suffixes of the data collection files with the merged team communication
+TEAM_COMM_SUFFIX = "_with_team_communication"
+TEAM_COMM_LONG_SUFFIX = "_team_communication"
+
+def find_data_collection_files(data_collection_dir: os.PathLike) -> List[str]:
+    """
+    Finds the referee data collection files of a match, without the event tables and the merged files
+
+    :param data_collection_dir: Data collection directory of the match
+    :type data_collection_dir: os.PathLike
+    :return: File names of the feather files
+    :rtype: List[str]
+    """
+    return sorted(
+        file for file in os.listdir(data_collection_dir)
+        if file.startswith("referee_data_collection_") and file.endswith(".feather")
+        and file.count(".") == 1 and TEAM_COMM_SUFFIX not in file and TEAM_COMM_LONG_SUFFIX not in file
+    )
+
+def bouncer_file(match_dir: os.PathLike) -> Optional[str]:
+    """
+    Gets the path of the bouncer capture or log of a match
+
+    :param match_dir: Match directory
+    :type match_dir: os.PathLike
+    :return: Path of bouncing_capture.bin or bouncing_log.txt, None if there is neither
+    :rtype: Optional[str]
+    """
+    for file in ["bouncing_capture.bin", "bouncing_log.txt"]:
+        path = os.path.join(match_dir, file)
+        if os.path.exists(path):
+            return path
+    return None
+
+def merge_match(match_dir: os.PathLike, force: bool = False, long_format: bool = False) -> List[str]:
+    """
+    Merges the team communication of a match into its referee data collection files.
+    Files whose merged file is newer than the data collection file and the bouncer file are skipped
+
+    :param match_dir: Match directory with the bouncer capture or log and a data_collection directory
+    :type match_dir: os.PathLike
+    :param force: Merge files that are up to date as well, defaults to False
+    :type force: bool, optional
+    :param long_format: Write the messages as a separate long table (<file>_team_communication.feather)
+        with the index of the referee step each message belongs to, instead of widening the steps, defaults to False
+    :type long_format: bool, optional
+    :return: Paths of the written files
+    :rtype: List[str]
+    """
+    data_collection_dir = os.path.join(match_dir, "data_collection")
+    bouncer_path = bouncer_file(match_dir)
+    if bouncer_path is None:
+        return []
+
+    pending = []
+    for feather_file in find_data_collection_files(data_collection_dir):
+        path = os.path.join(data_collection_dir, feather_file)
+        suffix = TEAM_COMM_LONG_SUFFIX if long_format else TEAM_COMM_SUFFIX
+        merged_path = os.path.join(data_collection_dir, feather_file.replace(".feather", suffix + ".feather"))
+        if force or not os.path.exists(merged_path) or \
+                os.path.getmtime(merged_path) < max(os.path.getmtime(path), os.path.getmtime(bouncer_path)):
+            pending.append((path, merged_path))
+    if not pending:
+        return []
 
     # Get the team proto messages
-    blue_proto, red_proto = get_team_proto_messages(messages)
-    print(len(red_proto))
-    exit(0)
+    blue_proto, red_proto = get_team_proto_messages(read_bouncer_records(match_dir))
 
-    # Load the match data collection
-    # Find files that match the pattern "referee_data_collection_*.feather"
-    feather_file = None
-    data_collection_dir = os.path.join(match_dir, "data_collection")
-    for file in os.listdir(data_collection_dir):
-        if file.startswith("referee_data_collection_") and file.endswith(".feather"):
-            feather_file = file
-            break
+    for path, merged_path in pending:
+        if long_format:
+            # Only the time column of the referee data collection is needed
+            times = pd.read_feather(path, columns=['time'])['time'].to_numpy()
+            table = team_comm_long_table(blue_proto, red_proto)
+            steps = np.searchsorted(times, table['time'].to_numpy(), side='right')
+            table = table.append_column(pa.field('step', pa.uint32(), nullable=False), pa.array(steps, pa.uint32()))
+            feather.write_feather(table.filter(pa.array(steps < len(times))), merged_path)
+            continue
 
-    if feather_file is None:
-        print("No referee data collection file found")
-        exit(1)
+        # Load the data
+        referee_data_collection = pd.read_feather(path)
 
-    # Load the data
-    referee_data_collection = pd.read_feather(os.path.join(data_collection_dir, feather_file))
+        # Fill the new columns with the proto messages, only the columns present in the messages are added
+        referee_data_collection = typed_team_comm_columns(fill_df_with_data(referee_data_collection, blue_proto, red_proto))
 
-    # Insert new columns
-    referee_data_collection = insert_new_columns_to_df(referee_data_collection)
+        # Save the new dataframe as feather
+        referee_data_collection.to_feather(merged_path)
+    return [merged_path for _, merged_path in pending]
 
-    # Fill the new columns with the proto messages
-    referee_data_collection = fill_df_with_data(referee_data_collection, blue_proto, red_proto)
+if __name__ == "__main__":
+    match_dir = sys.argv[1]
+
+    if not os.path.isdir(os.path.join(match_dir, "data_collection")) or \
+            not find_data_collection_files(os.path.join(match_dir, "data_collection")):
+        print("No referee data collection file found")
+        exit(1)
 
-    # Save the new dataframe as feather
-    feather_file = feather_file.replace(".feather", "_with_team_communication.feather")
-    #referee_data_collection.to_feather(os.path.join(data_collection_dir, feather_file))
+    for merged_path in merge_match(match_dir, force=True):
+        print(f"Saved {merged_path}")
@@ -0,0 +1,78 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "post_processing"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from bouncing_log import (  # noqa: E402
+    TeamCommPacket,
+    TeamDefinition,
+    decode_bytes_literal,
+    read_bouncer_records,
+    read_bouncing_log,
+)
+
+
+def _log_line(real_time: float, message) -> str:
+    # Same format as the log function of the bouncer
+    return f"[{real_time:08.3f}] {message}\n"
+
+
+def test_read_bouncing_log(tmp_path):
+    rng = np.random.default_rng(42)
+    blue = ["172.31.13.184", "172.31.15.77"]
+    red = ["172.31.1.9"]
+    packets = [
+        [1699000000.0 + i, blue[i % 2] if i % 3 else red[0], 3737, bytes(rng.integers(0, 256, size=int(rng.integers(0, 200))).astype(np.uint8))]
+        for i in range(200)
+    ]
+    # Payloads with quotes, backslashes and separators
+    packets.append([1699000300.5, red[0], 3737, b"it's \"quoted\", \\ ]\n"])
+    packets.append([1699000301.5, red[0], 3737, b""])
+
+    path = tmp_path / "bouncing_log.txt"
+    with open(path, "w") as f:
+        f.write(_log_line(0, "Initializing UDP Server"))
+        f.write(_log_line(0.001, "Robots in team blue are %s" % blue))
+        f.write(_log_line(0.001, "Robots in team red are %s" % red))
+        for i, packet in enumerate(packets):
+            # The header grows after 10000 seconds
+            f.write(_log_line(i * 100.0, packet))
+        f.write(_log_line(20001, "[1.0, '1.2.3.4', 3737, b'' + __import__('os').system('exit')]"))
+        f.write("truncated line [")
+
+    records = list(read_bouncing_log(path))
+
+    assert records[:2] == [TeamDefinition("blue", blue), TeamDefinition("red", red)]
+    assert records[2:] == [TeamCommPacket(*packet) for packet in packets]
+    assert list(read_bouncing_log(path, team_comm_only=True)) == records[2:]
+
+
+def test_decode_bytes_literal():
+    for value in [b"", b"'", b'"', b"'\"", b"\\x00", bytes(range(256))]:
+        assert decode_bytes_literal(repr(value).encode("ascii")) == value
+
+
+def test_read_bouncing_capture(tmp_path):
+    import udp_bouncer
+
+    blue = ["172.31.13.184", "172.31.15.77"]
+    red = ["172.31.1.9"]
+    capture = udp_bouncer.Capture(tmp_path / "bouncing_capture.bin", ["172.31.0.1"] + blue + red, blue, red)
+    packets = [
+        [1699000000123456789 + i * 10**7, blue[i % 2], 3737, bytes([i % 256]) * (i % 7)]
+        for i in range(500)
+    ]
+    for packet in packets:
+        capture.write(*packet)
+    capture.close()
+    # Record cut off by killing the bouncer
+    with open(tmp_path / "bouncing_capture.bin", "ab") as f:
+        f.write(b"\x01\x02\x03")
+
+    records = list(read_bouncer_records(tmp_path))
+
+    assert records[:2] == [TeamDefinition("blue", blue), TeamDefinition("red", red)]
+    assert records[2:] == [TeamCommPacket(time * 1e-9, ip, port, data) for time, ip, port, data in packets]
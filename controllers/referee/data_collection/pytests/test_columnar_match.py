@@ -0,0 +1,142 @@
+import os
+
+import numpy as np
+import pandas as pd
+import transforms3d
+
+from data_collection import match_info as mi
+from data_collection.pytests.test_static import _create_static_match_info
+from data_collection.pytests.test_step import _create_step
+
+
+def _create_full_step(time: int) -> mi.Step:
+    step = _create_step(time)
+    step.game_control_data = mi.GameControlData(
+        game_state=mi.GameControlData.GameState.STATE_PLAYING,
+        first_half=True,
+        kickoff_team=1,
+        secondary_state=mi.GameControlData.SecondaryGameState.STATE_NORMAL,
+        secondary_state_info_team=0,
+        secondary_state_info_sub_state=0,
+        drop_in_team=False,
+        drop_in_time=time,
+        seconds_remaining=600 - time,
+        secondary_seconds_remaining=0,
+    )
+    # The referee stores poses (not frames) for the player links
+    step.teams.team1.player1.base_link = mi.pose_from_affine(np.eye(4).reshape(16))
+    return step
+
+
+def _create_columnar_match(steps) -> mi.ColumnarMatch:
+    match = mi.ColumnarMatch(_create_static_match_info(), initial_capacity=2)
+    for step in steps:
+        match.add_step(step)
+    assert len(match) == len(steps)
+    return match
+
+
+def test_columnar_match_matches_json_normalize():
+    steps = [_create_full_step(i) for i in range(10)]
+    match = _create_columnar_match(steps)
+
+    expected = pd.json_normalize([step.to_dict() for step in steps])
+    df = match.get_dataframe()
+
+    assert list(df.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+
+
+def test_columnar_match_missing_values():
+    steps = [mi.Step(time=0.0), _create_full_step(1), mi.Step(time=2.0, delta_real_time=0.5)]
+    match = _create_columnar_match(steps)
+
+    expected = pd.json_normalize([step.to_dict() for step in steps])
+    df = match.get_dataframe()
+
+    assert set(df.columns) == set(expected.columns)
+    assert df["time"].tolist() == [0.0, 1.0, 2.0]
+    assert np.isnan(df["delta_real_time"][0]) and df["delta_real_time"][2] == 0.5
+    assert df["game_control_data.seconds_remaining"].isna().tolist() == [True, False, True]
+    assert df["teams.team1.player1.base_link.rotation.x"][1] == 1.0
+
+
+def test_columnar_match_current_step_is_mutable():
+    match = _create_columnar_match([_create_full_step(0), mi.Step(time=1)])
+    match.current_step().delta_real_time = 0.25
+
+    df = match.get_dataframe()
+    assert len(df) == 2
+    assert df["delta_real_time"].tolist() == [0.1, 0.25]
+
+
+def test_columnar_match_get_steps():
+    steps = [mi.Step(time=0.0), *[_create_full_step(i) for i in range(1, 5)]]
+    match = _create_columnar_match(steps)
+
+    rebuilt = match.get_steps()
+    assert rebuilt == steps
+    # The current step is the added object, the previous ones are rebuilt from the columns
+    assert rebuilt[-1] is match.current_step()
+    assert isinstance(rebuilt[1].teams.team1.player1.base_link, mi.Pose)
+    assert rebuilt[1].game_control_data.game_state == mi.GameControlData.GameState.STATE_PLAYING
+    assert mi.ColumnarMatch(_create_static_match_info()).get_steps() == []
+
+
+def test_columnar_match_save(tmp_path):
+    steps = [_create_full_step(i) for i in range(5)]
+    match = _create_columnar_match(steps)
+
+    match.save(tmp_path, "test")
+
+    assert sorted(os.listdir(tmp_path)) == ["test.feather", "test.json", "test.pkl"]
+    df_feather = pd.read_feather(os.path.join(tmp_path, "test.feather"))
+    df_pickle = pd.read_pickle(os.path.join(tmp_path, "test.pkl"))
+    expected = pd.json_normalize([step.to_dict() for step in steps])
+    pd.testing.assert_frame_equal(df_feather, expected, check_dtype=False)
+    pd.testing.assert_frame_equal(df_pickle, expected, check_dtype=False)
+
+
+def test_raw_affine_poses_match_converted_poses():
+    rng = np.random.default_rng(0)
+    affines = []
+    for _ in range(6):
+        affine = np.eye(4)
+        affine[:3, :3] = transforms3d.axangles.axangle2mat(rng.normal(size=3), rng.uniform(-np.pi, np.pi))
+        affine[:3, 3] = rng.normal(size=3)
+        affines.append(affine.reshape(16))
+
+    def create_steps(raw: bool):
+        steps = []
+        for i, affine in enumerate(affines):
+            step = _create_full_step(i)
+            pose = mi.AffinePose(affine) if raw else mi.pose_from_affine(affine)
+            step.teams.team1.player1.base_link = pose
+            # The camera frame is missing in some steps
+            step.teams.team1.player1.camera_frame = pose if i % 2 else None
+            step.ball = mi.Ball("BALL", mi.Frame("BALL", pose))
+            steps.append(step)
+        return steps
+
+    expected = pd.json_normalize([step.to_dict() for step in create_steps(raw=False)])
+    expected = expected.dropna(axis=1, how="all")  # Columns without any value are either None or NaN
+    for match in [_create_columnar_match(create_steps(raw=True)), mi.Match(_create_static_match_info())]:
+        if not isinstance(match, mi.ColumnarMatch):
+            for step in create_steps(raw=True):
+                match.add_step(step)
+        df = match.to_arrow().to_pandas()
+        assert not mi.has_affine_columns(df.columns)
+        assert set(df.columns) >= set(expected.columns)
+        pd.testing.assert_frame_equal(df[expected.columns], expected, check_dtype=False)
+
+        # Ranges of steps (as written by the incremental autosave) are converted the same way
+        df = pd.concat([match.to_arrow(0, 3).to_pandas(), match.to_arrow(3).to_pandas()], ignore_index=True)
+        pd.testing.assert_frame_equal(df[expected.columns], expected, check_dtype=False)
+
+
+if __name__ == "__main__":
+    test_columnar_match_matches_json_normalize()
+    test_columnar_match_missing_values()
+    test_columnar_match_current_step_is_mutable()
+    test_columnar_match_get_steps()
+    test_raw_affine_poses_match_converted_poses()
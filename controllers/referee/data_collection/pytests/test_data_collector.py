@@ -1,9 +1,14 @@
+import dataclasses
 import glob
+import json
 import os
 import time
 
+import pandas as pd
+
 from data_collection import match_info as mi
 from data_collection.data_collector import DataCollector
+from data_collection.reader import MatchReader
 from data_collection.pytests.test_static import _create_static_match_info
 from data_collection.pytests.test_step import _create_step
 
@@ -70,6 +75,218 @@ def test_create_data_collector(tmp_path):
     ), "Three files should be saved for the final save (referee_data_collection_complete_* [.json, .feather and .pkl])"
 
 
+def test_incremental_autosave(tmp_path):
+    match = mi.Match(_create_static_match_info())
+    d = DataCollector(tmp_path, 0, match, incremental_autosave=True)
+
+    for i in range(5):
+        d.match.add_step(_create_step(i))
+
+    time.sleep(4)
+
+    # Check that the steps before the current step were appended as a chunk
+    chunk_dirs = glob.glob(os.path.join(tmp_path, "referee_data_collection_AUTOSAVE_*"))
+    assert len(chunk_dirs) == 1
+    with open(os.path.join(chunk_dirs[0], "manifest.json")) as f:
+        manifest = json.load(f)
+    assert manifest["static"] == "static.json"
+    assert [chunk["num_steps"] for chunk in manifest["chunks"]] == [4]
+
+    for i in range(5, 8):
+        d.match.add_step(_create_step(i))
+
+    d.finalize()
+
+    # Check that the chunks were compacted and removed
+    assert not os.path.exists(chunk_dirs[0])
+    assert (
+        len(glob.glob(os.path.join(tmp_path, "referee_data_collection_COMPLETE_*")))
+        == len(os.listdir(tmp_path))
+        == 3
+    ), "Only the final save (referee_data_collection_COMPLETE_* [.json, .feather and .pkl]) should be left"
+    df = pd.read_feather(glob.glob(os.path.join(tmp_path, "referee_data_collection_COMPLETE_*.feather"))[0])
+    expected = pd.json_normalize([step.to_dict() for step in match.get_steps()])
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+
+
+def _run_writer_process_match(tmp_path, kill_writer: bool):
+    match = mi.Match(_create_static_match_info())
+    d = DataCollector(tmp_path, -1, match, writer_process=True)
+
+    steps = []
+    for i in range(50):
+        d.create_new_step(i)
+        step = _create_step(i)
+        d.current_step().ball = step.ball
+        d.current_step().teams = step.teams
+        steps.append(d.current_step())
+        if kill_writer and i == 40:
+            d._writer._process.kill()
+            d._writer._process.join()
+    assert match.get_steps() == [], "Steps should not be kept in the referee process"
+
+    d.finalize()
+
+    files = glob.glob(os.path.join(tmp_path, "referee_data_collection_COMPLETE_*"))
+    assert len(files) == len(os.listdir(tmp_path)) == 3
+    df = pd.read_feather(glob.glob(os.path.join(tmp_path, "referee_data_collection_COMPLETE_*.feather"))[0])
+    return df, steps
+
+
+def test_writer_process(tmp_path):
+    df, steps = _run_writer_process_match(tmp_path, kill_writer=False)
+    expected = pd.json_normalize([step.to_dict() for step in steps])
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+
+
+def test_writer_process_failure(tmp_path):
+    df, steps = _run_writer_process_match(tmp_path, kill_writer=True)
+    # The batch sent to the killed writer process before it wrote a chunk is written by the referee process
+    expected = pd.json_normalize([step.to_dict() for step in steps])
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+
+
+def test_writer_process_failure_after_chunk(tmp_path):
+    match = mi.Match(_create_static_match_info())
+    d = DataCollector(tmp_path, 0, match, writer_process=True)
+
+    steps = []
+    for i in range(80):
+        d.create_new_step(i)
+        step = _create_step(i)
+        d.current_step().ball = step.ball
+        d.current_step().teams = step.teams
+        steps.append(d.current_step())
+        if i == 40:
+            # Wait until the writer process wrote the first batch in a chunk, the referee releases it
+            deadline = time.time() + 10
+            while d._writer._first_unsent == 0 and time.time() < deadline:
+                d._writer.failed()
+                time.sleep(0.01)
+            assert d._writer._first_unsent == 32
+            d._writer._process.kill()
+            d._writer._process.join()
+    d.finalize()
+
+    df = pd.read_feather(glob.glob(os.path.join(tmp_path, "referee_data_collection_COMPLETE_*.feather"))[0])
+    expected = pd.json_normalize([step.to_dict() for step in steps])
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+
+
+def test_writer_process_releases_steps_without_autosave(tmp_path):
+    from data_collection.writer_process import WriterProcess
+
+    static = _create_static_match_info()
+    writer = WriterProcess(static, tmp_path, "chunks", -1, "failure", batch_size=8, chunk_size=32)
+    steps = [_create_step(i) for i in range(100)]
+    for step in steps:
+        writer.push(mi.flatten_step(step))
+    # The writer process appends a chunk every 32 steps and the referee releases them once they are written
+    deadline = time.time() + 10
+    while writer._first_unsent < 96 and time.time() < deadline:
+        writer.failed()
+        time.sleep(0.01)
+    assert writer._first_unsent == 96 and len(writer._unsent) == 0
+    writer.close("complete")
+
+    assert writer.error is None
+    df = pd.read_feather(tmp_path / "complete.feather")
+    expected = pd.json_normalize([step.to_dict() for step in steps])
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+
+
+def _create_step_with_events(i: int) -> mi.Step:
+    step = _create_step(i)
+    step.game_control_data = mi.GameControlData(
+        game_state=mi.GameControlData.GameState.STATE_PLAYING,
+        first_half=True,
+        kickoff_team=1,
+        secondary_state=mi.GameControlData.SecondaryGameState.STATE_NORMAL,
+        secondary_state_info_team=0,
+        secondary_state_info_sub_state=0,
+        drop_in_team=False,
+        drop_in_time=-1,
+        seconds_remaining=600 - i // 10,
+        secondary_seconds_remaining=0,
+    )
+    # Both teams share the same player object, the robot info of the first one changes
+    player = step.teams.team1.player1
+    step.teams.team1.player1 = dataclasses.replace(
+        player,
+        robot_info=dataclasses.replace(
+            player.robot_info,
+            penalty=mi.Penalty.HL_PHYSICAL_CONTACT if 20 <= i < 30 else mi.Penalty.NONE,
+            secs_till_unpenalized=30 - i if 20 <= i < 30 else 0,
+        ),
+    )
+    step.teams.team2.player2 = dataclasses.replace(player, robot_info=dataclasses.replace(player.robot_info))
+    return step
+
+
+def test_event_tables(tmp_path):
+    for writer_process in [False, True]:
+        save_dir = tmp_path / str(writer_process)
+        d = DataCollector(save_dir, -1, mi.Match(_create_static_match_info()), writer_process=writer_process, event_tables=True)
+
+        step_dicts = []
+        for i in range(50):
+            step = _create_step_with_events(i)
+            step_dicts.append(step.to_dict())
+            d.create_new_step(i)
+            d.current_step().delta_real_time = step.delta_real_time
+            d.current_step().ball = step.ball
+            d.set_game_control_data(step.game_control_data)
+            d.set_teams(step.teams)
+            # The teams of the caller are not modified
+            assert step.to_dict() == step_dicts[-1]
+        d.finalize()
+
+        file_name = os.path.basename(glob.glob(os.path.join(save_dir, "referee_data_collection_COMPLETE_*.json"))[0])[:-5]
+        events = mi.read_events(save_dir, file_name)
+        # The clocks (seconds remaining change every 10 steps, seconds till unpenalized every step while penalized)
+        # do not add events, the penalty is given and removed once
+        assert len(events[mi.GAME_CONTROL_DATA_EVENTS]) == 1
+        assert len(events[mi.ROBOT_INFO_EVENTS]) == 3 + 1
+        assert "seconds_remaining" not in events[mi.GAME_CONTROL_DATA_EVENTS].columns
+
+        df = pd.read_feather(os.path.join(save_dir, file_name + ".feather"))
+        # Only the clocks are stored in the steps
+        event_columns = [c for c in df.columns if c.startswith("game_control_data.") or ".robot_info." in c]
+        assert {c for c in event_columns if df[c].notna().any()} == {
+            "game_control_data.seconds_remaining",
+            "game_control_data.secondary_seconds_remaining",
+            "game_control_data.drop_in_time",
+            "teams.team1.player1.robot_info.secs_till_unpenalized",
+            "teams.team2.player2.robot_info.secs_till_unpenalized",
+        }
+        df = mi.apply_events(df, events)
+        expected = pd.json_normalize(step_dicts).dropna(axis=1, how="all")
+        pd.testing.assert_frame_equal(df[expected.columns], expected, check_dtype=False)
+
+        with MatchReader(save_dir, file_name) as reader:
+            # Robot infos were removed from the collected steps, but are restored from the event tables
+            assert reader.step(42).to_dict() == step_dicts[42]
+
+
+def test_event_tables_team_size():
+    # A team with a fifth player: its robot info is recorded like the one of the other players
+    FiveTeam = dataclasses.make_dataclass(
+        "FiveTeam", [("player5", mi.Player, dataclasses.field(default=None))], bases=(mi.Team,)
+    )
+    teams = _create_step(0).teams
+    player = teams.team1.player1
+    team = FiveTeam(**{f.name: getattr(teams.team1, f.name) for f in dataclasses.fields(mi.Team)}, player5=player)
+    teams = dataclasses.replace(teams, team1=team)
+
+    events = mi.MatchEvents()
+    recorded = events.record_teams(1000, teams)
+
+    keys = [row[1:3] for row in events.tables[mi.ROBOT_INFO_EVENTS].rows()]
+    assert keys == [("team1", "player1"), ("team1", "player5"), ("team2", "player2")]
+    assert recorded.team1.player5.robot_info.penalty is None
+    assert recorded.team1.player5.robot_info.secs_till_unpenalized == player.robot_info.secs_till_unpenalized
+
+
 # TODO: Test data collector failure case (__del__)
 
 
@@ -0,0 +1,232 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+pytest.importorskip("google.protobuf")
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "post_processing"))
+
+import merge_teamcomm  # noqa: E402
+import robocup_extension_pb2  # noqa: E402
+
+import data_collection.match_info as mi  # noqa: E402
+from data_collection.pytests.test_static import _create_static_match_info  # noqa: E402
+from data_collection.pytests.test_step import _create_step  # noqa: E402
+
+
+def _create_messages(team: int, count: int, rng: np.random.Generator):
+    messages = []
+    for time in np.sort(rng.uniform(0, 12, size=count)):
+        msg = robocup_extension_pb2.Message()
+        msg.timestamp.seconds = int(time)
+        msg.timestamp.nanos = int((time - int(time)) * 1e9)
+        msg.current_pose.player_id = int(rng.integers(1, 5))
+        msg.current_pose.team = team
+        msg.current_pose.position.x, msg.current_pose.position.y, msg.current_pose.position.z = rng.normal(size=3)
+        msg.current_pose.covariance.x.x = rng.uniform()
+        msg.walk_command.x = rng.normal()
+        msg.ball.position.x = rng.normal()
+        msg.time_to_ball = rng.uniform()
+        msg.role = int(rng.integers(0, 5))
+        # A varying number of other robots of both teams and of unknown teams
+        for _ in range(int(rng.integers(0, 4))):
+            other = msg.others.add()
+            other.team = int(rng.integers(0, 3))
+            other.position.x = rng.normal()
+            # Some teams send fewer confidences than robots, the confidence of the last robots is None then
+            if rng.uniform() < 0.7:
+                msg.other_robot_confidence.append(rng.uniform())
+        messages.append(msg)
+    return messages
+
+
+def _fill_df_per_message(df, msgs, current_team, current_other_team):
+    # Implementation before the as-of join, which attaches each message on its own
+    for msg in msgs:
+        time, row = merge_teamcomm.team_comm_row(msg, current_team, current_other_team)
+        if time >= df["time"].iloc[-1]:
+            continue
+        idx = df["time"][df["time"] > time].index[0]
+        for col, value in row.items():
+            df.at[idx, col] = value
+    return df
+
+
+def _insert_new_columns_to_df(df: pd.DataFrame) -> pd.DataFrame:
+    # Columns which the implementation before the as-of join added before attaching the messages: all possible team
+    # communication columns as empty object columns, most of them stay empty
+
+    # Generate column names
+    columns = []
+
+    for team in [1, 2]:
+        for player_id in range(1, 4+1):
+            base_name = f"teams.team{team}.player{player_id}"
+
+            # Skip if the player is not in the match
+            if f"{base_name}.id" not in df.columns:
+                continue
+
+            base_name += ".team_comm"
+
+            columns.append(f"{base_name}.self_localization.pose.position.x")
+            columns.append(f"{base_name}.self_localization.pose.position.y")
+            columns.append(f"{base_name}.self_localization.pose.position.z")
+            for i in range(3*3):
+                columns.append(f"{base_name}.self_localization.covariance.{i}")
+
+            columns.append(f"{base_name}.walk_command.x")
+            columns.append(f"{base_name}.walk_command.y")
+            columns.append(f"{base_name}.walk_command.z")
+
+            columns.append(f"{base_name}.target_pose.pose.position.x")
+            columns.append(f"{base_name}.target_pose.pose.position.y")
+            columns.append(f"{base_name}.target_pose.pose.position.z")
+            for i in range(3*3):
+                columns.append(f"{base_name}.target_pose.pose.covariance.{i}")
+
+            columns.append(f"{base_name}.kick_target.x")
+            columns.append(f"{base_name}.kick_target.y")
+
+            columns.append(f"{base_name}.ball.position.x")
+            columns.append(f"{base_name}.ball.position.y")
+            columns.append(f"{base_name}.ball.position.z")
+            columns.append(f"{base_name}.ball.velocity.x")
+            columns.append(f"{base_name}.ball.velocity.y")
+            columns.append(f"{base_name}.ball.velocity.z")
+            for i in range(3*3):
+                columns.append(f"{base_name}.ball.covariance.{i}")
+
+            # Other players
+            for others_team in [1, 2, "_unknown"]:
+                others_player_ids = list(range(1, 4+1))
+                if others_team == team:
+                    others_player_ids.remove(player_id)
+                if others_team == "_unknown":
+                    # There is no mapping, therefore we use placeholders
+                    others_player_ids = list(range(1, 7+1))
+                for others_player_id in others_player_ids:
+                    others_base_name = f"{base_name}.others.team{others_team}.player{others_player_id}"
+                    columns.append(f"{others_base_name}.pose.position.x")
+                    columns.append(f"{others_base_name}.pose.position.y")
+                    columns.append(f"{others_base_name}.pose.position.z")
+                    columns.append(f"{others_base_name}.confidence")
+                    for i in range(3*3):
+                        columns.append(f"{others_base_name}.covariance.{i}")
+
+            # Extensions
+            columns.append(f"{base_name}.time_to_ball")
+            columns.append(f"{base_name}.role")
+            columns.append(f"{base_name}.action")
+
+    # New temporary dataframe to concat with the original one
+    new_df = pd.DataFrame(columns=columns)
+    return pd.concat([df, new_df], axis=1)
+
+
+@pytest.mark.filterwarnings("ignore::pandas.errors.PerformanceWarning")  # Caused by the per-message implementation
+def test_fill_df_with_data_matches_per_message_implementation():
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({"time": np.arange(0, 10, 0.5)})
+    for team in [1, 2]:
+        for player_id in range(1, 5):
+            df[f"teams.team{team}.player{player_id}.id"] = f"player_{player_id}"
+    df = _insert_new_columns_to_df(df)
+    blue_proto = _create_messages(1, 60, rng)
+    red_proto = _create_messages(2, 60, rng)
+
+    result = merge_teamcomm.fill_df_with_data(df.copy(), blue_proto, red_proto)
+
+    expected = _fill_df_per_message(df.copy(), blue_proto, 1, 2)
+    expected = _fill_df_per_message(expected, red_proto, 2, 1)
+    # The per-message implementation writes the None confidences as None instead of NaN
+    pd.testing.assert_frame_equal(result, expected.fillna(np.nan), check_dtype=False)
+
+
+def test_join_team_comm_explicit_none():
+    df = pd.DataFrame({"time": [1.0, 2.0]})
+    messages = []
+    for time, confidences in [(0.2, [0.5, 0.5]), (0.4, [0.25]), (1.5, [0.75])]:
+        msg = robocup_extension_pb2.Message()
+        msg.timestamp.nanos = int(time % 1 * 1e9)
+        msg.timestamp.seconds = int(time)
+        msg.current_pose.player_id = 1
+        msg.current_pose.team = 1
+        for confidence in confidences:
+            msg.others.add().team = 1
+            msg.other_robot_confidence.append(confidence)
+        msg.others.add().team = 1
+        messages.append(msg)
+
+    result = merge_teamcomm.join_team_comm(df.copy(), merge_teamcomm.team_comm_table(messages, 1, 2))
+
+    expected = _fill_df_per_message(df.copy(), messages, 1, 2).fillna(np.nan)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    base_name = "teams.team1.player1.team_comm.others.team1"
+    assert result.at[0, f"{base_name}.player0.confidence"] == 0.25
+    # The None confidence of the last message of the first step overwrites the confidence of the first message
+    assert np.isnan(result.at[0, f"{base_name}.player1.confidence"])
+
+
+def test_batch_post_processing(tmp_path):
+    import batch_post_processing
+
+    rng = np.random.default_rng(42)
+    for match in ["match1", "match2"]:
+        data_collection_dir = tmp_path / "event" / match / "data_collection"
+        data_collection_dir.mkdir(parents=True)
+        match_info = mi.Match(_create_static_match_info())
+        for i in range(20):
+            match_info.add_step(_create_step(i))
+        match_info.save(data_collection_dir, "referee_data_collection_COMPLETE", also_as_pickle=False)
+        with open(tmp_path / "event" / match / "bouncing_log.txt", "w") as f:
+            f.write("[0000.001] Robots in team blue are ['172.31.13.184']\n")
+            f.write("[0000.001] Robots in team red are ['172.31.1.9']\n")
+            for msg in _create_messages(1, 10, rng):
+                f.write(f"[0001.000] {[msg.timestamp.seconds, '172.31.13.184', 3737, msg.SerializeToString()]}\n")
+
+    match_dirs = batch_post_processing.find_match_dirs(str(tmp_path))
+    assert match_dirs == [str(tmp_path / "event" / "match1"), str(tmp_path / "event" / "match2")]
+
+    result = batch_post_processing.process_match(match_dirs[0], None, False)
+    assert result["status"] == "processed" and result["error"] is None
+    df = pd.read_feather(result["written"][0])
+    assert "teams.team1.player1.team_comm.walk_command.x" in df.columns
+    # The merged file is not found as a data collection file itself and is up to date
+    assert batch_post_processing.find_match_dirs(str(tmp_path)) == match_dirs
+    assert batch_post_processing.process_match(match_dirs[0], None, False)["status"] == "skipped"
+    assert batch_post_processing.process_match(match_dirs[0], None, True)["status"] == "processed"
+
+    result = batch_post_processing.process_match(match_dirs[1], None, False, long_format=True)
+    table = pa.feather.read_table(result["written"][0])
+    assert table.column_names[:3] == ["time", "team", "player"] and table.column_names[-1] == "step"
+
+
+def test_team_comm_long_table():
+    rng = np.random.default_rng(42)
+    blue_proto = _create_messages(1, 30, rng)
+    red_proto = _create_messages(2, 30, rng)
+
+    table = merge_teamcomm.team_comm_long_table(blue_proto, red_proto)
+
+    assert table.num_rows == 60
+    assert np.all(np.diff(table["time"].to_numpy()) >= 0)
+    assert table.schema.field("role").type == pa.uint8()
+    assert table.schema.field("ball.position.x").type == pa.float32()
+    # Only fields present in the messages, no columns without any value (the confidences can all be None)
+    assert all(table[name].null_count < table.num_rows for name in table.column_names
+               if not name.endswith(".confidence"))
+    assert "others.team_unknown.player6.pose.position.x" not in table.column_names
+
+    # Same values as in the wide format
+    df = pd.DataFrame({"time": np.arange(0, 20, 0.5)})
+    wide = merge_teamcomm.typed_team_comm_columns(merge_teamcomm.fill_df_with_data(df, blue_proto, red_proto))
+    assert wide["teams.team1.player1.team_comm.ball.position.x"].dtype == np.float32
+    msg = blue_proto[-1]
+    row = wide.iloc[np.searchsorted(df["time"], msg.timestamp.seconds + msg.timestamp.nanos * 1e-9, side="right")]
+    base_name = f"teams.team1.player{msg.current_pose.player_id}.team_comm"
+    assert row[f"{base_name}.walk_command.x"] == np.float32(msg.walk_command.x)
+    assert row[f"{base_name}.role"] == msg.role
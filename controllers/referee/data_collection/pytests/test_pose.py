@@ -0,0 +1,52 @@
+import numpy as np
+import transforms3d
+
+import data_collection.match_info as mi
+
+
+def _create_affines(count: int) -> np.ndarray:
+    rng = np.random.default_rng(42)
+    affines = np.zeros((count, 4, 4))
+    for i in range(count):
+        axis = rng.normal(size=3)
+        angle = rng.uniform(-np.pi, np.pi)
+        affines[i, :3, :3] = transforms3d.axangles.axangle2mat(axis, angle)
+    # Rotations by 180 degrees around the axes, where the w component is zero
+    affines[0, :3, :3] = np.diag([1, -1, -1])
+    affines[1, :3, :3] = np.diag([-1, 1, -1])
+    affines[2, :3, :3] = np.diag([-1, -1, 1])
+    affines[3, :3, :3] = np.eye(3)
+    affines[:, :3, 3] = rng.normal(size=(count, 3))
+    affines[:, 3, 3] = 1
+    return affines
+
+
+def test_affines_to_arrays_matches_mat2quat():
+    affines = _create_affines(100)
+
+    positions, quaternions = mi.affines_to_arrays(affines.reshape(-1, 16))
+
+    expected = np.array([transforms3d.quaternions.mat2quat(affine[:3, :3]) for affine in affines])
+    assert positions.shape == (100, 3) and quaternions.shape == (100, 4)
+    np.testing.assert_allclose(positions, affines[:, :3, 3])
+    # Quaternions with a zero w component are only defined up to their sign
+    signs = np.where(np.sum(quaternions * expected, axis=1) < 0, -1, 1)
+    np.testing.assert_allclose(quaternions, expected * signs[:, None], atol=1e-12)
+    np.testing.assert_allclose(mi.affines_to_arrays(affines)[1], quaternions)
+
+
+def test_poses_from_affines_matches_pose_from_affine():
+    affines = _create_affines(10)
+
+    poses = mi.poses_from_affines(affines)
+
+    assert len(poses) == 10
+    for affine, pose in zip(affines, poses):
+        assert pose == mi.pose_from_affine(affine.reshape(16))
+        assert pose == mi.pose_from_affine(affine)
+    assert mi.pose_from_affine(np.eye(4).reshape(16)) == mi.Pose(mi.Position(0, 0, 0), mi.Rotation(1, 0, 0, 0))
+
+
+if __name__ == "__main__":
+    test_affines_to_arrays_matches_mat2quat()
+    test_poses_from_affines_matches_pose_from_affine()
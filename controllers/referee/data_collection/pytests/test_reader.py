@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+import data_collection.match_info as mi
+from data_collection.reader import MatchReader, open_matches
+from data_collection.pytests.test_static import _create_static_match_info
+from data_collection.pytests.test_step import _create_step
+
+
+def _save_match(tmp_path, file_name: str, options: mi.SaveOptions) -> mi.Match:
+    match = mi.Match(_create_static_match_info())
+    for i in range(20):
+        step = _create_step(i * 8)
+        step.ball = mi.Ball("ball_id", mi.Frame("ball_frame", mi.Pose(mi.Position(float(i), 0, 0), mi.Rotation(1, 0, 0, 0))))
+        match.add_step(step)
+    match.save(tmp_path, file_name, options=options)
+    return match
+
+
+def test_read_columns_and_time_ranges(tmp_path):
+    match = _save_match(tmp_path, "match", mi.SaveOptions(compression="uncompressed", also_as_pickle=False))
+
+    with MatchReader(tmp_path, "match") as reader:
+        assert len(reader) == 20
+        assert reader.get_static_match_info() == match.get_static_match_info()
+        assert reader.index_range(16, 40) == slice(2, 5)
+        assert reader.index_range(1000) == slice(20, 20)
+
+        # Uncompressed numeric columns are views of the memory-mapped file
+        x = reader.column("ball.frame.pose.position.x")
+        assert not x.flags.owndata
+        np.testing.assert_array_equal(x, np.arange(20.0))
+
+        positions = reader.ball_positions(16, 40)
+        assert positions.shape == (3, 3)
+        np.testing.assert_array_equal(positions[:, 0], [2.0, 3.0, 4.0])
+
+        pose = match.get_steps()[0].teams.team1.player1.l_sole.pose
+        frames = reader.player_frames("team1", "player1", "l_sole")
+        assert frames.shape == (20, 7)
+        np.testing.assert_array_equal(
+            frames[0],
+            [pose.position.x, pose.position.y, pose.position.z, pose.rotation.x, pose.rotation.y, pose.rotation.z, pose.rotation.w],
+        )
+
+        with pytest.raises(KeyError):
+            reader.column("ball.frame.pose.position.a")
+
+
+def test_rebuild_steps(tmp_path):
+    match = _save_match(tmp_path, "match", mi.SaveOptions(enum_encoding="category", also_as_pickle=False))
+    _save_match(tmp_path, "other_match", mi.SaveOptions(compression="zstd"))
+
+    readers = open_matches(tmp_path)
+    assert [reader.file_name for reader in readers] == ["match", "other_match"]
+
+    reader = readers[0]
+    assert reader.step(3) == match.get_steps()[3]
+    assert reader.step(-1) == match.get_steps()[-1]
+    assert list(reader.steps(16, 40)) == match.get_steps()[2:5]
+    with pytest.raises(IndexError):
+        reader.step(20)
+
+    for reader in readers:
+        reader.close()
+
+
+def _create_referee_step(time: int) -> mi.Step:
+    # Like create_player in referee.py, the links of the players are stored as Poses instead of Frames
+    def pose(x: float) -> mi.Pose:
+        return mi.Pose(mi.Position(x, 1.0, 2.0), mi.Rotation(0.0, 0.0, 0.0, 1.0))
+
+    def player(id: str) -> mi.Player:
+        return mi.Player(
+            id,
+            base_link=pose(time),
+            l_sole=pose(time + 0.1),
+            r_sole=pose(time + 0.2),
+            l_gripper=pose(time + 0.3),
+            r_gripper=pose(time + 0.4),
+            camera_frame=pose(time + 0.5),
+        )
+
+    step = _create_step(time)
+    step.teams = mi.Teams(mi.Team("1", player1=player("1")), mi.Team("2", player1=player("1")))
+    return step
+
+
+def test_read_referee_layout(tmp_path):
+    match = mi.Match(_create_static_match_info())
+    for i in range(5):
+        match.add_step(_create_referee_step(i * 8))
+    match.save(tmp_path, "match", options=mi.SaveOptions(also_as_pickle=False))
+
+    with MatchReader(tmp_path, "match") as reader:
+        assert "teams.team1.player1.base_link.position.x" in reader.column_names
+        frames = reader.player_frames("team1", "player1", "base_link")
+        assert frames.shape == (5, 7)
+        np.testing.assert_array_equal(frames[:, 0], np.arange(5) * 8.0)
+        np.testing.assert_array_equal(frames[0, 1:], [1.0, 2.0, 0.0, 0.0, 0.0, 1.0])
+
+        step = reader.step(2)
+        assert step == match.get_steps()[2]
+        assert isinstance(step.teams.team1.player1.base_link, mi.Pose)
+        assert step.teams.team1.player1.l_camera_frame is None
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_collection.match_info as mi
+from data_collection.pytests.test_static import _create_static_match_info
+from data_collection.pytests.test_step import _create_step
+
+
+def _save(tmp_path, options: mi.SaveOptions) -> pd.DataFrame:
+    match = mi.Match(_create_static_match_info())
+    for i in range(5):
+        match.add_step(_create_step(i))
+    match.save(tmp_path, "match", options=options)
+    return pd.read_feather(tmp_path / "match.feather")
+
+
+def test_default_options_keep_column_types(tmp_path):
+    df = _save(tmp_path, mi.SaveOptions(also_as_pickle=False))
+
+    expected = pd.json_normalize([_create_step(i).to_dict() for i in range(5)])
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+    assert not (tmp_path / "match.pkl").exists()
+
+
+def test_float32_poses_and_enum_encodings(tmp_path):
+    df = _save(tmp_path, mi.SaveOptions(compression="zstd", float32_poses=True, enum_encoding="uint8"))
+
+    assert df["teams.team1.player1.base_link.pose.position.x"].dtype == np.float32
+    assert df["teams.team1.player1.state"].dtype == np.uint8
+    assert df["teams.team1.player1.robot_info.penalty"].dtype == np.uint8
+    assert df["time"].dtype == np.int64
+    assert (tmp_path / "match.pkl").exists()
+
+    df = _save(tmp_path, mi.SaveOptions(enum_encoding="category"))
+    step = _create_step(0)
+    assert isinstance(df["teams.team1.player1.role"].dtype, pd.CategoricalDtype)
+    assert df["teams.team1.player1.role"].iloc[0] == step.teams.team1.player1.role.name
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        mi.SaveOptions(compression="gzip")
+    with pytest.raises(ValueError):
+        mi.SaveOptions(enum_encoding="int8")
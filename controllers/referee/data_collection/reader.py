@@ -0,0 +1,265 @@
+import glob
+import os
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from data_collection import match_info as mi
+
+_POSITION = ("position.x", "position.y", "position.z")
+_ROTATION = ("rotation.x", "rotation.y", "rotation.z", "rotation.w")
+
+
+class MatchReader:
+    def __init__(self, save_dir: os.PathLike, file_name: str) -> None:
+        """Reads a saved match from its memory-mapped feather file.
+        Only the requested columns are read. If the file is uncompressed (see `SaveOptions`), numeric columns without
+        missing values are zero-copy views of the file, otherwise only the requested columns are decompressed.
+        Arrays with several columns (e.g. positions) are assembled from the requested rows only.
+
+        :param save_dir: Path to directory where the match data is stored
+        :type save_dir: os.PathLike
+        :param file_name: Name under which the match data is stored (without file extension)
+        :type file_name: str
+        """
+        self.save_dir: os.PathLike = save_dir
+        self.file_name: str = file_name
+        self.path: str = os.path.join(save_dir, file_name + ".feather")
+
+        self._source: pa.MemoryMappedFile = pa.memory_map(self.path)
+        self._reader: pa.ipc.RecordBatchFileReader = pa.ipc.open_file(self._source)
+        self.schema: pa.Schema = self._reader.schema
+
+        self._times: Optional[np.ndarray] = None
+        self._batch_offsets: Optional[np.ndarray] = None  # Index of the first step of each record batch
+        self._batch: Optional[pa.RecordBatch] = None  # Last record batch read to rebuild steps
+        self._batch_index: int = -1
+        self._static: Optional[mi.StaticMatchInfo] = None
+        self._events: Optional[Dict[str, pd.DataFrame]] = None
+
+    def __enter__(self) -> "MatchReader":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.times())
+
+    def close(self) -> None:
+        """Close the memory-mapped file. Arrays returned before stay valid."""
+        self._batch = None
+        self._source.close()
+
+    @property
+    def column_names(self) -> List[str]:
+        return self.schema.names
+
+    def get_static_match_info(self) -> mi.StaticMatchInfo:
+        """Get the static match info, read from <file_name>.json.
+
+        :return: Static match info
+        :rtype: mi.StaticMatchInfo
+        """
+        if self._static is None:
+            with open(os.path.join(self.save_dir, self.file_name + ".json"), "r") as f:
+                self._static = mi.StaticMatchInfo.from_json(f.read())
+        return self._static
+
+    def _read_table(self, names: Sequence[str]) -> pa.Table:
+        """Read some columns of all record batches.
+
+        :param names: Names of the columns
+        :type names: Sequence[str]
+        :raises KeyError: If a column does not exist
+        :return: Columns
+        :rtype: pa.Table
+        """
+        indices = []
+        for name in names:
+            index = self.schema.get_field_index(name)
+            if index < 0:
+                raise KeyError(f"No column '{name}' in '{self.path}'")
+            indices.append(index)
+        options = pa.ipc.IpcReadOptions(included_fields=indices)
+        table = pa.ipc.open_file(self._source, options=options).read_all()
+        # Included fields are read in the order of the file
+        return table.select(list(names))
+
+    def times(self) -> np.ndarray:
+        """Get the time of all steps.
+
+        :return: Times with shape (T,)
+        :rtype: np.ndarray
+        """
+        if self._times is None:
+            column = self._read_table(["time"]).column(0)
+            lengths = [len(chunk) for chunk in column.chunks]
+            self._batch_offsets = np.cumsum([0] + lengths[:-1])
+            self._times = _to_numpy(column)
+        return self._times
+
+    def index_range(self, start_time: Optional[float] = None, stop_time: Optional[float] = None) -> slice:
+        """Get the indices of the steps in a time range with a binary search on the time column.
+
+        :param start_time: First time to include, defaults to None (start of the match)
+        :type start_time: Optional[float], optional
+        :param stop_time: First time to exclude, defaults to None (end of the match)
+        :type stop_time: Optional[float], optional
+        :return: Indices of the steps
+        :rtype: slice
+        """
+        times = self.times()
+        start = 0 if start_time is None else int(np.searchsorted(times, start_time, side="left"))
+        stop = len(times) if stop_time is None else int(np.searchsorted(times, stop_time, side="left"))
+        return slice(start, max(start, stop))
+
+    def column(self, name: str, start_time: Optional[float] = None, stop_time: Optional[float] = None) -> np.ndarray:
+        """Get a column in a time range.
+
+        :param name: Name of the column (e.g. ball.frame.pose.position.x)
+        :type name: str
+        :param start_time: First time to include, defaults to None (start of the match)
+        :type start_time: Optional[float], optional
+        :param stop_time: First time to exclude, defaults to None (end of the match)
+        :type stop_time: Optional[float], optional
+        :return: Values with shape (T,)
+        :rtype: np.ndarray
+        """
+        rows = self.index_range(start_time, stop_time)
+        column = self._read_table([name]).column(0)
+        return _to_numpy(column.slice(rows.start, rows.stop - rows.start))
+
+    def columns(
+        self, names: Sequence[str], start_time: Optional[float] = None, stop_time: Optional[float] = None
+    ) -> np.ndarray:
+        """Get several columns in a time range as one array.
+
+        :param names: Names of the columns
+        :type names: Sequence[str]
+        :param start_time: First time to include, defaults to None (start of the match)
+        :type start_time: Optional[float], optional
+        :param stop_time: First time to exclude, defaults to None (end of the match)
+        :type stop_time: Optional[float], optional
+        :return: Values with shape (T, len(names))
+        :rtype: np.ndarray
+        """
+        rows = self.index_range(start_time, stop_time)
+        table = self._read_table(names).slice(rows.start, rows.stop - rows.start)
+        return np.column_stack([_to_numpy(column) for column in table.columns])
+
+    def ball_positions(self, start_time: Optional[float] = None, stop_time: Optional[float] = None) -> np.ndarray:
+        """Get the positions of the ball.
+
+        :param start_time: First time to include, defaults to None (start of the match)
+        :type start_time: Optional[float], optional
+        :param stop_time: First time to exclude, defaults to None (end of the match)
+        :type stop_time: Optional[float], optional
+        :return: Positions (x, y, z) with shape (T, 3)
+        :rtype: np.ndarray
+        """
+        return self.columns([f"ball.frame.pose.{name}" for name in _POSITION], start_time, stop_time)
+
+    def player_frames(
+        self,
+        team: str,
+        player: str,
+        frame: str,
+        start_time: Optional[float] = None,
+        stop_time: Optional[float] = None,
+    ) -> np.ndarray:
+        """Get the poses of a frame of a player.
+
+        :param team: Team (team1 or team2)
+        :type team: str
+        :param player: Player (player1 to player4)
+        :type player: str
+        :param frame: Frame (e.g. base_link, l_sole, camera_frame)
+        :type frame: str
+        :param start_time: First time to include, defaults to None (start of the match)
+        :type start_time: Optional[float], optional
+        :param stop_time: First time to exclude, defaults to None (end of the match)
+        :type stop_time: Optional[float], optional
+        :return: Poses with shape (T, 7): position x, y, z and rotation x, y, z, w as stored in the Pose columns
+        :rtype: np.ndarray
+        """
+        # The frames of a player are stored as Frames (<frame>.pose.position.x) or, as the referee does, as Poses
+        # (<frame>.position.x)
+        prefix = f"teams.{team}.{player}.{frame}.pose."
+        if self.schema.get_field_index(prefix + _POSITION[0]) < 0:
+            prefix = f"teams.{team}.{player}.{frame}."
+        return self.columns([prefix + name for name in _POSITION + _ROTATION], start_time, stop_time)
+
+    def step(self, index: int) -> mi.Step:
+        """Rebuild the step at an index. Only the record batch holding the step is read.
+        Data stored in event tables (see `MatchEvents`) is added back to the step.
+
+        :param index: Index of the step
+        :type index: int
+        :raises IndexError: If there is no step at the index
+        :return: Step
+        :rtype: mi.Step
+        """
+        times = self.times()
+        if index < 0:
+            index += len(times)
+        if not 0 <= index < len(times):
+            raise IndexError(f"Step index {index} out of range for a match with {len(times)} steps")
+        batch_index = int(np.searchsorted(self._batch_offsets, index, side="right")) - 1
+        if batch_index != self._batch_index:
+            self._batch = self._reader.get_batch(batch_index)
+            self._batch_index = batch_index
+        row = self._batch.slice(index - self._batch_offsets[batch_index], 1).to_pylist()[0]
+
+        if self._events is None:
+            self._events = mi.read_events(self.save_dir, self.file_name)
+        if self._events:
+            row = mi.apply_events(pd.DataFrame([row]), self._events).iloc[0].to_dict()
+        return mi.unflatten_step(row)
+
+    def steps(self, start_time: Optional[float] = None, stop_time: Optional[float] = None) -> Iterator[mi.Step]:
+        """Rebuild the steps in a time range lazily, one at a time.
+
+        :param start_time: First time to include, defaults to None (start of the match)
+        :type start_time: Optional[float], optional
+        :param stop_time: First time to exclude, defaults to None (end of the match)
+        :type stop_time: Optional[float], optional
+        :return: Steps
+        :rtype: Iterator[mi.Step]
+        """
+        rows = self.index_range(start_time, stop_time)
+        for index in range(rows.start, rows.stop):
+            yield self.step(index)
+
+
+def open_matches(directory: os.PathLike) -> List[MatchReader]:
+    """Open all matches saved in a directory, e.g. to read the trajectory of a player over a whole tournament.
+    Opening a match only reads its schema.
+
+    :param directory: Path to the directory
+    :type directory: os.PathLike
+    :return: Readers sorted by file name
+    :rtype: List[MatchReader]
+    """
+    event_suffixes = tuple(mi.event_file_suffixes())
+    readers = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.feather"))):
+        if path.endswith(event_suffixes):
+            continue
+        readers.append(MatchReader(directory, os.path.basename(path)[: -len(".feather")]))
+    return readers
+
+
+def _to_numpy(column: pa.ChunkedArray) -> np.ndarray:
+    """Convert a column to NumPy, without a copy if it has a single chunk of a numeric type without missing values.
+
+    :param column: Column
+    :type column: pa.ChunkedArray
+    :return: Values
+    :rtype: np.ndarray
+    """
+    if column.num_chunks == 1:
+        return column.chunk(0).to_numpy(zero_copy_only=False)
+    return column.to_numpy()
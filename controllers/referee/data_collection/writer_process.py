@@ -0,0 +1,300 @@
+import multiprocessing
+import os
+import time
+import traceback
+from queue import Empty
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+from data_collection import match_info as mi
+from data_collection.chunked_writer import ChunkedMatchWriter
+
+# How long the writer process waits for a message before checking whether the referee is still alive
+_POLL_TIMEOUT = 1.0
+
+# How long the referee waits for the writer process to finish writing the final files
+_CLOSE_TIMEOUT = 120.0
+
+# Default number of received steps after which the writer process appends a chunk, whatever the autosave interval, so
+# that neither process keeps the steps of the whole match in memory
+DEFAULT_CHUNK_SIZE = 1024
+
+
+def _rows_to_table(rows: List[Dict[str, Any]]) -> pa.Table:
+    """Convert flattened steps to an Arrow table. Columns missing in some rows are filled with nulls.
+    AffinePoses are converted to the columns of a Pose.
+
+    :param rows: Flattened steps
+    :type rows: List[Dict[str, Any]]
+    :return: Arrow table
+    :rtype: pa.Table
+    """
+    return mi.expand_affine_columns(pa.Table.from_pandas(pd.DataFrame.from_records(rows), preserve_index=False))
+
+
+def _writer_main(
+    queue: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+    static: mi.StaticMatchInfo,
+    save_dir: os.PathLike,
+    chunk_dir_name: str,
+    autosave_interval: int,
+    failure_file_name: str,
+    options: Optional[mi.SaveOptions],
+    chunk_size: int,
+) -> None:
+    """Main loop of the writer process.
+    Receives batches of flattened steps, appends them as chunks every autosave_interval seconds or every chunk_size
+    steps and compacts the chunks when the match is closed or the referee process is gone.
+    The number of steps written in chunks is reported after each chunk, so that the referee can release them.
+
+    :param queue: Queue with messages from the referee
+    :type queue: multiprocessing.Queue
+    :param results: Queue to report errors and completion back to the referee
+    :type results: multiprocessing.Queue
+    :param static: Static match info
+    :type static: mi.StaticMatchInfo
+    :param save_dir: Path to directory where to store match data
+    :type save_dir: os.PathLike
+    :param chunk_dir_name: Name of the chunk directory
+    :type chunk_dir_name: str
+    :param autosave_interval: Interval in seconds to append chunks. Set to -1 to only append every chunk_size steps
+    :type autosave_interval: int
+    :param failure_file_name: File name to use if the referee process is gone without closing the match
+    :type failure_file_name: str
+    :param options: Compression and column types of the final files
+    :type options: Optional[mi.SaveOptions]
+    :param chunk_size: Number of received steps after which a chunk is appended
+    :type chunk_size: int
+    """
+    writer: Optional[ChunkedMatchWriter] = None
+    rows: List[Dict[str, Any]] = []
+    events: Optional[mi.MatchEvents] = None
+    next_autosave_time: float = time.time() + autosave_interval
+
+    def flush() -> ChunkedMatchWriter:
+        nonlocal writer, rows
+        if writer is None:
+            writer = ChunkedMatchWriter(save_dir, chunk_dir_name)
+            writer.write_static(static)
+        if rows:
+            writer.append(_rows_to_table(rows))
+            rows = []
+            results.put(("written", writer.steps_written))
+        if events is not None:
+            writer.write_events(events)
+        return writer
+
+    try:
+        while True:
+            try:
+                kind, payload = queue.get(timeout=_POLL_TIMEOUT)
+            except Empty:
+                parent = multiprocessing.parent_process()
+                if parent is not None and not parent.is_alive():
+                    kind, payload = "close", failure_file_name
+                else:
+                    kind, payload = None, None
+
+            if kind == "rows":
+                rows.extend(payload)
+            elif kind == "events":
+                if events is None:
+                    events = mi.MatchEvents()
+                for name, event_rows in payload.items():
+                    events.tables[name].extend(event_rows)
+            elif kind == "close":
+                flush().compact(save_dir, payload, options=options)
+                results.put(("done", None))
+                return
+
+            if autosave_interval >= 0 and time.time() >= next_autosave_time:
+                next_autosave_time = time.time() + autosave_interval
+                flush()
+            elif len(rows) >= chunk_size:
+                flush()
+    except Exception:
+        results.put(("error", traceback.format_exc()))
+        # Keep whatever was received so far, the referee compacts the chunks itself
+        try:
+            flush()
+        except Exception:
+            pass
+
+
+class WriterProcess:
+    def __init__(
+        self,
+        static: mi.StaticMatchInfo,
+        save_dir: os.PathLike,
+        chunk_dir_name: str,
+        autosave_interval: int,
+        failure_file_name: str,
+        batch_size: int = 32,
+        options: Optional[mi.SaveOptions] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        """Child process owning the serialization of the collected steps.
+        The referee only pushes flattened steps, which are sent to the child in batches.
+        A crash of the writer process does not affect the referee: the steps are kept until the writer process
+        reports that they are written in a chunk, the steps which are not in a chunk are written by the referee
+        itself when the match is closed. The writer process appends a chunk every autosave_interval seconds and
+        every chunk_size steps, so that the steps are released regularly even with autosave_interval -1.
+
+        :param static: Static match info
+        :type static: mi.StaticMatchInfo
+        :param save_dir: Path to directory where to store match data
+        :type save_dir: os.PathLike
+        :param chunk_dir_name: Name of the chunk directory
+        :type chunk_dir_name: str
+        :param autosave_interval: Interval in seconds to append chunks. Set to -1 to only append every chunk_size steps
+        :type autosave_interval: int
+        :param failure_file_name: File name used by the writer process if the referee process is gone
+        :type failure_file_name: str
+        :param batch_size: Number of steps sent to the writer process at once, defaults to 32
+        :type batch_size: int, optional
+        :param options: Compression and column types of the final files, defaults to None
+        :type options: Optional[mi.SaveOptions], optional
+        :param chunk_size: Number of steps after which the writer process appends a chunk, defaults to
+            DEFAULT_CHUNK_SIZE
+        :type chunk_size: int, optional
+        """
+        self.static: mi.StaticMatchInfo = static
+        self.save_dir: os.PathLike = save_dir
+        self.chunk_dir_name: str = chunk_dir_name
+        self.batch_size: int = batch_size
+        self.options: Optional[mi.SaveOptions] = options
+        self.error: Optional[str] = None  # Traceback of the writer process, if it failed
+
+        self._batch: List[Dict[str, Any]] = []
+        self._unsent: List[Dict[str, Any]] = []  # Steps which are not written in a chunk yet
+        self._first_unsent: int = 0  # Index of the first step of _unsent in the match
+        self._done: bool = False  # True, once the writer process wrote the final files
+
+        # Fork, so that the child does not import the Webots controller (the main module) again
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        self._queue: multiprocessing.Queue = context.Queue()
+        self._results: multiprocessing.Queue = context.Queue()
+        self._process = context.Process(
+            target=_writer_main,
+            args=(
+                self._queue,
+                self._results,
+                static,
+                save_dir,
+                chunk_dir_name,
+                autosave_interval,
+                failure_file_name,
+                options,
+                chunk_size,
+            ),
+            daemon=False,  # Should be able to finish writing after the referee exited
+        )
+        self._process.start()
+
+    def failed(self) -> bool:
+        """Check whether the writer process failed, without blocking.
+
+        :return: True, if the writer process reported an error or is not running anymore
+        :rtype: bool
+        """
+        if self.error is None:
+            while self.error is None:
+                try:
+                    self._handle_result(*self._results.get_nowait())
+                except Empty:
+                    break
+            if self.error is None and not self._done and not self._process.is_alive():
+                self.error = f"Writer process exited unexpectedly with code {self._process.exitcode}"
+        return self.error is not None
+
+    def _handle_result(self, kind: str, payload: Any) -> None:
+        """Handle a message of the writer process.
+
+        :param kind: Kind of message: written (number of steps written in chunks), error (traceback) or done
+        :type kind: str
+        :param payload: Payload of the message
+        :type payload: Any
+        """
+        if kind == "written":
+            # Release the steps written in chunks
+            del self._unsent[: max(0, payload - self._first_unsent)]
+            self._first_unsent = max(self._first_unsent, payload)
+        elif kind == "error":
+            self.error = payload
+        elif kind == "done":
+            self._done = True
+
+    def push(self, row: Dict[str, Any]) -> None:
+        """Push a flattened step. Steps are sent to the writer process once a batch is full.
+
+        :param row: Flattened step
+        :type row: Dict[str, Any]
+        """
+        self._batch.append(row)
+        if len(self._batch) >= self.batch_size:
+            self._send_batch()
+
+    def push_events(self, rows: Dict[str, List[Tuple[Any, ...]]]) -> None:
+        """Send new change events to the writer process, unless it failed.
+        The events are still saved by the referee process in that case.
+
+        :param rows: New events by event table name
+        :type rows: Dict[str, List[Tuple[Any, ...]]]
+        """
+        if not self.failed():
+            self._queue.put(("events", rows))
+
+    def _send_batch(self) -> None:
+        """Send the current batch to the writer process, unless it failed. The steps are kept until they are written."""
+        if not self._batch:
+            return
+        self._unsent.extend(self._batch)
+        if not self.failed():
+            self._queue.put(("rows", self._batch))
+        self._batch = []
+
+    def close(self, file_name: str, logger=None) -> None:
+        """Send the remaining steps and let the writer process compact all chunks into the final files.
+        If the writer process failed, the chunks written so far and the steps which are not in a chunk are compacted
+        by the caller.
+
+        :param file_name: Name under which to store the match data (without file extension)
+        :type file_name: str
+        :param logger: Logger, defaults to None
+        :type logger: Optional[Logger], optional
+        """
+        self._send_batch()
+        if not self.failed():
+            self._queue.put(("close", file_name))
+            deadline = time.time() + _CLOSE_TIMEOUT
+            while not self._done and self.error is None:
+                try:
+                    self._handle_result(*self._results.get(timeout=max(0.0, deadline - time.time())))
+                except Empty:
+                    self.error = "Writer process did not finish in time"
+                    self._process.terminate()
+        self._process.join()
+        if self.error is not None:
+            # Nobody reads the queue anymore, don't block on exit while flushing it
+            self._queue.cancel_join_thread()
+        self._queue.close()
+        self._results.close()
+
+        if self.error is None:
+            return
+
+        # Fallback: write the data in this process
+        if logger:
+            logger.error(f"Data collection writer process failed, saving in referee process instead: {self.error}")
+        writer = ChunkedMatchWriter(self.save_dir, self.chunk_dir_name)
+        writer.write_static(self.static)
+        # The manifest lists the complete chunks, even if the writer process failed before reporting the last one
+        unsent = self._unsent[max(0, writer.steps_written - self._first_unsent):]
+        if unsent:
+            writer.append(_rows_to_table(unsent))
+        self._unsent = []
+        writer.compact(self.save_dir, file_name, logger, options=self.options)
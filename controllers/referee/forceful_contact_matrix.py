@@ -16,42 +16,63 @@ import numpy as np
 
 
 class ForcefulContactMatrix:
+    """Contacts between each pair of red and blue robots over a sliding time window.
+
+    The window of each pair is stored as bits, 8 time steps per byte, and the number of contacts in the window of each
+    pair is kept up to date by set_contact and clear, so that the collision time of a pair is read in constant time and
+    the pairs in contact or in long collision are found with array operations.
+    """
+
     def __init__(self, red_team_size, blue_team_size, observation_duration, foul_duration, time_step):
         self.red_team_size = red_team_size
         self.blue_team_size = blue_team_size
         self.foul_duration = int((1000 * foul_duration) / time_step)
         self.time_window_size = int((1000 * observation_duration) / time_step)
         self.time_step = time_step
-        self.matrix = np.zeros([red_team_size, blue_team_size, self.time_window_size], dtype=bool)
+        self.matrix = np.zeros([red_team_size, blue_team_size, (self.time_window_size + 7) // 8], dtype=np.uint8)
+        self.counts = np.zeros([red_team_size, blue_team_size], dtype=np.int32)  # contacts in the window of each pair
 
-    def clear(self, time_count):
+    def _slot(self, time_count):
         index = int(time_count / self.time_step) % self.time_window_size
-        for i in range(self.red_team_size):
-            for j in range(self.blue_team_size):
-                self.matrix[i][j][index] = False
+        return index >> 3, np.uint8(1 << (index & 7))
+
+    def clear(self, time_count):
+        byte, bit = self._slot(time_count)
+        column = self.matrix[:, :, byte]
+        self.counts -= (column & bit) != 0
+        column &= ~bit
 
     def clear_all(self):
-        self.matrix.fill(False)
+        self.matrix.fill(0)
+        self.counts.fill(0)
 
     def set_contact(self, red_number, blue_number, time_count, value=True):
-        index = int(time_count / self.time_step) % self.time_window_size
-        self.matrix[int(red_number) - 1][int(blue_number) - 1][index] = value
+        byte, bit = self._slot(time_count)
+        i, j = int(red_number) - 1, int(blue_number) - 1
+        was_set = (self.matrix[i, j, byte] & bit) != 0
+        if value and not was_set:
+            self.matrix[i, j, byte] |= bit
+            self.counts[i, j] += 1
+        elif was_set and not value:
+            self.matrix[i, j, byte] &= ~bit
+            self.counts[i, j] -= 1
 
     def contact(self, red_number, blue_number, time_count):
-        index = int(time_count / self.time_step) % self.time_window_size
-        return self.matrix[int(red_number) - 1][int(blue_number) - 1][index]
+        byte, bit = self._slot(time_count)
+        return (self.matrix[int(red_number) - 1, int(blue_number) - 1, byte] & bit) != 0
+
+    def contacts(self, time_count):
+        """Return the (red number, blue number) pairs of robots in contact at this time, sorted by red then blue number"""
+        byte, bit = self._slot(time_count)
+        return [(str(i + 1), str(j + 1)) for i, j in np.argwhere(self.matrix[:, :, byte] & bit)]
 
     def get_collision_time(self, red_number, blue_number):
         """Return collision time in seconds of the collision between both robots"""
-        sum = 0
-        for touch in self.matrix[int(red_number) - 1][int(blue_number) - 1]:
-            if touch:
-                sum += 1
-        return sum * self.time_step / 1000
+        return int(self.counts[int(red_number) - 1, int(blue_number) - 1]) * self.time_step / 1000
 
     def long_collision(self, red_number, blue_number):
-        sum = 0
-        for touch in self.matrix[int(red_number) - 1][int(blue_number) - 1]:
-            if touch:
-                sum += 1
-        return sum > self.foul_duration
+        return self.counts[int(red_number) - 1, int(blue_number) - 1] > self.foul_duration
+
+    def long_collisions(self):
+        """Return the (red number, blue number) pairs of robots in long collision, sorted by red then blue number"""
+        return [(str(i + 1), str(j + 1)) for i, j in np.argwhere(self.counts > self.foul_duration)]
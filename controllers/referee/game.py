@@ -33,6 +33,18 @@ class Game(SimpleNamespace):
             self.minimum_real_time_factor = 3  # we guarantee that each time step lasts at least 3x simulated time
         if not hasattr(self, 'press_a_key_to_terminate'):
             self.press_a_key_to_terminate = False
+        if not hasattr(self, 'supervisor_tracking'):
+            self.supervisor_tracking = False
+        if not hasattr(self, 'supervisor_tracking_period'):
+            self.supervisor_tracking_period = int(self.blackboard.supervisor.getBasicTimeStep())
+        if not hasattr(self, 'supervisor_tracking_benchmark'):
+            self.supervisor_tracking_benchmark = 0  # disabled
+        if not hasattr(self, 'step_profiling'):
+            self.step_profiling = False
+        if not hasattr(self, 'step_profiling_window'):
+            self.step_profiling_window = 1000  # steps
+        if not hasattr(self, 'step_profiling_export_period'):
+            self.step_profiling_export_period = 10  # real seconds
 
         self.penalty_shootout = self.type == 'PENALTY'
         self.penalty_shootout_count = 0
@@ -0,0 +1,169 @@
+# Copyright 1996-2021 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import select
+import time
+
+import numpy as np
+
+
+class RoundTripTimes:
+    """Round-trip times of the last `window` messages of a command in a ring buffer, in seconds."""
+
+    __slots__ = ['count', 'samples']
+
+    def __init__(self):
+        self.count = 0
+        self.samples = []
+
+    def add(self, rtt, window):
+        if len(self.samples) < window:
+            self.samples.append(rtt)
+        else:
+            self.samples[self.count % window] = rtt
+        self.count += 1
+
+
+class GameControllerChannel:
+    """Pipelined command channel to the GameControllerSimulator over its TCP socket.
+
+    Each message is sent as `<id>:<message>` and acknowledged by the GameController with `<id>:<result>`. Messages are
+    not waited for when they are sent: acknowledgments are matched by id whenever the channel is polled, and
+    `wait_for_ack` waits on the socket with select instead of spinning. CLOCK messages are coalesced, at most one is
+    in flight and only the latest clock is sent once it is acknowledged. The round-trip time of each acknowledged
+    message is recorded per command.
+    """
+
+    # Number of round-trip times kept per command for the percentiles
+    RTT_WINDOW = 1000
+
+    def __init__(self, sock):
+        self.socket = sock
+        self.socket.setblocking(False)
+        self.send_id = 0
+        self.unanswered = {}  # id: (message, send time)
+        self.outgoing = bytearray()
+        self.incoming = b''
+        self.clock_in_flight = None
+        self.pending_clock = None
+        self.rtt = {}  # command: RoundTripTimes
+
+    def send(self, message):
+        """Queue a message, send as much as possible without blocking and return its id."""
+        self.send_id += 1
+        self.unanswered[self.send_id] = (message, time.perf_counter())
+        self.outgoing += f'{self.send_id}:{message}\n'.encode('ascii')
+        self.flush()
+        return self.send_id
+
+    def send_clock(self, ms):
+        """Send the clock, or remember it if a CLOCK message is still in flight. Returns False if it was coalesced."""
+        if self.clock_in_flight is not None:
+            self.pending_clock = ms
+            return False
+        self.pending_clock = None
+        self.clock_in_flight = self.send(f'CLOCK:{ms}')
+        return True
+
+    def flush(self):
+        while self.outgoing:
+            try:
+                sent = self.socket.send(self.outgoing)
+            except BlockingIOError:
+                return
+            del self.outgoing[:sent]
+
+    def poll(self, timeout=0):
+        """Send the queued data and process the available acknowledgments, waiting up to timeout seconds (None to
+        wait forever) for the socket to be ready.
+
+        :return: (message, result) of each acknowledgment which is not OK, message is None for unknown ids or
+            malformed answers
+        """
+        writable = [self.socket] if self.outgoing else []
+        readable, writable, _ = select.select([self.socket], writable, [], timeout)
+        if writable:
+            self.flush()
+        if not readable:
+            return []
+        chunks = [self.incoming]
+        while True:
+            try:
+                data = self.socket.recv(65536)
+            except BlockingIOError:
+                break
+            if not data:  # The GameController closed the connection
+                raise ConnectionError('GameController closed the connection')
+            chunks.append(data)
+        lines = b''.join(chunks).split(b'\n')
+        self.incoming = lines.pop()  # incomplete answer
+        return self._process(lines)
+
+    def _process(self, lines):
+        errors = []
+        now = time.perf_counter()
+        for line in lines:
+            answer = line.decode('ascii')
+            if answer == '':
+                continue
+            try:
+                id, result = answer.split(':')
+                id = int(id)
+            except ValueError:
+                errors.append((None, answer))
+                continue
+            if id not in self.unanswered:
+                errors.append((None, answer))
+                continue
+            message, send_time = self.unanswered.pop(id)
+            command = message.split(':', 1)[0]
+            rtt = self.rtt.get(command)
+            if rtt is None:
+                rtt = self.rtt[command] = RoundTripTimes()
+            rtt.add(now - send_time, self.RTT_WINDOW)
+            if id == self.clock_in_flight:
+                self.clock_in_flight = None
+                if self.pending_clock is not None:
+                    self.send_clock(self.pending_clock)
+            if result != 'OK':
+                errors.append((message, result))
+        return errors
+
+    def wait_for_ack(self, id, timeout):
+        """Wait until the message with this id is acknowledged or until the timeout in seconds.
+
+        :return: acknowledgment errors like `poll` and whether the message was acknowledged
+        """
+        errors = []
+        deadline = time.perf_counter() + timeout
+        while id in self.unanswered:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return errors, False
+            errors += self.poll(remaining)
+        return errors, True
+
+    def rtt_statistics(self):
+        """Round-trip times per command in milliseconds: p50, p95, p99 and max over the last RTT_WINDOW messages."""
+        statistics = {}
+        for command, rtt in self.rtt.items():
+            samples = np.array(rtt.samples) * 1000
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            statistics[command] = {'count': rtt.count, 'p50': p50, 'p95': p95, 'p99': p99, 'max': samples.max()}
+        return statistics
+
+    def rtt_summary(self):
+        return [f'GameController round-trip time of {command} messages: {stats["count"]} messages, '
+                f'p50 {stats["p50"]:.2f} ms, p95 {stats["p95"]:.2f} ms, p99 {stats["p99"]:.2f} ms, '
+                f'max {stats["max"]:.2f} ms' for command, stats in self.rtt_statistics().items()]
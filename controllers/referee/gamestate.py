@@ -14,6 +14,8 @@
 
 # Adapted from from https://github.com/RoboCup-Humanoid-TC/GameController/blob/master/protocols/python/gamestate.py
 
+import struct
+
 from construct import Array, Byte, Bytes, Const, Enum, Flag, Int16sl, Int16ul, Struct
 try:
     from construct import PaddedString
@@ -107,3 +109,117 @@ ReturnData = Struct(
     "player" / Byte,
     "message" / Byte
 )
+
+# Precompiled decoder of the GameState packets, with the same layout as the construct definitions above (little
+# endian). Parsing with construct builds a Container per struct and per field at each packet, this decoder unpacks
+# each struct with a single struct.unpack_from call over a buffer and returns views with the same attributes.
+
+_GAME_STATE_HEADER = struct.Struct('<4sHBBBBBBB4sBHhh')
+_TEAM_INFO = struct.Struct('<BBBBHB253s')
+_ROBOT_INFOS = struct.Struct('<72B')  # coach and 11 players, 6 bytes each
+_TEAM_INFO_SIZE = _TEAM_INFO.size + _ROBOT_INFOS.size
+
+GAME_STATE_SIZE = _GAME_STATE_HEADER.size + 2 * _TEAM_INFO_SIZE
+GAME_STATE_HEADER = b'RGme'
+GAME_STATE_VERSION = 12
+# Offset of the packet number, the only field which changes in the packets sent while the game state does not change
+GAME_STATE_PACKET_NUMBER_OFFSET = 6
+
+
+class EnumValue(str):
+    """Name of an enum value, like the strings returned by construct, which can also be converted to its integer."""
+
+    __slots__ = ['value']
+
+    def __new__(cls, name, value):
+        self = super().__new__(cls, name)
+        self.value = value
+        return self
+
+    def __int__(self):
+        return self.value
+
+
+def _enum_values(enum):
+    return {value: EnumValue(name, value) for name, value in enum.subcon.encmapping.items()}
+
+
+# Values as returned by construct: the name of known values, the integer otherwise
+_TEAM_COLORS = _enum_values(TeamInfo.team_color)
+_GAME_STATES = _enum_values(GameState.game_state)
+_SECONDARY_STATES = _enum_values(GameState.secondary_state)
+
+
+class RobotInfoView:
+    __slots__ = ['penalty', 'secs_till_unpenalized', 'number_of_warnings', 'number_of_yellow_cards',
+                 'number_of_red_cards', 'goalkeeper']
+
+    def __init__(self, values):
+        (self.penalty, self.secs_till_unpenalized, self.number_of_warnings, self.number_of_yellow_cards,
+         self.number_of_red_cards, goalkeeper) = values
+        self.goalkeeper = goalkeeper != 0
+
+
+class TeamInfoView:
+    """Team of a GameStateView, the robot infos and the coach message are only decoded when they are accessed."""
+
+    __slots__ = ['team_number', 'team_color', 'score', 'penalty_shot', 'single_shots', 'coach_sequence',
+                 '_coach_message', '_robot_infos', '_coach', '_players']
+
+    def __init__(self, buffer, offset):
+        (self.team_number, team_color, self.score, self.penalty_shot, self.single_shots, self.coach_sequence,
+         self._coach_message) = _TEAM_INFO.unpack_from(buffer, offset)
+        self.team_color = _TEAM_COLORS.get(team_color, team_color)
+        self._robot_infos = _ROBOT_INFOS.unpack_from(buffer, offset + _TEAM_INFO.size)
+        self._coach = None
+        self._players = None
+
+    @property
+    def coach_message(self):
+        return self._coach_message.rstrip(b'\x00').decode('utf8')
+
+    @property
+    def coach(self):
+        if self._coach is None:
+            self._coach = RobotInfoView(self._robot_infos[0:6])
+        return self._coach
+
+    @property
+    def players(self):
+        if self._players is None:
+            robot_infos = self._robot_infos
+            self._players = [RobotInfoView(robot_infos[i:i + 6]) for i in range(6, 72, 6)]
+        return self._players
+
+
+class GameStateView:
+    """Attributes of a parsed GameState packet, compatible with the Container returned by GameState.parse."""
+
+    __slots__ = ['header', 'version', 'packet_number', 'players_per_team', 'game_type', 'game_state', 'first_half',
+                 'kickoff_team', 'secondary_state', 'secondary_state_info', 'drop_in_team', 'drop_in_time',
+                 'seconds_remaining', 'secondary_seconds_remaining', 'teams']
+
+    def __init__(self, buffer):
+        (self.header, self.version, self.packet_number, self.players_per_team, self.game_type, game_state, first_half,
+         self.kickoff_team, secondary_state, self.secondary_state_info, drop_in_team, self.drop_in_time,
+         self.seconds_remaining, self.secondary_seconds_remaining) = _GAME_STATE_HEADER.unpack_from(buffer)
+        self.game_state = _GAME_STATES.get(game_state, game_state)
+        self.secondary_state = _SECONDARY_STATES.get(secondary_state, secondary_state)
+        self.first_half = first_half != 0
+        self.drop_in_team = drop_in_team != 0
+        self.teams = [TeamInfoView(buffer, _GAME_STATE_HEADER.size),
+                      TeamInfoView(buffer, _GAME_STATE_HEADER.size + _TEAM_INFO_SIZE)]
+
+
+def parse_game_state(buffer):
+    """Decode a GameState packet from a bytes-like object, e.g. a memoryview over a receive buffer.
+
+    The returned view does not reference the buffer, which can be reused for the next packet.
+    :raises ValueError: if the buffer is not a GameState packet of the supported version
+    """
+    if len(buffer) < GAME_STATE_SIZE:
+        raise ValueError(f'GameState packet too short: {len(buffer)} bytes instead of {GAME_STATE_SIZE}')
+    state = GameStateView(buffer)
+    if state.header != GAME_STATE_HEADER or state.version != GAME_STATE_VERSION:
+        raise ValueError(f'Unsupported GameState packet: header {state.header}, version {state.version}')
+    return state
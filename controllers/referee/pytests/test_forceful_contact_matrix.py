@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from forceful_contact_matrix import ForcefulContactMatrix  # noqa: E402
+
+
+def test_forceful_contact_matrix_window():
+    # 11 robots per team, 1 second window and 0.25 second foul duration with 8 ms steps
+    fcm = ForcefulContactMatrix(11, 11, 1, 0.25, 8)
+    assert fcm.time_window_size == 125 and fcm.foul_duration == 31
+    assert fcm.matrix.shape == (11, 11, 16)
+
+    for step in range(40):
+        time = step * 8
+        fcm.clear(time)
+        fcm.set_contact("11", "3", time)
+        fcm.set_contact("11", "3", time)  # counted once
+        if step % 2 == 0:
+            fcm.set_contact(2, 5, time)
+    assert fcm.contact("11", "3", 39 * 8) and not fcm.contact("2", "5", 39 * 8) and fcm.contact("2", "5", 38 * 8)
+    assert fcm.contacts(38 * 8) == [("2", "5"), ("11", "3")]
+    assert fcm.get_collision_time("11", "3") == 40 * 8 / 1000
+    assert fcm.get_collision_time("2", "5") == 20 * 8 / 1000
+    assert fcm.long_collision("11", "3") and not fcm.long_collision("2", "5")
+    assert fcm.long_collisions() == [("11", "3")]
+
+    fcm.set_contact("11", "3", 39 * 8, False)
+    assert fcm.get_collision_time("11", "3") == 39 * 8 / 1000
+
+    # Contacts leave the window when their slot is cleared one window later
+    for step in range(125, 125 + 30):
+        fcm.clear(step * 8)
+    assert fcm.get_collision_time("11", "3") == 9 * 8 / 1000
+    assert not fcm.long_collision("11", "3") and fcm.long_collisions() == []
+    assert fcm.contacts(38 * 8) == [("2", "5"), ("11", "3")]
+
+    fcm.clear_all()
+    assert fcm.contacts(38 * 8) == [] and not fcm.counts.any()
+
+
+def test_forceful_contact_matrix_counts_match_window():
+    rng = np.random.default_rng(0)
+    fcm = ForcefulContactMatrix(4, 5, 0.5, 0.1, 16)
+    window = np.zeros((4, 5, fcm.time_window_size), dtype=bool)
+    for step in range(200):
+        time = step * 16
+        index = step % fcm.time_window_size
+        fcm.clear(time)
+        window[:, :, index] = False
+        for red, blue in rng.integers(0, [4, 5], size=(3, 2)):
+            value = bool(rng.integers(0, 4))
+            fcm.set_contact(red + 1, blue + 1, time, value)
+            window[red, blue, index] = value
+        np.testing.assert_array_equal(fcm.counts, window.sum(axis=2))
+        unpacked = np.unpackbits(fcm.matrix, axis=2, bitorder="little")[:, :, :fcm.time_window_size]
+        np.testing.assert_array_equal(unpacked, window)
@@ -0,0 +1,49 @@
+import os
+import socket
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from game_controller_channel import GameControllerChannel  # noqa: E402
+
+
+def _read_lines(sock: socket.socket, count: int):
+    data = b""
+    while data.count(b"\n") < count:
+        data += sock.recv(1024)
+    return data.decode("ascii").splitlines()
+
+
+def test_game_controller_channel():
+    referee_socket, game_controller = socket.socketpair()
+    channel = GameControllerChannel(referee_socket)
+    try:
+        # Only one CLOCK message is in flight, the latest clock is sent once it is acknowledged
+        assert channel.send_clock(8)
+        assert not channel.send_clock(16)
+        assert not channel.send_clock(24)
+        assert _read_lines(game_controller, 1) == ["1:CLOCK:8"]
+        game_controller.sendall(b"1:OK\n")
+        assert channel.poll(1) == []
+        assert _read_lines(game_controller, 1) == ["2:CLOCK:24"]
+
+        # Commands are pipelined and acknowledged by id, answers may be split over several packets
+        state_id = channel.send("STATE:READY")
+        card_id = channel.send("CARD:1:2:YELLOW")
+        assert _read_lines(game_controller, 2) == [f"{state_id}:STATE:READY", f"{card_id}:CARD:1:2:YELLOW"]
+        game_controller.sendall(f"{card_id}:ILLEGAL\n2:O".encode("ascii"))
+        assert channel.wait_for_ack(state_id, 0.05) == ([("CARD:1:2:YELLOW", "ILLEGAL")], False)
+        game_controller.sendall(f"K\n{state_id}:OK\n99:OK\n".encode("ascii"))
+        start = time.perf_counter()
+        assert channel.wait_for_ack(state_id, 10) == ([(None, "99:OK")], True)
+        assert time.perf_counter() - start < 1
+        assert channel.unanswered == {}
+
+        statistics = channel.rtt_statistics()
+        assert sorted(statistics) == ["CARD", "CLOCK", "STATE"]
+        assert statistics["CLOCK"]["count"] == 2
+        assert len(channel.rtt_summary()) == 3
+    finally:
+        referee_socket.close()
+        game_controller.close()
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmark_gamestate import run_benchmark, sample_packet  # noqa: E402
+from gamestate import GAME_STATE_SIZE, GameState, parse_game_state  # noqa: E402
+
+ROBOT_INFO_FIELDS = ["penalty", "secs_till_unpenalized", "number_of_warnings", "number_of_yellow_cards",
+                     "number_of_red_cards", "goalkeeper"]
+
+
+def _assert_robot_info(view, expected):
+    for field in ROBOT_INFO_FIELDS:
+        assert getattr(view, field) == expected[field], field
+
+
+def test_parse_game_state_matches_construct():
+    packet = bytearray(sample_packet(packet_number=42))
+    offset = GAME_STATE_SIZE - 332 + 7  # coach message of the red team
+    packet[offset:offset + 3] = b"hi\x00"
+    expected = GameState.parse(packet)
+    state = parse_game_state(memoryview(packet))
+
+    for field in ["header", "version", "packet_number", "players_per_team", "game_type", "game_state", "first_half",
+                  "kickoff_team", "secondary_state", "secondary_state_info", "drop_in_team", "drop_in_time",
+                  "seconds_remaining", "secondary_seconds_remaining"]:
+        assert getattr(state, field) == expected[field], field
+    # Enum values are strings which can be converted to integers
+    assert state.game_state == "STATE_PLAYING" and int(state.game_state) == int(expected.game_state) == 3
+    assert state.secondary_state[6:] == "DIRECT_FREEKICK" and int(state.secondary_state) == 4
+    assert f"{state.secondary_state}" == "STATE_DIRECT_FREEKICK"
+    assert state.seconds_remaining == 542 and state.secondary_seconds_remaining == -3
+
+    for team, expected_team in zip(state.teams, expected.teams):
+        for field in ["team_number", "team_color", "score", "penalty_shot", "single_shots", "coach_sequence",
+                      "coach_message"]:
+            assert getattr(team, field) == expected_team[field], field
+        _assert_robot_info(team.coach, expected_team.coach)
+        assert len(team.players) == 11
+        for player, expected_player in zip(team.players, expected_team.players):
+            _assert_robot_info(player, expected_player)
+    assert state.teams[1].team_color.lower() == "red"
+    assert state.teams[1].coach_message == "hi"
+
+    # The view does not depend on the buffer after parsing
+    packet[:] = bytes(len(packet))
+    assert state.teams[0].players[1].penalty == 31
+
+
+def test_parse_game_state_invalid():
+    packet = sample_packet()
+    with pytest.raises(ValueError):
+        parse_game_state(packet[:-1])
+    with pytest.raises(ValueError):
+        parse_game_state(b"XXXX" + packet[4:])
+    # Values missing from the enums are returned as integers, like construct
+    state = parse_game_state(packet[:9] + b"\x07" + packet[10:])
+    assert state.game_state == 7
+
+
+def test_benchmark_gamestate():
+    results = run_benchmark(iterations=10)
+    assert set(results) == {"construct", "struct", "construct + accesses", "struct + accesses"}
+    assert all(us > 0 for us in results.values())
@@ -0,0 +1,43 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from step_profiler import DisabledStepProfiler, StepProfiler  # noqa: E402
+
+
+def test_step_profiler(tmp_path):
+    profiler = StepProfiler(window=100, export_path=tmp_path / "step_profile.json", export_period=0)
+    for step in range(250):
+        profiler.record("update_contacts", (step % 100 + 1) * 1000)
+        if step % 2 == 0:
+            profiler.record("check_forceful_contacts", 5000000)
+        profiler.end_step()
+
+    with open(tmp_path / "step_profile.json") as f:
+        exported = json.load(f)
+    assert exported["steps"] == 192  # Exported every 64 steps
+
+    statistics = profiler.statistics()
+    assert statistics["steps"] == 250
+    update_contacts = statistics["phases"]["update_contacts"]
+    # Rolling over the last 100 calls, which took 0.001 to 0.1 ms
+    assert update_contacts["count"] == 250
+    assert update_contacts["p50"] == pytest.approx(0.0505)
+    assert update_contacts["p99"] == pytest.approx(0.09901)
+    assert update_contacts["max"] == pytest.approx(0.1)
+    assert statistics["phases"]["check_forceful_contacts"]["calls_per_step"] == 0.5
+
+    summary = profiler.summary()
+    assert summary[1].startswith("  check_forceful_contacts:")  # Most time first
+
+    lap = profiler.clock()
+    assert profiler.lap("game_controller_send", lap) >= lap
+    assert profiler.phases["game_controller_send"].count == 1
+
+    disabled = DisabledStepProfiler()
+    assert disabled.lap("game_controller_send", 42) == 42
+    assert disabled.summary() == []
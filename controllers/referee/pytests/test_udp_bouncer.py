@@ -0,0 +1,223 @@
+import json
+import os
+import socket
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "data_collection", "post_processing"))
+
+import udp_bouncer  # noqa: E402
+from bouncing_log import TeamCommPacket, read_bouncer_records  # noqa: E402
+
+# The robots are simulated on distinct addresses of 127.0.0.0/8, which are only all routed to the loopback on Linux
+linux_only = pytest.mark.skipif(sys.platform != "linux", reason="needs the 127.0.0.0/8 loopback addresses of Linux")
+
+
+def _udp_socket(ip: str, port: int = 0) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((ip, port))
+    sock.settimeout(1)
+    return sock
+
+
+@linux_only
+def test_bouncer_forwarding():
+    # Robots on distinct loopback addresses, all listening on the same team port
+    host = _udp_socket("127.0.0.1")
+    team_port = host.getsockname()[1]
+    robots = {ip: _udp_socket(ip, team_port) for ip in ["127.0.0.2", "127.0.0.3", "127.0.0.4"]}
+    blue, red = ["127.0.0.2", "127.0.0.3"], ["127.0.0.4"]
+    # The referee of the game receives the GameController messages on its own port
+    referee = _udp_socket("127.0.0.1")
+    bouncer = udp_bouncer.Bouncer(["127.0.0.1"] + blue + red, blue, red, gc_send_port=team_port,
+                                  team_send_port=team_port, host_gc_send_port=referee.getsockname()[1])
+    bouncer.bind("127.0.0.1", 0, 0)
+    gc_address, team_address = (sock.getsockname() for sock in bouncer.receive_sockets)
+    try:
+        # Team messages go to the teammates only
+        robots["127.0.0.2"].sendto(b"blue", team_address)
+        bouncer.poll(1)
+        assert robots["127.0.0.3"].recvfrom(1024)[0] == b"blue"
+        # GameController messages go to all clients
+        robots["127.0.0.4"].sendto(b"gc", gc_address)
+        bouncer.poll(1)
+        for sock in [referee] + list(robots.values()):
+            assert sock.recvfrom(1024)[0] == b"gc"
+        # The host does not receive them on the default port
+        for sock in [host, referee] + list(robots.values()):
+            sock.setblocking(False)
+            with pytest.raises(BlockingIOError):
+                sock.recvfrom(1024)
+    finally:
+        bouncer.close()
+        for sock in [host, referee] + list(robots.values()):
+            sock.close()
+
+
+@linux_only
+def test_bouncer_queues_and_rate_limits(tmp_path):
+    host = _udp_socket("127.0.0.1")
+    team_port = host.getsockname()[1]
+    robots = {ip: _udp_socket(ip, team_port) for ip in ["127.0.0.2", "127.0.0.3", "127.0.0.4", "127.0.0.5"]}
+    unregistered = _udp_socket("127.0.0.9")
+    blue, red = ["127.0.0.2", "127.0.0.3"], ["127.0.0.4", "127.0.0.5"]
+    capture = udp_bouncer.Capture(tmp_path / "bouncing_capture.bin", ["127.0.0.1"] + blue + red, blue, red)
+    bouncer = udp_bouncer.Bouncer(["127.0.0.1"] + blue + red, blue, red, capture, gc_send_port=team_port,
+                                  team_send_port=team_port, queue_size=2, robot_rate_limit=3,
+                                  stats_path=tmp_path / "bouncing_stats.json", max_datagram_size=50)
+    bouncer.bind("127.0.0.1", 0, 0)
+    team_address = bouncer.receive_sockets[1].getsockname()
+    try:
+        # Blue floods the bouncer: only the newest packets which fit into its queue are forwarded
+        for i in range(3):
+            robots["127.0.0.2"].sendto(bytes([i]), team_address)
+        # Red exceeds its rate limit, the burst is as large as the rate, and then floods its queue
+        for i in range(5):
+            robots["127.0.0.4"].sendto(bytes([i]), team_address)
+        unregistered.sendto(b"?", team_address)
+        # Too large packets are dropped
+        robots["127.0.0.3"].sendto(bytes(51), team_address)
+        time.sleep(0.1)
+        bouncer.poll(1)
+        assert [robots["127.0.0.3"].recvfrom(1024)[0] for _ in range(2)] == [b"\x01", b"\x02"]
+        assert [robots["127.0.0.5"].recvfrom(1024)[0] for _ in range(2)] == [b"\x01", b"\x02"]
+    finally:
+        bouncer.close()
+        for sock in [host, unregistered] + list(robots.values()):
+            sock.close()
+
+    with open(tmp_path / "bouncing_stats.json") as f:
+        stats = json.load(f)
+    assert stats["robots"]["127.0.0.2"] == {"received": 3, "forwarded": 2, "dropped": 1, "rate_limited": 0,
+                                            "truncated": 0, "send_failed": 0, "bytes_received": 3,
+                                            "bytes_forwarded": 2}
+    assert stats["robots"]["127.0.0.3"]["truncated"] == 1 and stats["robots"]["127.0.0.3"]["forwarded"] == 0
+    assert stats["teams"]["red"]["received"] == 5 and stats["teams"]["red"]["rate_limited"] == 2
+    assert stats["teams"]["red"]["dropped"] == 1 and stats["teams"]["red"]["forwarded"] == 2
+    assert stats["total"]["unregistered"] == 1 and stats["unregistered"] == {"127.0.0.9": 1}
+    # The capture holds the packets accepted for forwarding, including the ones dropped afterwards by a full queue
+    packets = [(record.sender_IP, record.payload) for record in read_bouncer_records(tmp_path)
+               if isinstance(record, TeamCommPacket)]
+    assert packets == [("127.0.0.2", bytes([i])) for i in range(3)] + [("127.0.0.4", bytes([i])) for i in range(3)]
+
+
+def test_rate_limits_take_tokens_of_accepted_packets_only():
+    robot_limit, team_limit = udp_bouncer.TokenBucket(2), udp_bouncer.TokenBucket(1)
+    now = robot_limit.last_time = team_limit.last_time = 0.0
+    source = udp_bouncer.Source([], 10, [dict.fromkeys(udp_bouncer.COUNTERS, 0)], [robot_limit, team_limit])
+    assert source.push(bytearray(1), 1, now)
+    # The team bucket is empty: the packet is rejected without taking a token of the robot bucket
+    assert not source.push(bytearray(1), 1, now)
+    assert robot_limit.tokens == 1 and team_limit.tokens == 0
+    assert source.counters[0]["rate_limited"] == 1
+
+
+class _FailingSocket:
+    """Send socket whose sendto calls return or raise the given results in turn."""
+
+    def __init__(self, results):
+        self.results = iter(results)
+
+    def sendto(self, data, address):
+        result = next(self.results)
+        if isinstance(result, Exception):
+            raise result
+        return len(data) if result is None else result
+
+    def close(self):
+        pass
+
+
+def test_bouncer_counts_successful_sends_only():
+    blue = ["127.0.0.2", "127.0.0.3", "127.0.0.4"]
+    # First packet: sent to one teammate, a partial send to the other one. Second packet: both sends fail
+    send_socket = _FailingSocket([None, 0, BlockingIOError(), OSError()])
+    bouncer = udp_bouncer.Bouncer(["127.0.0.1"] + blue, blue, [], team_send_port=3737,
+                                  send_sockets={3737: send_socket})
+    for _ in range(2):
+        buffer = memoryview(bytearray(11))
+        bouncer.on_team_packet(buffer, 10, "127.0.0.2", 3737, 0)
+        bouncer.forward()
+    bouncer.close()
+
+    counters = bouncer.robot_counters["127.0.0.2"]
+    assert counters["received"] == 2 and counters["forwarded"] == 1
+    assert counters["send_failed"] == 3 and counters["bytes_forwarded"] == 10
+
+
+@linux_only
+def test_multi_game_bouncer(tmp_path):
+    import threading
+
+    host = _udp_socket("127.0.0.1")
+    team_port = host.getsockname()[1]
+    games = {"a": (["127.0.0.2", "127.0.0.3"], ["127.0.0.4"]), "b": (["127.0.0.5", "127.0.0.6"], ["127.0.0.7"])}
+    robots = {ip: _udp_socket(ip, team_port) for blue, red in games.values() for ip in blue + red}
+    server = udp_bouncer.BouncerServer("127.0.0.1", 0)
+    control_port = server.control_socket.getsockname()[1]
+    running = True
+
+    def serve():
+        while running:
+            server.poll(0.01)
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    try:
+        ports = {}
+        for offset, (name, (blue, red)) in enumerate(games.items()):
+            (tmp_path / name).mkdir()
+            with open(tmp_path / name / "game.json", "w") as f:
+                json.dump({"host": "127.0.0.1", "blue": {"hosts": blue}, "red": {"hosts": red}}, f)
+            reply = udp_bouncer.control_request(
+                {"command": "register", "name": name, "game_config": str(tmp_path / name / "game.json"),
+                 "port_offset": 20000 + offset * udp_bouncer.PORT_OFFSET_STEP, "directory": str(tmp_path / name),
+                 "gc_send_port": team_port, "team_send_port": team_port}, control_port)
+            ports[name] = reply["ports"]
+            assert ports[name]["host_gc_send_port"] == team_port + 20000 + offset * udp_bouncer.PORT_OFFSET_STEP
+        assert udp_bouncer.control_request({"command": "list"}, control_port)["games"] == ports
+        with pytest.raises(RuntimeError, match="already registered"):
+            udp_bouncer.control_request({"command": "register", "name": "a", "game_config": "game.json"}, control_port)
+
+        # Each game has its own fan-out tables: a robot of game a is not registered with game b
+        robots["127.0.0.2"].sendto(b"a", ("127.0.0.1", ports["a"]["team_listen_port"]))
+        robots["127.0.0.5"].sendto(b"b", ("127.0.0.1", ports["b"]["team_listen_port"]))
+        robots["127.0.0.2"].sendto(b"a in b", ("127.0.0.1", ports["b"]["team_listen_port"]))
+        assert robots["127.0.0.3"].recvfrom(1024)[0] == b"a"
+        assert robots["127.0.0.6"].recvfrom(1024)[0] == b"b"
+
+        udp_bouncer.control_request({"command": "unregister", "name": "b"}, control_port)
+        assert list(udp_bouncer.control_request({"command": "list"}, control_port)["games"]) == ["a"]
+    finally:
+        running = False
+        thread.join()
+        server.close()
+        for sock in [host] + list(robots.values()):
+            sock.close()
+
+    with open(tmp_path / "b" / "bouncing_stats.json") as f:
+        stats = json.load(f)
+    assert stats["total"]["forwarded"] == 1 and stats["unregistered"] == {"127.0.0.2": 1}
+    assert os.path.exists(tmp_path / "a" / "bouncing_capture.bin")
+
+
+@linux_only
+def test_benchmark_udp_bouncer():
+    import benchmark_udp_bouncer
+
+    results = benchmark_udp_bouncer.run_benchmark(robots=2, team_rate=20, gc_rate=4, duration=0.5)
+    # A few packets can be lost on a loaded machine, the benchmark itself is the place to check the loss
+    assert results["sent"] > 0 and results["loss"] <= 0.05
+    assert results["latency_ms"]["p50"] <= results["latency_ms"]["p99"] <= results["latency_ms"]["max"]
+
+
+@linux_only
+def test_benchmark_udp_bouncer_allocations():
+    import benchmark_udp_bouncer
+
+    results = benchmark_udp_bouncer.measure_allocations(robots=3, packets=50, size=4000)
+    # The packets are forwarded from the receive buffers, without copying them
+    assert 0 < results["bytes_per_packet"] < 2000
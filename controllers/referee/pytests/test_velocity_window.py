@@ -0,0 +1,36 @@
+import os
+import sys
+import types
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+# team imports the logger of the referee, which needs the Webots controller module
+sys.modules.setdefault("controller", types.SimpleNamespace(AnsiCodes=None))
+
+from team import VelocityWindow  # noqa: E402
+
+
+def test_velocity_window():
+    rng = np.random.default_rng(42)
+    players, window = 4, 7
+    velocities = VelocityWindow(players, window)
+    # Same computation as the per-player velocity buffers which the referee used before
+    buffers = [[[0] * 6] * window for _ in range(players)]
+    # Two and a half windows, with the last step of the first window updated twice
+    steps = list(range(window)) + [window - 1] + list(range(window, 5 * window // 2))
+    for step in steps:
+        # The robots which are not in the simulation (robot is None) are not updated
+        robots = [rng.random() < 0.8 for _ in range(players)]
+        indices = [i for i in range(players) if robots[i]]
+        values = rng.normal(size=(len(indices), 6)).tolist()
+        velocities.update(step, indices, values)
+        for i, value in zip(indices, values):
+            buffers[i][step % window] = value
+        expected = np.array([[sum(v[k] for v in buffer) / window for k in range(6)] for buffer in buffers])
+        np.testing.assert_allclose(velocities.smoothed, expected, atol=1e-12)
+        np.testing.assert_allclose(velocities.speeds_squared, expected[:, 0] ** 2 + expected[:, 1] ** 2, atol=1e-12)
+    # No robot in the simulation
+    velocities.update(steps[-1] + 1, [], [])
+    np.testing.assert_allclose(velocities.smoothed, expected, atol=1e-12)
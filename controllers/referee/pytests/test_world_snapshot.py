@@ -0,0 +1,159 @@
+import collections
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from world_snapshot import TrackingBenchmark, WorldSnapshot  # noqa: E402
+
+
+class FakeNode:
+    """Node of the Supervisor API which counts the calls of each method."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = collections.Counter()
+
+    def _call(self, method, *args):
+        self.calls[(method,) + args] += 1
+        return [self.name, method, args, self.calls[(method,) + args]]
+
+    def getVelocity(self):
+        return self._call("getVelocity")
+
+    def getPose(self):
+        return self._call("getPose")
+
+    def getContactPoints(self, include_descendants=False):
+        return self._call("getContactPoints", include_descendants)
+
+
+class FakeTrackingNode(FakeNode):
+    """Node of a Webots version with pose and contact points tracking (R2023b and newer)."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.tracked = set()
+
+    def enablePoseTracking(self, sampling_period):
+        self.tracked.add(("pose", sampling_period))
+
+    def disablePoseTracking(self):
+        self.tracked = {entry for entry in self.tracked if entry[0] != "pose"}
+
+    def enableContactPointsTracking(self, sampling_period, include_descendants=False):
+        self.tracked.add(("contact_points", sampling_period, include_descendants))
+
+    def disableContactPointsTracking(self, include_descendants=False):
+        self.tracked.discard(next((entry for entry in self.tracked if entry[0] == "contact_points"
+                                   and entry[2] == include_descendants), None))
+
+
+class FakeSupervisor(FakeNode):
+    def __init__(self):
+        super().__init__("supervisor")
+        self.nodes = {}
+
+    def getFromId(self, node_id):
+        self._call("getFromId", node_id)
+        return self.nodes.get(node_id)
+
+
+def test_world_snapshot_memoization():
+    supervisor = FakeSupervisor()
+    robot, ball = FakeNode("robot"), FakeNode("ball")
+    supervisor.nodes[7] = robot
+    world = WorldSnapshot(supervisor)
+
+    # Repeated reads during a step make a single Supervisor call per method, object and arguments
+    velocity = world.get_velocity(robot)
+    assert world.get_velocity(robot) is velocity
+    assert world.get_velocity(ball) is not velocity
+    assert world.get_contact_points(robot) is world.get_contact_points(robot, False)
+    world.get_contact_points(robot, True)
+    assert world.get_from_id(7) is robot and world.get_from_id(7) is robot
+    assert robot.calls == {("getVelocity",): 1, ("getContactPoints", False): 1, ("getContactPoints", True): 1}
+    assert ball.calls == {("getVelocity",): 1}
+    assert supervisor.calls == {("getFromId", 7): 1}
+    assert (world.step_calls, world.step_hits) == (5, 3)
+
+    # Invalidating an object forgets its values only
+    world.invalidate(robot)
+    assert world.get_velocity(robot) != velocity
+    world.get_velocity(ball)
+    assert robot.calls[("getVelocity",)] == 2 and ball.calls[("getVelocity",)] == 1
+    assert (world.step_calls, world.step_hits) == (6, 4)
+
+    # The values are fetched again at the next step
+    world.new_step()
+    assert (world.step_calls, world.step_hits) == (0, 0)
+    world.get_velocity(robot)
+    world.get_velocity(robot)
+    assert robot.calls[("getVelocity",)] == 3
+    world.new_step()
+
+    assert (world.total_calls, world.total_hits, world.total_steps) == (7, 5, 2)
+    assert world.stats_message() == "Supervisor calls per step: 3.5 (avoided by world snapshot: 2.5)"
+    world.reset_stats()
+    assert world.stats_message() == "Supervisor calls per step: no step"
+
+
+def test_world_snapshot_tracking():
+    world = WorldSnapshot(FakeSupervisor())
+    robot, ball = FakeTrackingNode("robot"), FakeTrackingNode("ball")
+
+    assert world.enable_tracking([robot, ball], [(robot, True)], 16)
+    assert world.tracking
+    assert robot.tracked == {("pose", 16), ("contact_points", 16, True)} and ball.tracked == {("pose", 16)}
+    # Tracked values are read without a round-trip, only the other ones count as Supervisor calls
+    world.get_pose(robot)
+    world.get_pose(ball)
+    world.get_contact_points(robot, True)
+    world.get_contact_points(robot, False)
+    world.get_velocity(robot)
+    assert world.step_calls == 2
+
+    world.new_step()
+    world.disable_tracking()
+    assert not world.tracking
+    assert robot.tracked == set() and ball.tracked == set()
+    world.get_pose(robot)
+    world.get_contact_points(robot, True)
+    assert world.step_calls == 2
+
+
+def test_world_snapshot_tracking_fallback():
+    world = WorldSnapshot(FakeSupervisor())
+    # A Webots version without tracking: the nodes have no enablePoseTracking and enableContactPointsTracking
+    assert not world.enable_tracking([FakeNode("robot")], [], 16)
+    tracking_node, old_node = FakeTrackingNode("robot"), FakeNode("ball")
+    assert not world.enable_tracking([tracking_node], [(old_node, False)], 16)
+
+    # The tracking which was already enabled is disabled again and all values are polled
+    assert not world.tracking
+    assert tracking_node.tracked == set()
+    world.get_pose(tracking_node)
+    world.get_contact_points(old_node, False)
+    assert world.step_calls == 2
+
+
+def test_tracking_benchmark():
+    benchmark = TrackingBenchmark(10)
+    assert not benchmark.tracking
+    assert benchmark.summary() == [
+        "Benchmark: real time factor with polling: not measured (over 0.00 real seconds)",
+        "Benchmark: real time factor with tracking: not measured (over 0.00 real seconds)",
+    ]
+
+    # Real and simulated seconds of a fake clock, the benchmark switches every 10 real seconds
+    switches = [benchmark.update(real_time, simulated_time)
+                for real_time, simulated_time in [(100, 0), (105, 4), (110, 8), (115, 10), (120, 13), (130, 21)]]
+
+    assert switches == [False, False, True, False, True, True]
+    assert benchmark.tracking
+    assert benchmark.real_time == {False: 20, True: 10}
+    assert benchmark.real_time_factor(False) == (8 + 8) / 20 and benchmark.real_time_factor(True) == 5 / 10
+    assert benchmark.summary() == [
+        "Benchmark: real time factor with polling: 0.800 (over 20.00 real seconds)",
+        "Benchmark: real time factor with tracking: 0.500 (over 10.00 real seconds)",
+    ]
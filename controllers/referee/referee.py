@@ -19,6 +19,7 @@ import math
 import numpy as np
 import os
 import random
+import select
 import socket
 import subprocess
 import sys
@@ -29,7 +30,7 @@ import yaml
 from scipy.spatial import ConvexHull
 
 from types import SimpleNamespace
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 
 
 import numpy as np
@@ -43,12 +44,16 @@ from display import Display
 from field import Field
 from forceful_contact_matrix import ForcefulContactMatrix
 from logger import logger
-from gamestate import GameState
+from gamestate import GAME_STATE_PACKET_NUMBER_OFFSET, GAME_STATE_SIZE, parse_game_state
 from geometry import distance2, rotate_along_z, aabb_circle_collision, polygon_circle_collision, update_aabb
 from display import Display
 from game import Game
+from game_controller_channel import GameControllerChannel
 from team import Team
 from sim_time import SimTime
+from step_profiler import DisabledStepProfiler, StepProfiler
+import udp_bouncer
+from world_snapshot import TrackingBenchmark, WorldSnapshot
 
 
 # game interruptions requiring a free kick procedure
@@ -61,6 +66,12 @@ GAME_INTERRUPTIONS = {
     'THROWIN': 'throw in'
 }
 
+# Seconds to wait for an answer of the GameController before sending the clock again
+GAME_CONTROLLER_ANSWER_TIMEOUT = 0.2
+
+# TCP port of the GameControllerSimulator, plus the bouncer port offset of the game
+GAME_CONTROLLER_PORT = 8750
+
 
 class Referee:
     def __init__(self):
@@ -86,6 +97,8 @@ class Referee:
 
         self.blackboard = blackboard
         self.blackboard.supervisor = self.supervisor
+        self.world = WorldSnapshot(self.supervisor)
+        self.blackboard.world = self.world
         self.blackboard.sim_time = self.sim_time
         self.blackboard.config = self.config
         self.blackboard.start_real_time = time.time()
@@ -129,11 +142,13 @@ class Referee:
                                                              self.config.FOUL_PUSHING_TIME, self.time_step)
         self.display = Display()
         self.others = []
-        self.game_controller_send_id = 0
-        self.game_controller_send_unanswered = {}
+        self.game_controller_channel = None
         self.game_controller_last_sent_message = None
         self.game_controller_udp_filter = os.environ['GAME_CONTROLLER_UDP_FILTER'] \
             if 'GAME_CONTROLLER_UDP_FILTER' in os.environ else None
+        # Receive buffers of the GameController packets: the newest accepted packet and the next one
+        self.game_controller_buffers = [memoryview(bytearray(GAME_STATE_SIZE)), memoryview(bytearray(GAME_STATE_SIZE))]
+        self.game_controller_packet = None  # last processed packet
 
         self.setup()
         self.display.update()
@@ -147,6 +162,17 @@ class Referee:
                 self.game.data_collection["enabled"] = False  # disable data collection
                 self.logger.error(f"Unexpected exception while initializing data collector: {traceback.format_exc()}")
 
+        self.tracking_benchmark = None
+        if self.game.supervisor_tracking or self.game.supervisor_tracking_benchmark > 0:
+            if self.set_supervisor_tracking(True) and self.game.supervisor_tracking_benchmark > 0:
+                self.set_supervisor_tracking(False)  # the benchmark starts with polling
+                self.tracking_benchmark = TrackingBenchmark(self.game.supervisor_tracking_benchmark)
+
+        if self.game.step_profiling:
+            self.step_profiler = StepProfiler(self.game.step_profiling_window, 'step_profile.json',
+                                              self.game.step_profiling_export_period)
+        else:
+            self.step_profiler = DisabledStepProfiler()
 
         self.status_update_last_real_time = None
         self.status_update_last_sim_time = None
@@ -252,13 +278,20 @@ class Referee:
             self.game.kickoff,
         )
 
-        match = mi.Match(static_match_info)
+        if self.game.data_collection.get("columnar_storage", False):
+            match = mi.ColumnarMatch(static_match_info)
+        else:
+            match = mi.Match(static_match_info)
 
         return dc.DataCollector(
             self.game.data_collection["directory"],
             self.game.data_collection["autosave_interval"],
             match,
             self.logger,
+            incremental_autosave=self.game.data_collection.get("incremental_autosave", False),
+            writer_process=self.game.data_collection.get("writer_process", False),
+            event_tables=self.game.data_collection.get("event_tables", False),
+            save_options=mi.SaveOptions.from_config(self.game.data_collection),
         )
 
     def announce_final_score(self):
@@ -272,6 +305,55 @@ class Referee:
         # TODO: store and print score before penalty shootouts
         self.logger.info(f"FINAL SCORE: {red_score}-{blue_score}")
 
+    def bouncer_port_offset(self):
+        """Offset of the ports of this game: the udp_bouncer listen ports, the port the referee receives the
+        GameState on and the ports of the GameController"""
+        if hasattr(self.game, 'use_bouncing_server') and self.game.use_bouncing_server and \
+                hasattr(self.game, 'bouncer'):
+            return self.game.bouncer.get('port_offset', 0)
+        return 0
+
+    def game_controller_port_args(self):
+        """Arguments which move the ports of the GameController by the bouncer port offset of the game"""
+        port_offset = self.bouncer_port_offset()
+        if port_offset == 0:
+            return []
+        if 'game_controller_port_args' not in self.game.bouncer:
+            # The GameState of this game would be sent to the ports of the game without offset
+            self.logger.error(f'The bouncer port_offset is {port_offset}, but no game_controller_port_args are '
+                              'configured to move the ports of the GameController.')
+            self.clean_exit()
+        ports = {'port_offset': port_offset,
+                 'gc_listen_port': udp_bouncer.UDP_GC_LISTEN_PORT + port_offset,
+                 'game_controller_port': GAME_CONTROLLER_PORT + port_offset}
+        return [arg.format(**ports) for arg in self.game.bouncer['game_controller_port_args']]
+
+    def start_udp_bouncer(self):
+        """Register the game with the multi-game udp_bouncer if its control port is configured, otherwise (or if the
+        registration fails) start a udp_bouncer process for this game"""
+        self.udp_bouncer_process = None
+        self.udp_bouncer_game = None
+        port_offset = self.bouncer_port_offset()
+        # The capture, stats and log of the bouncer, next to the game config file unless configured otherwise
+        directory = os.path.dirname(os.path.abspath(self.game_config_file))
+        if hasattr(self.game, 'bouncer'):
+            directory = self.game.bouncer.get('directory', directory)
+        os.makedirs(directory, exist_ok=True)
+        if hasattr(self.game, 'bouncer') and 'control_port' in self.game.bouncer:
+            name = f'{self.game.red.id}-{self.game.blue.id}-{os.getpid()}'
+            request = {'command': 'register', 'name': name, 'game_config': os.path.abspath(self.game_config_file),
+                       'port_offset': port_offset, 'directory': os.path.abspath(directory)}
+            try:
+                reply = udp_bouncer.control_request(request, self.game.bouncer['control_port'])
+                self.udp_bouncer_game = name
+                self.logger.info(f"Registered game '{name}' with the multi-game udp_bouncer on ports {reply['ports']}.")
+                return
+            except (OSError, RuntimeError, ValueError) as e:
+                self.logger.warning(f'Could not register the game with the udp_bouncer on control port '
+                                    f'{self.game.bouncer["control_port"]}: {e}. Starting a udp_bouncer process.')
+        self.udp_bouncer_process = subprocess.Popen(["python3", "udp_bouncer.py", self.game_config_file,
+                                                     "--port-offset", str(port_offset), "--directory", directory])
+
     def clean_exit(self):
         """Save logs and clean all subprocesses"""
         self.announce_final_score()
@@ -281,9 +363,23 @@ class Referee:
         if hasattr(self.game, "controller_process") and self.game.controller_process:
             self.logger.info("Terminating 'game_controller' process")
             self.game.controller_process.terminate()
-        if hasattr(self.game, "udp_bouncer_process") and self.udp_bouncer_process:
+        if hasattr(self, "udp_bouncer_process") and self.udp_bouncer_process:
             self.logger.info("Terminating 'udp_bouncer' process")
             self.udp_bouncer_process.terminate()
+        if hasattr(self, "udp_bouncer_game") and self.udp_bouncer_game:
+            self.logger.info(f"Unregistering game '{self.udp_bouncer_game}' from the multi-game udp_bouncer")
+            try:
+                udp_bouncer.control_request({"command": "unregister", "name": self.udp_bouncer_game},
+                                            self.game.bouncer["control_port"])
+            except (OSError, RuntimeError, ValueError) as e:
+                self.logger.warning(f"Could not unregister the game from the udp_bouncer: {e}")
+        if hasattr(self, "tracking_benchmark") and self.tracking_benchmark:
+            self.logger.info(self.tracking_benchmark.summary())
+        if hasattr(self, "game_controller_channel") and self.game_controller_channel:
+            self.logger.info(self.game_controller_channel.rtt_summary())
+        if hasattr(self, "step_profiler") and self.game.step_profiling:
+            self.step_profiler.export()
+            self.logger.info(self.step_profiler.summary())
         if hasattr(self, "data_collector") and self.game.data_collection["enabled"]:
             self.logger.info("Stopping 'data collection'")
             self.data_collector.finalize()
@@ -333,7 +429,9 @@ class Referee:
             elapsed_real = now - self.status_update_last_real_time
             elapsed_simulation = self.sim_time.get_sec() - self.status_update_last_sim_time
             speed_factor = elapsed_simulation / elapsed_real
-            messages = [f"Avg speed factor: {speed_factor:.3f} (over last {elapsed_real:.2f} seconds)"]
+            messages = [f"Avg speed factor: {speed_factor:.3f} (over last {elapsed_real:.2f} seconds)",
+                        f"{self.world.stats_message()}, tracking: {'on' if self.world.tracking else 'off'}"]
+            self.world.reset_stats()
             if self.game.state is None:
                 messages.append("No messages received from GameController yet")
             else:
@@ -343,6 +441,8 @@ class Referee:
                                     f"{self.game.state.secondary_state_info[1]}")
             if self.game.penalty_shootout:
                 messages.append(f"{self.get_penalty_shootout_msg()}")
+            if self.tracking_benchmark:
+                messages.extend(self.tracking_benchmark.summary())
             messages = [f"STATUS: {m}" for m in messages]
             self.logger.info(messages)
             self.status_update_last_real_time = now
@@ -420,25 +520,44 @@ class Referee:
         Receive new message from gamecontroller and update the game object (including game.state) accordingly
         Also update display.
         """
-        data = None
-        ip = None
+        # Only the newest packet matters, the packets received since the previous step are all read and skipped
+        newest, spare = self.game_controller_buffers
+        size = None
         while True:
-            if self.game_controller_udp_filter and ip and ip not in self.others:
-                self.others.append(ip)
-                self.logger.warning(f'Ignoring UDP packets from {ip} not matching '
-                                    f'GAME_CONTROLLER_UDP_FILTER={self.game_controller_udp_filter}.')
             try:
-                data, peer = self.game.udp.recvfrom(GameState.sizeof())  # TODO move udp from game.py to referee.py
-                ip, port = peer
-                if self.game_controller_udp_filter is None or self.game_controller_udp_filter == ip:
-                    break
-                else:
-                    continue
+                received, (ip, port) = self.game.udp.recvfrom_into(spare)  # TODO move udp from game.py to referee.py
             except BlockingIOError:
-                return
+                break
             except Exception as e:
                 self.logger.error(f'UDP input failure: {e}')
                 return
+            if self.game_controller_udp_filter is None or self.game_controller_udp_filter == ip:
+                newest, spare = spare, newest
+                size = received
+            elif ip not in self.others:
+                self.others.append(ip)
+                self.logger.warning(f'Ignoring UDP packets from {ip} not matching '
+                                    f'GAME_CONTROLLER_UDP_FILTER={self.game_controller_udp_filter}.')
+        self.game_controller_buffers = [newest, spare]
+        if size is None:
+            return
+        packet = newest[:size]
+        previous_packet = self.game_controller_packet
+        if previous_packet is not None and packet == previous_packet:  # same packet number and payload
+            return
+        if previous_packet is not None and size == len(previous_packet) and \
+                packet[:GAME_STATE_PACKET_NUMBER_OFFSET] == previous_packet[:GAME_STATE_PACKET_NUMBER_OFFSET] and \
+                packet[GAME_STATE_PACKET_NUMBER_OFFSET + 1:] == previous_packet[GAME_STATE_PACKET_NUMBER_OFFSET + 1:]:
+            # The game state did not change, the decoded state is kept
+            state = self.game.state
+            state.packet_number = packet[GAME_STATE_PACKET_NUMBER_OFFSET]
+        else:
+            try:
+                state = parse_game_state(packet)
+            except ValueError as e:
+                self.logger.error(f'Invalid packet received from GameController: {e}')
+                return
+        self.game_controller_packet = bytes(packet)
         self.previous_seconds_remaining = self.game.state.seconds_remaining if self.game.state else 0
         previous_secondary_seconds_remaining = self.game.state.secondary_seconds_remaining if self.game.state else 0
         previous_state = self.game.state.game_state if self.game.state else None
@@ -453,7 +572,7 @@ class Referee:
             previous_red_score = 0
             previous_blue_score = 0
 
-        self.game.state = GameState.parse(data)
+        self.game.state = state
 
         if previous_state != self.game.state.game_state:
             self.logger.info(f'New state received from GameController: {self.game.state.game_state}.')
@@ -535,6 +654,11 @@ class Referee:
             self.display.update()
 
     def game_controller_send(self, message):
+        if message[:6] == 'CLOCK:':
+            # Only the latest clock matters, it is coalesced with the clock in flight and not waited for
+            self.game_controller_channel.send_clock(int(message[6:]))
+            self.game_controller_handle_answers(self.game_controller_channel.poll())
+            return True
         if message[:6] == 'STATE:' or message[:6] == 'SCORE:' or message == 'DROPPEDBALL':
             # we don't want to send twice the same STATE or SCORE message
             if self.game_controller_last_sent_message == message:
@@ -564,66 +688,45 @@ class Referee:
                     else:
                         self.game.wait_for_sec_phase = 0
                 self.logger.info(f"Waiting for secondary state: {self.game.wait_for_sec_state}:{self.game.wait_for_sec_phase}")
-        self.game_controller_send_id += 1
-        if message[:6] != 'CLOCK:':
-            self.logger.info(f'Sending {self.game_controller_send_id}:{message} to GameController.')
-        message = f'{self.game_controller_send_id}:{message}\n'
-        self.game_controller_socket.sendall(message.encode('ascii'))
-        # self.logger.info(f'sending {message.strip()} to GameController')
-        self.game_controller_send_unanswered[self.game_controller_send_id] = message.strip()
-        answered = False
-        sent_id = self.game_controller_send_id
+        self.logger.info(f'Sending {self.game_controller_channel.send_id + 1}:{message} to GameController.')
+        sent_id = self.game_controller_channel.send(message)
         while True:
-            try:
-                answers = self.game_controller_socket.recv(1024).decode('ascii').split('\n')
-                for answer in answers:
-                    if answer == '':
-                        continue
-                    try:
-                        id, result = answer.split(':')
-                        if int(id) == sent_id:
-                            answered = True
-                    except ValueError:
-                        self.logger.error(f'Cannot split {answer}')
-                        self.clean_exit()
-                    try:
-                        answered_message = self.game_controller_send_unanswered[int(id)]
-                        del self.game_controller_send_unanswered[int(id)]
-                    except KeyError:
-                        self.logger.error(f'Received acknowledgment message for unknown message: {id}')
-                        self.clean_exit()
-                    if result == 'OK':
-                        continue
-                    if result == 'INVALID':
-                        self.logger.error(f'Received invalid answer from GameController for message {answered_message}.')
-                        self.clean_exit()
-                    elif result == 'ILLEGAL':
-                        info_msg = f"Received illegal answer from GameController for message {answered_message}."
-                        if "YELLOW" in message:
-                            self.logger.warning(info_msg)
-                        else:
-                            self.logger.error(info_msg)
-                            self.clean_exit()
-                    else:
-                        self.logger.error(f'Received unknown answer from GameController: {answer}.')
-                        self.clean_exit()
-            except BlockingIOError:
-                if answered or ':CLOCK:' in message:
-                    break
-                else:  # keep sending CLOCK messages to keep the GameController happy
-                    self.logger.info(f'Waiting for GameController to answer to {message.strip()}.')
-                    time.sleep(0.2)
-                    self.game_controller_send_id += 1
-                    clock_message = f'{self.game_controller_send_id}:CLOCK:{self.sim_time.get_ms()}\n'
-                    self.game_controller_socket.sendall(clock_message.encode('ascii'))
-                    self.game_controller_send_unanswered[self.game_controller_send_id] = clock_message.strip()
+            answers, answered = self.game_controller_channel.wait_for_ack(sent_id, GAME_CONTROLLER_ANSWER_TIMEOUT)
+            self.game_controller_handle_answers(answers)
+            if answered:
+                break
+            # keep sending CLOCK messages to keep the GameController happy
+            self.logger.info(f'Waiting for GameController to answer to {sent_id}:{message}.')
+            self.game_controller_channel.send_clock(self.sim_time.get_ms())
         # We are waiting for a specific update from the GC before testing anything else
         while self.game.wait_for_state is not None or self.game.wait_for_sec_state is not None \
                 or self.game.wait_for_sec_phase is not None:
+            select.select([self.game.udp], [], [], GAME_CONTROLLER_ANSWER_TIMEOUT)
+            self.game_controller_handle_answers(self.game_controller_channel.poll())
             self.game_controller_receive()
 
         return True
 
+    def game_controller_handle_answers(self, answers):
+        """Report the answers of the GameController which are not OK, exit on errors"""
+        for answered_message, result in answers:
+            if answered_message is None:
+                self.logger.error(f'Received answer for unknown message from GameController: {result}')
+                self.clean_exit()
+            elif result == 'INVALID':
+                self.logger.error(f'Received invalid answer from GameController for message {answered_message}.')
+                self.clean_exit()
+            elif result == 'ILLEGAL':
+                info_msg = f"Received illegal answer from GameController for message {answered_message}."
+                if "YELLOW" in answered_message:
+                    self.logger.warning(info_msg)
+                else:
+                    self.logger.error(info_msg)
+                    self.clean_exit()
+            else:
+                self.logger.error(f'Received unknown answer from GameController: {result}.')
+                self.clean_exit()
+
     def append_solid(self, solid, active_tag=None):  # we list only the hands and feet
         solids = []
         tagged_solids = dict()
@@ -715,7 +818,7 @@ class Referee:
             aabb = None
             i = 0
             for solid in goalkeeper['solids']:
-                position = solid.getPosition()
+                position = self.world.get_position(solid)
                 aabb = update_aabb(aabb, position)
                 points[i] = [position[0], position[1]]
                 i += 1
@@ -735,7 +838,7 @@ class Referee:
             i = 0
             for player in players_close_to_the_ball:
                 for solid in player['solids']:
-                    position = solid.getPosition()
+                    position = self.world.get_position(solid)
                     aabb = update_aabb(aabb, position)
                     points[i] = [position[0], position[1]]
                     i += 1
@@ -780,26 +883,25 @@ class Referee:
     def update_team_contacts(self, team):
         early_game_interruption = self.is_early_game_interruption()
         color = team.color
+        indices = []
+        velocities = []
+        for number, player in team.players.items():
+            if player['robot'] is not None:
+                indices.append(int(number) - 1)
+                velocities.append(self.world.get_velocity(player['robot']))
+        team.velocities.update(int(self.sim_time.get_ms() / self.time_step), indices, velocities)
         for number, player in team.players.items():
             robot = player['robot']
             if robot is None:
                 continue
-            l1 = len(player['velocity_buffer'])     # number of iterations
-            l2 = len(player['velocity_buffer'][0])  # should be 6 (velocity vector size)
-            player['velocity_buffer'][int(self.sim_time.get_ms() / self.time_step) % l1] = robot.getVelocity()
-            sum = [0] * l2
-            for v in player['velocity_buffer']:
-                for i in range(l2):
-                    sum[i] += v[i]
-            player['velocity'] = [s / l1 for s in sum]
-            contact_points = robot.getContactPoints(True)
+            contact_points = self.world.get_contact_points(robot, True)
             n = len(contact_points)
             player['contact_points'] = []
             if n == 0:  # robot is asleep
                 player['asleep'] = True
                 continue
             player['asleep'] = False
-            player['position'] = robot.getCenterOfMass()
+            player['position'] = self.world.get_center_of_mass(robot)
             # if less then 3 contact points, the contacts do not include contacts with the ground,
             # so don't update the following value based on ground collisions
             if n >= 3:
@@ -819,7 +921,7 @@ class Referee:
                 point = contact_points[i].point
                 member = player['node_names'].get(contact_points[i].node_id)
                 if member is None:
-                    node = self.supervisor.getFromId(contact_points[i].node_id)
+                    node = self.world.get_from_id(contact_points[i].node_id)
                     if not node:
                         continue
                     name_field = node.getField('name')
@@ -912,7 +1014,7 @@ class Referee:
 
     def update_ball_contacts(self):
         self.ball.contact_points = []
-        new_contact_points = self.ball.getContactPoints()
+        new_contact_points = self.world.get_contact_points(self.ball)
         for contact in new_contact_points:
             point = contact.point
             if point[2] <= self.field.turf_depth:  # contact with the ground
@@ -1107,8 +1209,8 @@ class Referee:
                 return True
         v1 = p1['velocity']
         v2 = p2['velocity']
-        v1_squared = v1[0] * v1[0] + v1[1] * v1[1]
-        v2_squared = v2[0] * v2[0] + v2[1] * v2[1]
+        v1_squared = team.velocities.speeds_squared[int(number) - 1]
+        v2_squared = opponent_team.velocities.speeds_squared[int(opponent_number) - 1]
         if not v1_squared > self.config.FOUL_SPEED_THRESHOLD * self.config.FOUL_SPEED_THRESHOLD:
             return False
         debug_messages.append(f"{p1_str:6s}: velocity: {self.readable_number_list(v1[:3])}, "
@@ -1141,14 +1243,12 @@ class Referee:
     def check_forceful_contacts(self):
         self.update_robot_contacts()
         fcm = self.forceful_contact_matrix
-        for red_number in self.red_team.players:
-            for blue_number in self.blue_team.players:
-                if not fcm.contact(red_number, blue_number, self.sim_time.get_ms()):
-                    continue  # no contact
-                if self.check_team_forceful_contacts(self.red_team, red_number, self.blue_team, blue_number):
-                    continue
-                if self.check_team_forceful_contacts(self.blue_team, blue_number, self.red_team, red_number):
-                    continue
+        for red_number, blue_number in fcm.contacts(self.sim_time.get_ms()):
+            if not fcm.contact(red_number, blue_number, self.sim_time.get_ms()):
+                continue  # the contacts were cleared by a foul on a previous pair
+            if self.check_team_forceful_contacts(self.red_team, red_number, self.blue_team, blue_number):
+                continue
+            self.check_team_forceful_contacts(self.blue_team, blue_number, self.red_team, red_number)
 
     def check_team_ball_holding(self, team):
         color = team.color
@@ -1884,6 +1984,7 @@ class Referee:
         target_location = [100, 100, self.game.ball_radius + 0.05]
         self.ball.resetPhysics()
         self.game.ball_translation.setSFVec3f(target_location)
+        self.world.invalidate(self.game.ball_translation)
         self.logger.info("Moved ball out of the field temporarily")
 
     def kickoff(self):
@@ -2025,6 +2126,7 @@ class Referee:
         target_location[2] = self.game.ball_radius
         self.ball.resetPhysics()
         self.game.ball_translation.setSFVec3f(target_location)
+        self.world.invalidate(self.game.ball_translation)
         self.game.ball_set_kick = False
         self.game.reset_ball_touched()
         self.logger.info(f'Ball respawned at {target_location[0]} {target_location[1]} {target_location[2]}.')
@@ -2056,7 +2158,6 @@ class Referee:
                 node = robot.getFromProtoDef(frame_id)
                 if node is None:
                     continue
-                #node.enablePoseTracking(self.time_step)
                 nodes[frame_id] = node
             return nodes
 
@@ -2066,9 +2167,7 @@ class Referee:
         }
 
         # Ball
-        node = self.ball
-        #node.enablePoseTracking(self.time_step)
-        self.data_collection_frame_nodes["ball"] = {"BALL": node}
+        self.data_collection_frame_nodes["ball"] = {"BALL": self.ball}
 
         # Teams
         for color, team in {"blue": self.blue_team, "red": self.red_team}.items():
@@ -2076,23 +2175,62 @@ class Referee:
             for number in team.players.keys():
                 self.data_collection_frame_nodes["teams"][color][number] = get_player_frame_nodes(team, number)
 
+    def get_tracked_nodes(self):
+        """Returns the nodes whose poses and contact points can be tracked by Webots.
+
+        :return: the nodes of the data collection frames and the robot and ball nodes with whether contact points of
+            their descendants are needed
+        :rtype: Tuple[List[Node], List[Tuple[Node, bool]]]
+        """
+        pose_nodes = []
+        if self.game.data_collection["enabled"]:
+            pose_nodes.extend(self.data_collection_frame_nodes["ball"].values())
+            for players in self.data_collection_frame_nodes["teams"].values():
+                for nodes in players.values():
+                    pose_nodes.extend(nodes.values())
+        contact_nodes = [(self.ball, False)]
+        for team in [self.red_team, self.blue_team]:
+            for player in team.players.values():
+                if player['robot'] is not None:
+                    contact_nodes.append((player['robot'], True))
+        return pose_nodes, contact_nodes
+
+    def set_supervisor_tracking(self, enabled):
+        """Switches between Webots pose/contact points tracking and polling them at every step.
+
+        :param enabled: whether to enable tracking
+        :return: False if tracking is not supported by the Webots version
+        :rtype: bool
+        """
+        if not enabled:
+            self.world.disable_tracking()
+            return True
+        pose_nodes, contact_nodes = self.get_tracked_nodes()
+        if self.world.enable_tracking(pose_nodes, contact_nodes, self.game.supervisor_tracking_period):
+            self.logger.info(f'Tracking poses of {len(pose_nodes)} nodes and contact points of {len(contact_nodes)} nodes '
+                             f'every {self.game.supervisor_tracking_period} ms.')
+            return True
+        self.logger.warning('Pose and contact points tracking is not supported by this Webots version, polling instead.')
+        return False
+
     def data_collection_set_ball_data(self):
         """Sets the ball data for the data collection."""
         frame_id = "BALL"
-        affine_pose = self.data_collection_frame_nodes["ball"][frame_id].getPose()
+        affine_pose = np.array(self.world.get_pose(self.data_collection_frame_nodes["ball"][frame_id]))
 
         self.data_collector.current_step().ball = mi.Ball(
             frame_id,
             mi.Frame(
                 frame_id,
-                mi.pose_from_affine(np.array(affine_pose)),
+                mi.AffinePose(affine_pose) if self.game.data_collection.get("raw_poses", False)
+                else mi.pose_from_affine(affine_pose),
             ),
         )
 
     def data_collection_set_team_data(self):
         """Sets the team data for the data collection."""
 
-        def create_player(player_number: str, game_info_team, players: Dict[str, Dict[str, List[float]]]) -> Optional[mi.Player]:
+        def create_player(player_number: str, game_info_team, players: Dict[str, Dict[str, mi.Pose]]) -> Optional[mi.Player]:
             """Creates a player for the data collection.
 
             :param player_number: Number of the player
@@ -2100,7 +2238,7 @@ class Referee:
             :param game_info_team: Team info from the game info
             :type game_info_team: 
             :param players: Dict of players of poses
-            :type poses: Dict[str, Dict[str, List[float]]]
+            :type poses: Dict[str, Dict[str, mi.Pose]]
             :return: Player object, if the player exists
             :rtype: Optional[mi.Player]
             """
@@ -2127,29 +2265,17 @@ class Referee:
 
             # Get poses
             poses = players[player_number]
-            try:
-                camera_frame = mi.pose_from_affine(np.array(poses["camera_frame"]))
-            except KeyError:
-                camera_frame = None
-            try:
-                l_camera_frame = mi.pose_from_affine(np.array(poses["l_camera_frame"]))
-            except KeyError:
-                l_camera_frame = None
-            try:
-                r_camera_frame = mi.pose_from_affine(np.array(poses["r_camera_frame"]))
-            except KeyError:
-                r_camera_frame = None
 
             return mi.Player(
                 id=player_number,
-                base_link=mi.pose_from_affine(np.array(poses["base_link"])),
-                l_sole=mi.pose_from_affine(np.array(poses["l_sole"])),
-                r_sole=mi.pose_from_affine(np.array(poses["r_sole"])),
-                l_gripper=mi.pose_from_affine(np.array(poses["l_gripper"])),
-                r_gripper=mi.pose_from_affine(np.array(poses["r_gripper"])),
-                camera_frame=camera_frame,
-                l_camera_frame=l_camera_frame,
-                r_camera_frame=r_camera_frame,
+                base_link=poses["base_link"],
+                l_sole=poses["l_sole"],
+                r_sole=poses["r_sole"],
+                l_gripper=poses["l_gripper"],
+                r_gripper=poses["r_gripper"],
+                camera_frame=poses.get("camera_frame"),
+                l_camera_frame=poses.get("l_camera_frame"),
+                r_camera_frame=poses.get("r_camera_frame"),
                 robot_info=robot_info
             )
 
@@ -2159,7 +2285,7 @@ class Referee:
             :param game_info_team: Team info from the game info
             :type game_info_team:
             :param players: Dict of players of poses
-            :type poses: Dict[str, Dict[str, List[float]]]
+            :type poses: Dict[str, Dict[str, mi.Pose]]
             """
             return mi.Team(
                 id=game_info_team.team_number,
@@ -2172,20 +2298,33 @@ class Referee:
                 single_shots=game_info_team.single_shots
             )
 
-        def get_team_player_poses() -> Dict[str, Dict[int, Dict[str, List[float]]]]:
+        def get_team_player_poses() -> Dict[str, Dict[int, Dict[str, Union[mi.Pose, mi.AffinePose]]]]:
             """Returns the pose of the team players.
+            The affine matrices of all frames are converted to poses at once,
+            or stored as they are if raw poses are captured.
 
-            :return: Dictionary of poses (List of 16 floats to be interpreted as 4x4 matrix),
-                indexed by team color, player number and frame id
-            :rtype: Dict[str, Dict[int, Dict[str, List[float]]]]
+            :return: Dictionary of poses, indexed by team color, player number and frame id
+            :rtype: Dict[str, Dict[int, Dict[str, Union[mi.Pose, mi.AffinePose]]]]
             """
             poses = {}
+            keys = []
+            affines = []
             for team, players in self.data_collection_frame_nodes["teams"].items():
                 poses[team] = {}
                 for number, nodes in players.items():
                     poses[team][number] = {}
                     for frame_id, node in nodes.items():
-                        poses[team][number][frame_id] = node.getPose()
+                        keys.append((team, number, frame_id))
+                        affines.append(self.world.get_pose(node))
+            if not affines:
+                return poses
+            affines = np.array(affines)
+            if self.game.data_collection.get("raw_poses", False):
+                converted = [mi.AffinePose(affine) for affine in affines]
+            else:
+                converted = mi.poses_from_affines(affines)
+            for (team, number, frame_id), pose in zip(keys, converted):
+                poses[team][number][frame_id] = pose
             return poses
 
         # Get teams
@@ -2209,7 +2348,7 @@ class Referee:
         team2 = create_team(game_info_team_red, players_red)
 
         teams = mi.Teams(team1=team1, team2=team2)
-        self.data_collector.current_step().teams = teams
+        self.data_collector.set_teams(teams)
 
     def data_collection_set_game_control_data(self) -> None:
         """Sets the game control data for the data collection."""
@@ -2218,7 +2357,7 @@ class Referee:
             return
         
         # Set new game control data object
-        self.data_collector.current_step().game_control_data = mi.GameControlData(
+        self.data_collector.set_game_control_data(mi.GameControlData(
             game_state = mi.GameControlData.GameState(int(gamestate.game_state)),
             first_half = gamestate.first_half,
             kickoff_team = gamestate.kickoff_team,
@@ -2229,7 +2368,7 @@ class Referee:
             drop_in_time = gamestate.drop_in_time,
             seconds_remaining = gamestate.seconds_remaining,
             secondary_seconds_remaining = gamestate.secondary_seconds_remaining,
-        )
+        ))
 
     def setup(self):
         # check game type
@@ -2285,9 +2424,11 @@ class Referee:
                     if hasattr(self.game, 'use_bouncing_server') and self.game.use_bouncing_server:
                         command_line.append('-b')
                         command_line.append(self.game.host)
-                        self.udp_bouncer_process = subprocess.Popen(["python3", "udp_bouncer.py", self.game_config_file])
+                        command_line += self.game_controller_port_args()
+                        self.start_udp_bouncer()
                     else:
                         self.udp_bouncer_process = None
+                        self.udp_bouncer_game = None
                     self.game.controller_process = subprocess.Popen(command_line,
                                                                     cwd=os.path.join(GAME_CONTROLLER_HOME, 'build', 'jar'))
             except KeyError:
@@ -2343,32 +2484,36 @@ class Referee:
         try:
             if self.game.controller_process:
                 self.game_controller_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                game_controller_port = GAME_CONTROLLER_PORT + self.bouncer_port_offset()
                 retry = 0
                 while True:
                     try:
-                        self.game_controller_socket.connect(('localhost', 8750))
-                        self.game_controller_socket.setblocking(False)
+                        self.game_controller_socket.connect(('localhost', game_controller_port))
+                        self.game_controller_channel = GameControllerChannel(self.game_controller_socket)
                         break
                     except socket.error as msg:
                         retry += 1
                         if retry <= 10:
-                            self.logger.warning(f'Could not connect to GameController at localhost:8750: {msg}. '
+                            self.logger.warning(f'Could not connect to GameController at '
+                                                f'localhost:{game_controller_port}: {msg}. '
                                                 f'Retrying ({retry}/10)...')
                             time.sleep(retry)  # give some time to allow the GameControllerSimulator to start-up
                             self.supervisor.step(0)
                         else:
-                            self.logger.error('Could not connect to GameController at localhost:8750.')
+                            self.logger.error(f'Could not connect to GameController at '
+                                              f'localhost:{game_controller_port}.')
                             self.game_controller_socket = None
                             self.clean_exit()
                             break
-                self.logger.info('Connected to GameControllerSimulator at localhost:8750.')
+                self.logger.info(f'Connected to GameControllerSimulator at localhost:{game_controller_port}.')
                 try:
                     self.game.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
                     self.game.udp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
                     if hasattr(self.game, 'use_bouncing_server') and self.game.use_bouncing_server:
                         # In case we are using the bouncing server we have to select which interface
-                        # is used because messages are not broadcast
-                        self.game.udp.bind((self.game.host, 3838))
+                        # is used because messages are not broadcast. The bouncer sends the GameState of the game to
+                        # its port offset, so that several referees can run on one host
+                        self.game.udp.bind((self.game.host, udp_bouncer.UDP_GC_SEND_PORT + self.bouncer_port_offset()))
                     else:
                         self.game.udp.bind(('0.0.0.0', 3838))
                     self.game.udp.setblocking(False)
@@ -2439,22 +2584,36 @@ class Referee:
 
         previous_real_time = time.time()
         step_count: int = 0
+        # Each lap measures the phase of the main loop since the previous lap
+        profiler = self.step_profiler
+        lap = profiler.clock()
         while self.supervisor.step(self.time_step) != -1 and not self.game.over:
+            lap = profiler.lap('supervisor.step', lap)
+            referee_step_start = lap
             step_start_time = time.time()  # Also gets used for data collection
+            self.world.new_step()
+            if self.tracking_benchmark and self.tracking_benchmark.update(step_start_time, self.sim_time.get_sec()):
+                self.set_supervisor_tracking(self.tracking_benchmark.tracking)
             step_count += 1
             if hasattr(self.game, 'max_duration') and (step_start_time - self.blackboard.start_real_time) > self.game.max_duration:
                 self.logger.info(f'Interrupting game automatically after {self.game.max_duration} seconds')
                 break
+            lap = profiler.lap('world.new_step', lap)
             self.print_status()
+            lap = profiler.lap('print_status', lap)
             self.game_controller_send(f'CLOCK:{self.sim_time.get_ms()}')
+            lap = profiler.lap('game_controller_send', lap)
             self.game_controller_receive()
+            lap = profiler.lap('game_controller_receive', lap)
             if self.game.state is None:
                 self.sim_time.progress_ms(self.time_step)
+                profiler.end_step()
                 continue
             self.stabilize_robots()
             send_play_state_after_penalties = False
             previous_position = copy.deepcopy(self.game.ball_position)
-            self.game.ball_position = self.game.ball_translation.getSFVec3f()
+            self.game.ball_position = self.world.get_sf_vec3f(self.game.ball_translation)
+            lap = profiler.lap('stabilize_robots', lap)
 
             # Collect data of step
             if should_run_data_collection(step_count):
@@ -2468,17 +2627,24 @@ class Referee:
                 except Exception:
                     self.game.data_collection["enabled"] = False  # Disable data collection
                     self.logger.error(f"Failed to collect data: {traceback.format_exc()}")
+                lap = profiler.lap('data_collection', lap)
 
             if self.game.ball_position != previous_position:
                 self.game.ball_last_move = self.sim_time.get_ms()
             self.update_contacts()  # check for collisions with the ground and ball
+            lap = profiler.lap('update_contacts', lap)
             if not self.game.penalty_shootout:
                 self.update_ball_holding()  # check for ball holding for field players and goalkeeper
+                lap = profiler.lap('update_ball_holding', lap)
             self.update_histories()
+            lap = profiler.lap('update_histories', lap)
             if self.game.state.game_state == 'STATE_PLAYING' and not self.is_early_game_interruption():
                 self.check_outside_turf()
+                lap = profiler.lap('check_outside_turf', lap)
                 self.check_forceful_contacts()
+                lap = profiler.lap('check_forceful_contacts', lap)
                 self.check_inactive_goalkeepers()
+                lap = profiler.lap('check_inactive_goalkeepers', lap)
                 if self.game.in_play is None:
                     # During period after the end of a game interruption, check distance of opponents
                     if self.game.phase in GAME_INTERRUPTIONS and self.game.state.secondary_state[6:] == "NORMAL":
@@ -2530,7 +2696,7 @@ class Referee:
                                                                                  self.game.ball_radius)
                     # It is unclear that using getVelocity is the good approach, because even when the ball
                     # is clearly not moving anymore, it still provides values above 1e-3.
-                    ball_vel = self.ball.getVelocity()[:3]
+                    ball_vel = self.world.get_velocity(self.ball)[:3]
                     if ball_in_goal_area and np.linalg.norm(ball_vel) < self.config.STATIC_SPEED_EPS:
                         self.logger.info(f"Ball stopped in goal area at {self.game.ball_position}")
                         self.next_penalty_shootout()
@@ -2787,8 +2953,10 @@ class Referee:
                     if self.game.interruption:
                         self.game_controller_send(f'{self.game.interruption}:{self.game.interruption_team}:READY')
 
+            lap = profiler.lap('game_rules', lap)
             if self.game.state.game_state != 'STATE_INITIAL':
                 self.check_fallen()                                # detect fallen robots
+                lap = profiler.lap('check_fallen', lap)
 
             if self.game.state.game_state == 'STATE_PLAYING' and self.game.in_play:
                 if not self.game.penalty_shootout:
@@ -2802,13 +2970,17 @@ class Referee:
                 if ball_handling and not self.game.penalty_shootout:
                     # TODO check logic of the interruption
                     self.interruption('FREEKICK', ball_handling, self.game.ball_position, is_goalkeeper_ball_manipulation=True)
+                lap = profiler.lap('check_ball_holding', lap)
             self.check_penalized_in_field()                    # check for penalized robots inside the field
+            lap = profiler.lap('check_penalized_in_field', lap)
             if self.game.state.game_state != 'STATE_INITIAL':  # send penalties if needed
                 self.send_penalties()
                 if send_play_state_after_penalties:
                     self.game_controller_send('STATE:PLAY')
+                lap = profiler.lap('send_penalties', lap)
 
             self.sim_time.progress_ms(self.time_step)
+            profiler.record('referee_step', lap - referee_step_start)
 
             # Slow down the simulation to guarantee minimum amount of real time between each step
             # Maximum real time factor of <= 0.0 means that the simulation will run as fast as possible
@@ -2825,6 +2997,7 @@ class Referee:
                 wait_time = min_step_time - step_time_until_now
                 if wait_time > 0:  # wait only if the step was completed faster than the minimum required time
                     time.sleep(wait_time)  # wait for the remaining time
+                lap = profiler.lap('real_time_factor_wait', lap)
 
             step_end_time = time.time()
 
@@ -2837,6 +3010,7 @@ class Referee:
 
             self.first_step_done = True
             previous_real_time = time.time()  # update the previous real time for the next step
+            profiler.end_step()
 
         # for some reason, the simulation was terminated before the end of the match (may happen during tests)
         if not self.game.over:
@@ -0,0 +1,147 @@
+# Copyright 1996-2021 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import time
+
+import numpy as np
+
+
+class PhaseStats:
+    """Durations of the last `window` calls of a phase in a preallocated ring buffer, plus totals since the start."""
+
+    __slots__ = ['durations', 'count', 'total', 'max']
+
+    def __init__(self, window):
+        self.durations = [0] * window  # nanoseconds
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+
+class StepProfiler:
+    """Measures the duration of each phase of the referee main loop with a monotonic clock.
+
+    A phase is measured with `lap`, which records the time elapsed since the previous lap and returns the current time,
+    so that consecutive phases only read the clock once. Rolling percentiles over the last `window` calls of each phase
+    are exported every `export_period` real seconds to a json file and summarized at the end of the game.
+    """
+
+    def __init__(self, window=1000, export_path=None, export_period=10.0):
+        self.window = window
+        self.export_path = export_path
+        self.export_period = export_period
+        self.phases = {}
+        self.steps = 0
+        self.start_time = time.monotonic()
+        self.next_export_time = self.start_time + export_period
+
+    @staticmethod
+    def clock():
+        return time.perf_counter_ns()
+
+    def record(self, phase, duration):
+        stats = self.phases.get(phase)
+        if stats is None:
+            stats = self.phases[phase] = PhaseStats(self.window)
+        stats.durations[stats.count % self.window] = duration
+        stats.count += 1
+        stats.total += duration
+        if duration > stats.max:
+            stats.max = duration
+
+    def lap(self, phase, start):
+        """Record the time elapsed since start as a call of phase and return the current time."""
+        now = time.perf_counter_ns()
+        self.record(phase, now - start)
+        return now
+
+    def end_step(self):
+        """Count a step of the main loop and export the statistics when the export period elapsed."""
+        self.steps += 1
+        if self.export_path is not None and self.steps % 64 == 0 and time.monotonic() >= self.next_export_time:
+            self.export()
+            self.next_export_time = time.monotonic() + self.export_period
+
+    def statistics(self):
+        """Statistics of each phase in milliseconds: percentiles and max over the window, mean and max since the start,
+        total time in seconds and the number of calls per step."""
+        phases = {}
+        for phase, stats in self.phases.items():
+            durations = np.array(stats.durations[:min(stats.count, self.window)], dtype=np.float64) * 1e-6
+            p50, p95, p99 = np.percentile(durations, [50, 95, 99])
+            phases[phase] = {
+                'count': stats.count,
+                'calls_per_step': stats.count / self.steps if self.steps else None,
+                'p50': p50,
+                'p95': p95,
+                'p99': p99,
+                'max': durations.max(),
+                'mean': stats.total * 1e-6 / stats.count,
+                'max_total': stats.max * 1e-6,
+                'total_seconds': stats.total * 1e-9,
+            }
+        return {
+            'time': time.time(),
+            'real_seconds': time.monotonic() - self.start_time,
+            'steps': self.steps,
+            'window': self.window,
+            'unit': 'ms',
+            'phases': phases,
+        }
+
+    def export(self):
+        # Replace the file at once, so that readers never see a partially written file
+        tmp_path = f'{self.export_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.statistics(), f, indent=4)
+        os.replace(tmp_path, self.export_path)
+
+    def summary(self):
+        """Lines of a summary table, the phases taking the most time first."""
+        statistics = self.statistics()
+        phases = sorted(statistics['phases'].items(), key=lambda item: item[1]['total_seconds'], reverse=True)
+        total = sum(stats['total_seconds'] for _, stats in phases)
+        messages = [f'Step profile over {statistics["steps"]} steps and {statistics["real_seconds"]:.1f} real seconds '
+                    f'(p50/p95/p99/max over the last {self.window} calls, in ms):']
+        for phase, stats in phases:
+            share = 100 * stats['total_seconds'] / total if total else 0
+            messages.append(f'  {phase}: {share:.1f}% of the time, mean {stats["mean"]:.3f}, p50 {stats["p50"]:.3f}, '
+                            f'p95 {stats["p95"]:.3f}, p99 {stats["p99"]:.3f}, max {stats["max"]:.3f} '
+                            f'(max overall {stats["max_total"]:.3f})')
+        return messages
+
+
+class DisabledStepProfiler:
+    """Same interface as StepProfiler, without measuring anything."""
+
+    @staticmethod
+    def clock():
+        return 0
+
+    def record(self, phase, duration):
+        pass
+
+    def lap(self, phase, start):
+        return start
+
+    def end_step(self):
+        pass
+
+    def export(self):
+        pass
+
+    def summary(self):
+        return []
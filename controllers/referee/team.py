@@ -17,10 +17,40 @@ import json
 import traceback
 from types import SimpleNamespace
 
+import numpy as np
+
 from logger import logger
 from blackboard import blackboard
 
 
+class VelocityWindow:
+    """Velocities of the robots of a team over the last `window` steps, in a ring buffer of shape (players, window, 6).
+
+    The sum of each robot's window is updated with the value leaving the window, so that the smoothed velocities of
+    all the robots are updated at once in constant time per step instead of summing the whole window. The sums are
+    recomputed from the buffer once per window, so that rounding errors do not accumulate.
+    """
+
+    def __init__(self, players, window):
+        self.window = window
+        self.buffer = np.zeros((players, window, 6))
+        self.sums = np.zeros((players, 6))
+        self.smoothed = np.zeros((players, 6))  # mean velocity of each robot over the window
+        self.speeds_squared = np.zeros(players)  # squared horizontal speed of each smoothed velocity
+
+    def update(self, step, indices, velocities):
+        """Store the velocities of the robots with these indices at this step and update the smoothed velocities."""
+        slot = step % self.window
+        if len(indices) > 0:
+            velocities = np.asarray(velocities, dtype=np.float64)
+            self.sums[indices] += velocities - self.buffer[indices, slot]
+            self.buffer[indices, slot] = velocities
+        if slot == 0:
+            self.buffer.sum(axis=1, out=self.sums)
+        np.divide(self.sums, self.window, out=self.smoothed)
+        np.einsum('ij,ij->i', self.smoothed[:, :2], self.smoothed[:, :2], out=self.speeds_squared)
+
+
 class Team(SimpleNamespace):
     @classmethod
     def from_json(cls, json_path):
@@ -54,6 +84,8 @@ class Team(SimpleNamespace):
         self.blackboard = blackboard
 
     def setup(self):
+        window_size = int(1000 / int(self.blackboard.supervisor.getBasicTimeStep()))  # one second window size
+        self.velocities = VelocityWindow(len(self.players), window_size)
         # check validity of team files
         # the players IDs should be "1", "2", "3", "4" for four players, "1", "2", "3" for three players, etc.
         for number, player in self.players.items():
@@ -67,8 +99,8 @@ class Team(SimpleNamespace):
             player['left_turf_time'] = None
             # Stores tuples of with (self.sim_time.get_ms()[int], dic) at a 1Hz frequency
             player['history'] = []
-            window_size = int(1000 / int(self.blackboard.supervisor.getBasicTimeStep()))  # one second window size
-            player['velocity_buffer'] = [[0] * 6] * window_size
             player['ball_handling_start'] = None
             player['ball_handling_last'] = None
             player['node_names'] = {} # used for caching node_id -> name pairs of a robot for contact point analysis
+            # smoothed velocity, a view on the row of the player in self.velocities
+            player['velocity'] = self.velocities.smoothed[int(number) - 1]
@@ -12,18 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import argparse
+import collections
+import functools
+import selectors
 import socket
-import threading
+import signal
+import struct
 import json
+import os
 import sys
 import time
 
-try:
-    from queue import SimpleQueue
-except ImportError:
-    # python < 3.7
-    from queue import Queue as SimpleQueue
-
 
 def log(message):
     global log_file
@@ -33,7 +33,7 @@ def log(message):
         log_file.flush()
 
 
-log_file = open("bouncing_log.txt", "w")
+log_file = None
 log.real_time = time.time()
 
 # Port we receive messages from the GameController
@@ -51,72 +51,192 @@ UDP_TEAM_SEND_PORT = 3737
 # IP of this UDP server
 SERVER_IP = "0.0.0.0"
 
-# Buffer size
-BUFFER = 1024
-
-# Setting up a Queue to handle incoming packages
-package_queue = SimpleQueue()
-
-# List of registered clients to send the information to
-clients = []
-robots_blue = []
-robots_red = []
-
-
-# Sends a given package to a given IP on the UDP_SEND_PORT
-def send_message_to_client(ip, port, package):
-    send_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)  # UDP
-    send_sock.sendto(package, (ip, port))
-
-
-# Main function of the server that handles packages from clients and adds them to a queue
-def receive_input_from_client(port):
-    # Binding the server that listens to incoming UDP packages
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)  # UDP
-    sock.bind((SERVER_IP, port))
-    log(f"Binding receive on {SERVER_IP}:{port}")
-
-    while True:
-        data, addr = sock.recvfrom(BUFFER)
-        package_queue.put([time.time(), addr[0], port, data])
-        time.sleep(0.005)
-
-
-# Function that listens to queue updates and sends the messages out to the individual clients
-def on_queue_update():
-    while True:
-        if not package_queue.empty():
-            current_package = package_queue.get()
-            if current_package[2] == 3839:  # we received a GC update message
-                for client in clients:
-                    client_thread = threading.Thread(target=send_message_to_client, args=[client, UDP_GC_SEND_PORT,
-                                                                                          current_package[3]])
-                    client_thread.start()
-            else:  # we received an update from one of the teams
-                log(current_package)
-                if current_package[1] in robots_blue:
-                    for client in robots_blue:
-                        if client != current_package[1]:
-                            client_thread = threading.Thread(target=send_message_to_client,
-                                                             args=[client, UDP_TEAM_SEND_PORT, current_package[3]])
-                            client_thread.start()
-                elif current_package[1] in robots_red:
-                    for client in robots_red:
-                        if client != current_package[1]:
-                            client_thread = threading.Thread(target=send_message_to_client,
-                                                             args=[client, UDP_TEAM_SEND_PORT, current_package[3]])
-                            client_thread.start()
-                else:
-                    log("We received a message on the team communication port from a robot not registered with one of the"
-                        " teams. This should not happen.")
-        time.sleep(0.005)
-
-
-# Loads all client IP addresses from the game.json config file
-def add_clients_from_config(config):
-    with open(config, 'r') as game_json:
-        config = json.load(game_json)
-        clients.append(config['host'])
+# Default maximum size of the forwarded datagrams (the maximum payload of UDP over IPv4), larger datagrams are
+# dropped and counted as truncated
+DEFAULT_MAX_DATAGRAM_SIZE = 65507
+
+# Local control socket of the multi-game bouncer, which registers and unregisters games
+CONTROL_IP = "127.0.0.1"
+UDP_CONTROL_PORT = 3900
+
+# Port offset between the games started from the command line of the multi-game bouncer. With a step of 10, the
+# GameController and team listen ports of different games never collide
+PORT_OFFSET_STEP = 10
+
+# Binary capture of the team packets accepted for forwarding (not truncated nor rate limited, but possibly dropped
+# afterwards by a full queue):
+# - header: CAPTURE_MAGIC, uint32 length, JSON with the IPs of the clients and of the teams
+# - one record per packet: int64 receive time in ns since the epoch, IPv4 of the sender (4 bytes), uint16 port,
+#   uint16 payload length, followed by the payload
+CAPTURE_MAGIC = b"HLVSCAP1"
+CAPTURE_HEADER = struct.Struct("<I")
+CAPTURE_RECORD = struct.Struct("<q4sHH")
+
+# The capture is buffered and written to disk at most every CAPTURE_FLUSH_PERIOD seconds
+CAPTURE_FLUSH_PERIOD = 1.0
+
+# Defaults of the "bouncer" section of game.json
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_STATS_INTERVAL = 1.0
+
+# Counters of each source, team and of the whole bouncer, written periodically to the stats file
+# A packet is forwarded if it was sent to at least one destination, send_failed counts the destinations a packet could
+# not be sent to (send buffer full, destination unreachable or partial send)
+COUNTERS = ["received", "forwarded", "dropped", "rate_limited", "truncated", "send_failed", "bytes_received",
+            "bytes_forwarded"]
+
+
+class Capture:
+    """Buffered binary capture of the team packets accepted for forwarding."""
+
+    def __init__(self, path, clients, robots_blue, robots_red):
+        self.file = open(path, "wb", buffering=1 << 20)
+        header = json.dumps({"clients": clients, "blue": robots_blue, "red": robots_red}).encode()
+        self.file.write(CAPTURE_MAGIC + CAPTURE_HEADER.pack(len(header)) + header)
+        self.file.flush()
+        self.next_flush_time = 0.0
+
+    def write(self, received_time, ip, port, data):
+        self.file.write(CAPTURE_RECORD.pack(received_time, socket.inet_aton(ip), port, len(data)))
+        self.file.write(data)
+        now = time.monotonic()
+        if now >= self.next_flush_time:
+            self.file.flush()
+            self.next_flush_time = now + CAPTURE_FLUSH_PERIOD
+
+    def close(self):
+        self.file.close()
+
+
+class TokenBucket:
+    """Allows rate packets per second on average, with bursts of up to burst packets."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.last_time = time.monotonic()
+
+    def available(self, now):
+        """Refill the bucket and return whether a packet can be sent, without taking its token."""
+        self.tokens = min(self.burst, self.tokens + (now - self.last_time) * self.rate)
+        self.last_time = now
+        return self.tokens >= 1
+
+    def take(self):
+        self.tokens -= 1
+
+
+class Source:
+    """Bounded queue of the packets of a sender. When it is full, the oldest packet is dropped, so that stale
+    packets do not delay fresh ones. The packets are kept in the receive buffers of the bouncer, which are given back
+    to free_buffers once they are forwarded or dropped. The packets are forwarded to the (ip, port) addresses of
+    destinations.
+    """
+
+    def __init__(self, destinations, queue_size, counters, rate_limits=(), free_buffers=None,
+                 max_datagram_size=DEFAULT_MAX_DATAGRAM_SIZE):
+        self.queue = collections.deque(maxlen=queue_size)
+        self.destinations = destinations
+        # Counters of the sender, of its team and of the bouncer
+        self.counters = counters
+        self.rate_limits = rate_limits
+        self.free_buffers = [] if free_buffers is None else free_buffers
+        self.max_datagram_size = max_datagram_size
+
+    def push(self, buffer, size, now):
+        """Queue the first size bytes of buffer. Returns False if the packet is not queued, the caller keeps the
+        buffer then."""
+        for counters in self.counters:
+            counters["received"] += 1
+            counters["bytes_received"] += size
+        if size > self.max_datagram_size:
+            for counters in self.counters:
+                counters["truncated"] += 1
+            return False
+        # The tokens are only taken if all the buckets (robot and team) accept the packet
+        if not all([rate_limit.available(now) for rate_limit in self.rate_limits]):
+            for counters in self.counters:
+                counters["rate_limited"] += 1
+            return False
+        for rate_limit in self.rate_limits:
+            rate_limit.take()
+        if len(self.queue) == self.queue.maxlen:
+            for counters in self.counters:
+                counters["dropped"] += 1
+            self.free_buffers.append(self.queue[0][0])
+        self.queue.append((buffer, size))
+        return True
+
+
+class Bouncer:
+    """Forwards GameController messages to all clients and team messages to the teammates of the sender.
+
+    A single event loop waits on the receiving sockets, there are no threads and no sleeps. The received packets are
+    put into a bounded queue per sender and then forwarded round-robin over the senders, with one reusable socket per
+    send port, to fan-out lists which are computed once per sender IP. Team messages can be rate limited per robot and
+    per team.
+
+    The first client is the host of the referee, which receives the GameController messages on host_gc_send_port
+    (gc_send_port by default), so that the referees of several games can run on one host.
+    """
+
+    def __init__(self, clients, robots_blue, robots_red, capture=None, gc_send_port=UDP_GC_SEND_PORT,
+                 team_send_port=UDP_TEAM_SEND_PORT, queue_size=DEFAULT_QUEUE_SIZE, robot_rate_limit=None,
+                 team_rate_limit=None, stats_path=None, stats_interval=DEFAULT_STATS_INTERVAL, selector=None,
+                 send_sockets=None, max_datagram_size=DEFAULT_MAX_DATAGRAM_SIZE, host_gc_send_port=None):
+        self.clients = clients
+        self.robots_blue = robots_blue
+        self.robots_red = robots_red
+        self.capture = capture
+        self.stats_path = stats_path
+        self.stats_interval = stats_interval
+        self.next_stats_time = time.monotonic() + stats_interval
+        # Receive buffers with one spare byte to detect datagrams larger than max_datagram_size, as memoryviews so
+        # that slicing them does not copy. Buffers are only allocated when all buffers are queued
+        self.max_datagram_size = max_datagram_size
+        self.free_buffers = []
+
+        self.total = dict.fromkeys(COUNTERS, 0)
+        self.total["unregistered"] = 0
+        self.unregistered = {}
+        gc_destinations = [(client, gc_send_port) for client in clients]
+        if gc_destinations and host_gc_send_port is not None:
+            gc_destinations[0] = (clients[0], host_gc_send_port)
+        self.gc_source = Source(gc_destinations, queue_size, [dict.fromkeys(COUNTERS, 0), self.total],
+                                free_buffers=self.free_buffers, max_datagram_size=max_datagram_size)
+        # Sources of the team messages of each robot: its teammates are the destinations, blue takes precedence like
+        # in the config
+        self.team_counters = {}
+        self.robot_counters = {}
+        self.team_sources = {}
+        for color, team in [("red", robots_red), ("blue", robots_blue)]:
+            self.team_counters[color] = dict.fromkeys(COUNTERS, 0)
+            team_rate_limits = [TokenBucket(team_rate_limit)] if team_rate_limit else []
+            for ip in team:
+                self.robot_counters[ip] = dict.fromkeys(COUNTERS, 0)
+                rate_limits = ([TokenBucket(robot_rate_limit)] if robot_rate_limit else []) + team_rate_limits
+                self.team_sources[ip] = Source([(client, team_send_port) for client in team if client != ip],
+                                               queue_size, [self.robot_counters[ip], self.team_counters[color],
+                                                            self.total], rate_limits, self.free_buffers,
+                                               max_datagram_size)
+        # Sources with queued packets, in the order they received them
+        self.pending = {}
+        # The selector and the send sockets are shared by the games of a multi-game bouncer
+        self.owns_selector = selector is None
+        self.selector = selectors.DefaultSelector() if selector is None else selector
+        self.send_sockets = {} if send_sockets is None else send_sockets
+        self.receive_sockets = []
+
+    @classmethod
+    def from_config(cls, config, capture_path=None, stats_path=None, **kwargs):
+        """Load all client IP addresses and the bouncer settings from the game.json config file. The keyword
+        arguments are passed to the constructor."""
+        with open(config, 'r') as game_json:
+            config = json.load(game_json)
+        clients = [config['host']]
+        robots_blue = []
+        robots_red = []
         for blue_robot in config["blue"]["hosts"]:
             if blue_robot != "127.0.0.1":
                 clients.append(blue_robot)
@@ -125,31 +245,344 @@ def add_clients_from_config(config):
             if red_robot != "127.0.0.1":
                 clients.append(red_robot)
                 robots_red.append(red_robot)
-
-
-def start_bouncing_server(game_config):
+        settings = config.get("bouncer", {})
+        capture = Capture(capture_path, clients, robots_blue, robots_red) if capture_path else None
+        return cls(clients, robots_blue, robots_red, capture,
+                   queue_size=settings.get("queue_size", DEFAULT_QUEUE_SIZE),
+                   robot_rate_limit=settings.get("robot_rate_limit"),
+                   team_rate_limit=settings.get("team_rate_limit"),
+                   stats_path=stats_path,
+                   stats_interval=settings.get("stats_interval", DEFAULT_STATS_INTERVAL),
+                   max_datagram_size=settings.get("max_datagram_size", DEFAULT_MAX_DATAGRAM_SIZE),
+                   **kwargs)
+
+    def bind(self, ip=SERVER_IP, gc_listen_port=UDP_GC_LISTEN_PORT, team_listen_port=UDP_TEAM_LISTEN_PORT):
+        for port, handler in [(gc_listen_port, self.on_gc_packet), (team_listen_port, self.on_team_packet)]:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)  # UDP
+            try:
+                sock.bind((ip, port))
+            except OSError:
+                sock.close()
+                raise
+            sock.setblocking(False)
+            self.selector.register(sock, selectors.EVENT_READ, functools.partial(self.receive, port=port,
+                                                                                 handler=handler))
+            self.receive_sockets.append(sock)
+            log(f"Binding receive on {ip}:{port}")
+
+    def send(self, data, destinations):
+        """Send data to all destinations, returns the number of destinations and of bytes it was sent to/sent."""
+        sent = 0
+        bytes_sent = 0
+        for destination in destinations:
+            sock = self.send_sockets.get(destination[1])
+            if sock is None:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)  # UDP
+                sock.setblocking(False)
+                self.send_sockets[destination[1]] = sock
+            try:
+                size = sock.sendto(data, destination)
+            except OSError:  # send buffer full or destination unreachable, UDP packets may get lost anyway
+                continue
+            if size == len(data):
+                sent += 1
+                bytes_sent += size
+        return sent, bytes_sent
+
+    def on_gc_packet(self, buffer, size, ip, port, received_time):
+        if self.gc_source.push(buffer, size, time.monotonic()):
+            self.pending[self.gc_source] = None
+        else:
+            self.free_buffers.append(buffer)
+
+    def on_team_packet(self, buffer, size, ip, port, received_time):
+        source = self.team_sources.get(ip)
+        if source is None:
+            self.total["unregistered"] += 1
+            if ip not in self.unregistered:
+                log(f"We received a message on the team communication port from {ip}, which is not registered with "
+                    "one of the teams. This should not happen.")
+            self.unregistered[ip] = self.unregistered.get(ip, 0) + 1
+            self.free_buffers.append(buffer)
+        elif source.push(buffer, size, time.monotonic()):
+            self.pending[source] = None
+            if self.capture:
+                self.capture.write(received_time, ip, port, buffer[:size])
+        else:
+            self.free_buffers.append(buffer)
+
+    def forward(self):
+        """Forward the queued packets, one packet per sender in turn."""
+        while self.pending:
+            for source in list(self.pending):
+                buffer, size = source.queue.popleft()
+                sent, bytes_sent = self.send(buffer[:size], source.destinations)
+                self.free_buffers.append(buffer)
+                for counters in source.counters:
+                    if sent:
+                        counters["forwarded"] += 1
+                    counters["bytes_forwarded"] += bytes_sent
+                    counters["send_failed"] += len(source.destinations) - sent
+                if not source.queue:
+                    del self.pending[source]
+
+    def receive(self, sock, port, handler):
+        """Queue all packets which are available on a socket, without blocking. The packets are received into free
+        buffers, no buffer is allocated per packet."""
+        while True:
+            buffer = self.free_buffers.pop() if self.free_buffers else memoryview(
+                bytearray(self.max_datagram_size + 1))
+            try:
+                size, addr = sock.recvfrom_into(buffer)
+            except (BlockingIOError, InterruptedError):
+                self.free_buffers.append(buffer)
+                break
+            except OSError:  # e.g. ICMP port unreachable reported on the socket
+                self.free_buffers.append(buffer)
+                continue
+            handler(buffer, size, addr[0], port, time.time_ns())
+
+    def poll(self, timeout=None):
+        """Wait for packets, queue all packets which are available without blocking on a socket and forward them."""
+        for key, _ in self.selector.select(timeout):
+            key.data(key.fileobj)
+        self.forward()
+
+    def stats(self):
+        return {
+            "time": time.time(),
+            "total": self.total,
+            "game_controller": self.gc_source.counters[0],
+            "teams": self.team_counters,
+            "robots": self.robot_counters,
+            "unregistered": self.unregistered,
+        }
+
+    def write_stats(self):
+        # Replace the file at once, so that readers never see a partially written file
+        tmp_path = f"{self.stats_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.stats(), f, indent=4)
+        os.replace(tmp_path, self.stats_path)
+
+    def update_stats(self):
+        """Write the stats file if it is due and return the time until the next update (None without stats file)."""
+        if self.stats_path is None:
+            return None
+        now = time.monotonic()
+        if now >= self.next_stats_time:
+            self.write_stats()
+            self.next_stats_time = now + self.stats_interval
+        return self.next_stats_time - now
+
+    def run(self):
+        while True:
+            self.poll(self.update_stats())
+
+    def close(self):
+        for sock in self.receive_sockets:
+            self.selector.unregister(sock)
+            sock.close()
+        if self.owns_selector:
+            self.selector.close()
+            for sock in self.send_sockets.values():
+                sock.close()
+        if self.capture:
+            self.capture.close()
+        if self.stats_path:
+            self.write_stats()
+
+
+class BouncerServer:
+    """Serves several games from one event loop, to run several matches on one host.
+
+    Each game has its own Bouncer, with its own listen ports (the default ports plus the port offset of the game),
+    fan-out tables, queues, counters, capture and stats file. The GameController messages of a game are forwarded to
+    its referee on UDP_GC_SEND_PORT plus its port offset, to the robots on UDP_GC_SEND_PORT. The games share the
+    selector and the send sockets.
+    Games are registered and unregistered with JSON requests on a local UDP control socket:
+
+    - ``{"command": "register", "name": name, "game_config": path, "port_offset": 0, "directory": path}``
+    - ``{"command": "unregister", "name": name}``
+    - ``{"command": "list"}``
+
+    Each request is answered with ``{"ok": true, ...}`` or ``{"ok": false, "error": message}``.
+    """
+
+    def __init__(self, listen_ip=SERVER_IP, control_port=UDP_CONTROL_PORT):
+        self.listen_ip = listen_ip
+        self.games = {}
+        self.ports = {}
+        self.selector = selectors.DefaultSelector()
+        self.send_sockets = {}
+        self.control_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)  # UDP
+        self.control_socket.bind((CONTROL_IP, control_port))
+        self.control_socket.setblocking(False)
+        self.selector.register(self.control_socket, selectors.EVENT_READ, self.on_control_request)
+        log(f"Control socket listening on {CONTROL_IP}:{control_port}")
+
+    def register(self, name, game_config, port_offset=0, directory=".", gc_send_port=UDP_GC_SEND_PORT,
+                 team_send_port=UDP_TEAM_SEND_PORT):
+        """Start forwarding the packets of a game, its capture and stats are written to directory."""
+        if name in self.games:
+            raise ValueError(f"Game {name} is already registered")
+        ports = {"gc_listen_port": UDP_GC_LISTEN_PORT + port_offset,
+                 "team_listen_port": UDP_TEAM_LISTEN_PORT + port_offset,
+                 "host_gc_send_port": gc_send_port + port_offset}
+        bouncer = Bouncer.from_config(game_config, os.path.join(directory, "bouncing_capture.bin"),
+                                      os.path.join(directory, "bouncing_stats.json"), gc_send_port=gc_send_port,
+                                      team_send_port=team_send_port, selector=self.selector,
+                                      send_sockets=self.send_sockets, host_gc_send_port=ports["host_gc_send_port"])
+        try:
+            bouncer.bind(self.listen_ip, ports["gc_listen_port"], ports["team_listen_port"])
+        except OSError:
+            bouncer.close()
+            raise
+        self.games[name] = bouncer
+        self.ports[name] = ports
+        log(f"Registered game {name} from {game_config} on ports {ports}, robots in team blue are "
+            f"{bouncer.robots_blue}, robots in team red are {bouncer.robots_red}")
+        return ports
+
+    def unregister(self, name):
+        if name not in self.games:
+            raise ValueError(f"Game {name} is not registered")
+        self.games.pop(name).close()
+        del self.ports[name]
+        log(f"Unregistered game {name}")
+
+    def on_control_request(self, sock):
+        while True:
+            try:
+                data, addr = sock.recvfrom(65536)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                continue
+            try:
+                request = json.loads(data)
+                command = request.pop("command")
+                if command == "register":
+                    reply = {"ok": True, "ports": self.register(**request)}
+                elif command == "unregister":
+                    self.unregister(**request)
+                    reply = {"ok": True}
+                elif command == "list":
+                    reply = {"ok": True, "games": self.ports}
+                else:
+                    raise ValueError(f"Unknown command {command}")
+            except Exception as e:  # Reply with the error, a bad request must not stop the other games
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            try:
+                sock.sendto(json.dumps(reply).encode(), addr)
+            except OSError:
+                pass
+
+    def poll(self, timeout=None):
+        for key, _ in self.selector.select(timeout):
+            key.data(key.fileobj)
+        for bouncer in list(self.games.values()):
+            bouncer.forward()
+
+    def update_stats(self):
+        timeouts = [timeout for timeout in (bouncer.update_stats() for bouncer in self.games.values())
+                    if timeout is not None]
+        return min(timeouts, default=None)
+
+    def run(self):
+        while True:
+            self.poll(self.update_stats())
+
+    def close(self):
+        for name in list(self.games):
+            self.unregister(name)
+        self.selector.close()
+        self.control_socket.close()
+        for sock in self.send_sockets.values():
+            sock.close()
+
+
+def control_request(request, control_port=UDP_CONTROL_PORT, timeout=2.0):
+    """Send a request to the control socket of a multi-game bouncer.
+
+    Raises OSError if the bouncer does not answer and RuntimeError if it fails to execute the request.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        sock.sendto(json.dumps(request).encode(), (CONTROL_IP, control_port))
+        reply = json.loads(sock.recv(65536))
+    if not reply["ok"]:
+        raise RuntimeError(reply["error"])
+    return reply
+
+
+def start_bouncing_server(game_config, listen_ip=SERVER_IP, gc_listen_port=UDP_GC_LISTEN_PORT,
+                          team_listen_port=UDP_TEAM_LISTEN_PORT, gc_send_port=UDP_GC_SEND_PORT,
+                          team_send_port=UDP_TEAM_SEND_PORT, host_gc_send_port=None, directory="."):
+    global log_file
+    log_file = open(os.path.join(directory, "bouncing_log.txt"), "w")
     log("Initializing UDP Server")
 
-    add_clients_from_config(game_config)
+    bouncer = Bouncer.from_config(game_config, os.path.join(directory, "bouncing_capture.bin"),
+                                  os.path.join(directory, "bouncing_stats.json"), gc_send_port=gc_send_port,
+                                  team_send_port=team_send_port, host_gc_send_port=host_gc_send_port)
     log("Successfully read in %s" % game_config)
-    log("List of clients registered with the server is %s" % clients)
-    log("Robots in team blue are %s" % robots_blue)
-    log("Robots in team red are %s" % robots_red)
+    log("List of clients registered with the server is %s" % bouncer.clients)
+    log("Robots in team blue are %s" % bouncer.robots_blue)
+    log("Robots in team red are %s" % bouncer.robots_red)
+
+    def on_terminate(signum, frame):
+        # The referee terminates the bouncer at the end of the game, write the buffered packets first
+        bouncer.close()
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, on_terminate)
+
+    bouncer.bind(listen_ip, gc_listen_port, team_listen_port)
+    log("Setup completed")
+    bouncer.run()
 
-    queue_thread = threading.Thread(target=on_queue_update)
-    queue_thread.start()
-    log("Queue thread started")
 
-    server_thread = threading.Thread(target=receive_input_from_client, args=[UDP_GC_LISTEN_PORT])
-    server_thread.start()
-    log("Server thread for GC port started")
+def start_multi_game_server(game_configs, listen_ip=SERVER_IP, control_port=UDP_CONTROL_PORT):
+    global log_file
+    log_file = open("bouncing_log.txt", "w")
+    log("Initializing multi-game UDP Server")
+    server = BouncerServer(listen_ip, control_port)
+    for i, game_config in enumerate(game_configs):
+        server.register(f"game{i}", game_config, i * PORT_OFFSET_STEP, os.path.dirname(os.path.abspath(game_config)))
 
-    server_thread = threading.Thread(target=receive_input_from_client, args=[UDP_TEAM_LISTEN_PORT])
-    server_thread.start()
-    log("Server thread for Robot port started")
+    def on_terminate(signum, frame):
+        server.close()
+        os._exit(0)
 
+    signal.signal(signal.SIGTERM, on_terminate)
     log("Setup completed")
+    server.run()
 
 
 if __name__ == "__main__":
-    start_bouncing_server(sys.argv[1])
+    parser = argparse.ArgumentParser(description="Forwards the GameController and team communication packets")
+    parser.add_argument("game_configs", nargs="*", help="game.json of the match, or of each match with --server")
+    parser.add_argument("--server", action="store_true",
+                        help=f"Serve several matches, the listen ports of the n-th game_config are offset by "
+                             f"n * {PORT_OFFSET_STEP}, further games can be registered on the control port")
+    parser.add_argument("--control-port", type=int, default=UDP_CONTROL_PORT)
+    parser.add_argument("--port-offset", type=int, default=0,
+                        help="Offset of the listen ports and of the port the referee host receives the "
+                             "GameController messages on, to run the bouncers of several matches on one host")
+    parser.add_argument("--directory", default=".", help="Directory of the log, capture and stats files")
+    # The ports are only changed to run several bouncers or robots on one host, e.g. by benchmark_udp_bouncer.py
+    parser.add_argument("--listen-ip", default=SERVER_IP)
+    parser.add_argument("--gc-listen-port", type=int, default=UDP_GC_LISTEN_PORT)
+    parser.add_argument("--team-listen-port", type=int, default=UDP_TEAM_LISTEN_PORT)
+    parser.add_argument("--gc-send-port", type=int, default=UDP_GC_SEND_PORT)
+    parser.add_argument("--team-send-port", type=int, default=UDP_TEAM_SEND_PORT)
+    args = parser.parse_args()
+    if args.server:
+        start_multi_game_server(args.game_configs, args.listen_ip, args.control_port)
+    elif len(args.game_configs) == 1:
+        start_bouncing_server(args.game_configs[0], args.listen_ip, args.gc_listen_port + args.port_offset,
+                              args.team_listen_port + args.port_offset, args.gc_send_port, args.team_send_port,
+                              args.gc_send_port + args.port_offset, args.directory)
+    else:
+        parser.error("Exactly one game_config is required without --server")
@@ -0,0 +1,174 @@
+# Copyright 1996-2021 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+class WorldSnapshot:
+    """State of the simulated world during one simulation step.
+
+    Every quantity is fetched from Webots the first time it is requested during a step and memoized until the
+    next call to `new_step`. This way, the referee checks and the data collection share the same values and each
+    Supervisor call is only made once per step and object.
+
+    Poses and contact points can also be tracked: Webots then sends them to the controller at every sampling period
+    and reading them does not need a round-trip anymore.
+    """
+
+    def __init__(self, supervisor):
+        self.supervisor = supervisor
+        self.step_calls = 0           # Supervisor calls made during the current step
+        self.step_hits = 0            # requests served from the snapshot during the current step
+        self.total_calls = 0          # Supervisor calls made since the last call to `reset_stats`
+        self.total_hits = 0           # requests served from the snapshot since the last call to `reset_stats`
+        self.total_steps = 0          # steps since the last call to `reset_stats`
+        self.tracking = False         # whether poses and contact points are currently tracked
+        self._cache = {}
+        self._tracked = set()         # cache keys of the quantities tracked by Webots
+        self._tracked_pose_nodes = []
+        self._tracked_contact_nodes = []
+
+    def new_step(self):
+        """Forget all values of the previous step."""
+        self.total_calls += self.step_calls
+        self.total_hits += self.step_hits
+        self.total_steps += 1
+        self.step_calls = 0
+        self.step_hits = 0
+        self._cache.clear()
+
+    def reset_stats(self):
+        self.total_calls = 0
+        self.total_hits = 0
+        self.total_steps = 0
+
+    def invalidate(self, obj):
+        """Forget all values of an object, e.g. after it was moved by the referee."""
+        for key in [key for key in self._cache if key[1] == id(obj)]:
+            del self._cache[key]
+
+    def _get(self, name, obj, *args):
+        # The object is stored alongside its value, so that its id cannot be reused by another object during the step
+        key = (name, id(obj)) + args
+        entry = self._cache.get(key)
+        if entry is not None:
+            self.step_hits += 1
+            return entry[1]
+        value = getattr(obj, name)(*args)
+        if key not in self._tracked:
+            self.step_calls += 1
+        self._cache[key] = (obj, value)
+        return value
+
+    def enable_tracking(self, pose_nodes, contact_nodes, sampling_period):
+        """Enable pose tracking and contact points tracking.
+
+        :param pose_nodes: Nodes whose pose is tracked
+        :param contact_nodes: Tuples of a node and whether contact points of its descendants are tracked as well
+        :param sampling_period: Sampling period in milliseconds
+        :return: False if the Webots version does not support tracking, in which case the values are polled
+        """
+        self.disable_tracking()
+        try:
+            for node in pose_nodes:
+                node.enablePoseTracking(sampling_period)
+                self._tracked_pose_nodes.append(node)
+                self._tracked.add(('getPose', id(node)))
+            for node, include_descendants in contact_nodes:
+                node.enableContactPointsTracking(sampling_period, include_descendants)
+                self._tracked_contact_nodes.append((node, include_descendants))
+                self._tracked.add(('getContactPoints', id(node), include_descendants))
+        except AttributeError:  # Webots older than R2023b
+            self.disable_tracking()
+            return False
+        self.tracking = True
+        return True
+
+    def disable_tracking(self):
+        for node in self._tracked_pose_nodes:
+            node.disablePoseTracking()
+        for node, include_descendants in self._tracked_contact_nodes:
+            node.disableContactPointsTracking(include_descendants)
+        self._tracked_pose_nodes = []
+        self._tracked_contact_nodes = []
+        self._tracked.clear()
+        self.tracking = False
+
+    def get_velocity(self, node):
+        return self._get('getVelocity', node)
+
+    def get_contact_points(self, node, include_descendants=False):
+        return self._get('getContactPoints', node, include_descendants)
+
+    def get_center_of_mass(self, node):
+        return self._get('getCenterOfMass', node)
+
+    def get_position(self, node):
+        return self._get('getPosition', node)
+
+    def get_pose(self, node):
+        return self._get('getPose', node)
+
+    def get_sf_vec3f(self, field):
+        return self._get('getSFVec3f', field)
+
+    def get_from_id(self, node_id):
+        return self._get('getFromId', self.supervisor, node_id)
+
+    def stats_message(self):
+        """Return a summary of the Supervisor calls made since the last call to `reset_stats`."""
+        if self.total_steps == 0:
+            return 'Supervisor calls per step: no step'
+        calls = self.total_calls / self.total_steps
+        hits = self.total_hits / self.total_steps
+        return f'Supervisor calls per step: {calls:.1f} (avoided by world snapshot: {hits:.1f})'
+
+
+class TrackingBenchmark:
+    """Alternates between polling and tracking every `period` real seconds and measures the real time factor of both."""
+
+    def __init__(self, period):
+        self.period = period
+        self.tracking = False  # the benchmark starts with polling
+        self.real_time = {False: 0.0, True: 0.0}
+        self.simulated_time = {False: 0.0, True: 0.0}
+        self._phase_real_time = None
+        self._phase_simulated_time = None
+
+    def update(self, real_time, simulated_time):
+        """Account for the elapsed time and return True when it is time to switch between polling and tracking."""
+        if self._phase_real_time is None:
+            self._phase_real_time = real_time
+            self._phase_simulated_time = simulated_time
+            return False
+        if real_time - self._phase_real_time < self.period:
+            return False
+        self.real_time[self.tracking] += real_time - self._phase_real_time
+        self.simulated_time[self.tracking] += simulated_time - self._phase_simulated_time
+        self._phase_real_time = real_time
+        self._phase_simulated_time = simulated_time
+        self.tracking = not self.tracking
+        return True
+
+    def real_time_factor(self, tracking):
+        if self.real_time[tracking] == 0:
+            return None
+        return self.simulated_time[tracking] / self.real_time[tracking]
+
+    def summary(self):
+        messages = []
+        for tracking, name in [(False, 'polling'), (True, 'tracking')]:
+            factor = self.real_time_factor(tracking)
+            factor = 'not measured' if factor is None else f'{factor:.3f}'
+            messages.append(f'Benchmark: real time factor with {name}: {factor} '
+                            f'(over {self.real_time[tracking]:.2f} real seconds)')
+        return messages
@@ -14,7 +14,7 @@
 
 """test_supervisor controller."""
 from controller import Supervisor
-from gamestate import GameState
+from gamestate import GAME_STATE_SIZE, parse_game_state
 
 import json
 import os
@@ -34,19 +34,33 @@ class GCListener:
         self._socket.bind(('0.0.0.0', 3838))
         self._socket.setblocking(False)
         self._state = None
+        self._buffer = memoryview(bytearray(GAME_STATE_SIZE))
+        self._newest = memoryview(bytearray(GAME_STATE_SIZE))
+        self._packet = None
 
     def receive(self):
-        try:
-            data, peer = self._socket.recvfrom(GameState.sizeof())
-        except BlockingIOError:
+        # Only the newest packet matters, the packets received since the previous step are skipped
+        size = None
+        while True:
+            try:
+                received = self._socket.recv_into(self._buffer)
+            except BlockingIOError:
+                break
+            except Exception as e:
+                print(f'UDP input failure: {e}')
+                return
+            if received:
+                self._newest, self._buffer = self._buffer, self._newest
+                size = received
+        if size is None:
             return
-        except Exception as e:
-            print(f'UDP input failure: {e}')
-            pass
-        if not data:
-            print('No UDP data received')
+        if self._packet is not None and self._newest[:size] == self._packet:
             return
-        self._state = GameState.parse(data)
+        self._packet = bytes(self._newest[:size])
+        try:
+            self._state = parse_game_state(self._packet)
+        except ValueError as e:
+            print(f'Invalid GameController packet: {e}')
 
     def getState(self):
         return self._state